@@ -0,0 +1,211 @@
+import time
+import bisect
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# 默认的直方图分桶，单位是秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    items = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        items.append(f'{k}="{v}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: "MetricsRegistry" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    """按分桶统计的分布，如耗时"""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # k:标签 v:(各分桶的计数, 总和, 总数)
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            if index < len(self.buckets):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """统计代码块的耗时"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(
+                        (
+                            f"{self.name}_bucket",
+                            {**labels, "le": _format_value(bound)},
+                            cumulative,
+                        )
+                    )
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    指标注册表，以 Prometheus 文本格式导出。
+
+    需要在导出时才能计算的指标(如各状态的任务数)，通过 `add_collector` 注册收集函数，
+    收集函数在每次导出前调用，一般用于更新 Gauge。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Callable[[], None] | None]] = []
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已存在")
+            self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """注册收集函数，绑定方法以弱引用保存，对象被回收后自动失效"""
+        ref = (
+            weakref.WeakMethod(collector)
+            if hasattr(collector, "__self__")
+            else (lambda: collector)
+        )
+        with self._lock:
+            self._collectors.append(ref)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = [ref() for ref in self._collectors]
+            self._collectors = [
+                ref for ref, collector in zip(self._collectors, collectors) if collector
+            ]
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            if collector:
+                collector()
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
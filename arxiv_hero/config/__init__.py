@@ -4,10 +4,16 @@ from typing import Optional
 
 from arxiv_hero.config.protocol import (
     OpenAIConfig,
+    EndpointConfig,
+    RoutingConfig,
     MySQLConfig,
     SqliteConfig,
     ArxivConfig,
     TranslateConfig,
+    FigureConfig,
+    TaskConfig,
+    ScheduleConfig,
+    JobConfig,
 )
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -20,6 +26,7 @@ class Config:
             settings = toml.load(f)
 
         self.openai = OpenAIConfig(**settings["openai"])
+        self.routing = RoutingConfig(**settings.get("routing", {}))
         self.sqlite = (
             SqliteConfig(
                 path=(
@@ -42,10 +49,14 @@ class Config:
             ),
         )
         self.translate = TranslateConfig(**settings["translate"])
+        self.figure = FigureConfig(**settings.get("figure", {}))
+        self.task = TaskConfig(**settings.get("task", {}))
+        self.job = JobConfig(**settings.get("job", {}))
+        self.schedule = ScheduleConfig(**settings.get("schedule", {}))
         self.timezone: str = settings["timezone"]["timezone"]
 
     def __str__(self):
-        return f"Configs(openai={self.openai}, sql={self.sqlite or self.mysql}, arxiv={self.arxiv}, translate={self.translate}, timezone='{self.timezone}')"
+        return f"Configs(openai={self.openai}, routing={self.routing}, sql={self.sqlite or self.mysql}, arxiv={self.arxiv}, translate={self.translate}, figure={self.figure}, task={self.task}, job={self.job}, schedule={self.schedule}, timezone='{self.timezone}')"
 
 
 # 单例实例（懒加载）
@@ -63,7 +74,13 @@ __all__ = [
     "get_config",
     "Config",
     "OpenAIConfig",
+    "EndpointConfig",
+    "RoutingConfig",
     "MySQLConfig",
     "ArxivConfig",
     "TranslateConfig",
+    "FigureConfig",
+    "TaskConfig",
+    "JobConfig",
+    "ScheduleConfig",
 ]
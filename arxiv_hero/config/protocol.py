@@ -1,6 +1,6 @@
 import os
 from pydantic import BaseModel, model_validator
-from typing import Optional
+from typing import Literal, Optional
 
 from arxiv_hero import logger
 
@@ -11,6 +11,65 @@ class OpenAIConfig(BaseModel):
     model: str = "gpt-3.5-turbo"
     max_retries: int = 3
     wait_time: int = 10
+    timeout: float = 120  # 单次请求的超时时间，单位是秒
+    initial_concurrency: int = 4  # 初始的并发上限，之后根据限流情况自动调整
+    min_concurrency: int = 1
+    max_concurrency: int = 16
+    # 所有端点合计的并发上限，已满时各任务按权重公平排队
+    total_concurrency: int = 32
+    hedge: bool = False  # 耗时超过最近 p95 的请求，在有空闲并发时再发送一个相同的请求
+    input_price: float = 0.0  # 每百万输入 token 的价格，用于统计花费
+    output_price: float = 0.0  # 每百万输出 token 的价格
+
+    @model_validator(mode="after")
+    def check_concurrency(self):
+        if not 1 <= self.min_concurrency <= self.max_concurrency:
+            raise ValueError("需要满足 1 <= min_concurrency <= max_concurrency")
+        if self.total_concurrency < 1:
+            raise ValueError("total_concurrency 需要大于 0")
+        return self
+
+
+class EndpointConfig(BaseModel):
+    base_url: str
+    api_key: Optional[str] = None
+    model: str
+    timeout: Optional[float] = None  # 默认使用 [openai] 中的 timeout
+    initial_concurrency: int = 4
+    min_concurrency: int = 1
+    max_concurrency: int = 16
+    input_price: float = 0.0  # 每百万输入 token 的价格
+    output_price: float = 0.0  # 每百万输出 token 的价格
+
+    @model_validator(mode="after")
+    def check_concurrency(self):
+        if not 1 <= self.min_concurrency <= self.max_concurrency:
+            raise ValueError("需要满足 1 <= min_concurrency <= max_concurrency")
+        return self
+
+
+PROMPT_KINDS = ("title", "abstract", "content", "markdown")
+
+
+class RoutingConfig(BaseModel):
+    # 除 [openai] 外的大模型端点，[openai] 对应的端点名为 default
+    endpoints: dict[str, EndpointConfig] = {}
+    # 各类提示词按顺序使用的端点，端点被限流或出错时切换到下一个，未配置的使用 default
+    routes: dict[str, list[str]] = {}
+
+    @model_validator(mode="after")
+    def check_routes(self):
+        for kind, names in self.routes.items():
+            if kind not in PROMPT_KINDS:
+                raise ValueError(
+                    f"未知的提示词类型：{kind}，可选：{', '.join(PROMPT_KINDS)}"
+                )
+            if not names:
+                raise ValueError(f"提示词类型 {kind} 没有配置端点")
+            for name in names:
+                if name != "default" and name not in self.endpoints:
+                    raise ValueError(f"提示词类型 {kind} 使用了未配置的端点：{name}")
+        return self
 
 
 class MySQLConfig(BaseModel):
@@ -48,3 +107,80 @@ class ArxivConfig(BaseModel):
 class TranslateConfig(BaseModel):
     max_retries: int
     max_workers: int
+    mask: bool = True  # 翻译正文前将公式、引用等替换为占位符，翻译后还原
+    batch: bool = False  # 定时获取文章时，通过 batch 接口离线翻译标题和摘要
+    batch_poll_interval: float = 60  # 轮询 batch 任务状态的间隔，单位是秒
+    batch_completion_window: str = "24h"  # batch 任务的完成时限
+    temperature: float = 0.0  # 翻译时的温度，0 使译文稳定
+    # 每次请求的 max_tokens 为原文估计 token 数的倍数，输出被截断时加倍重试，为 0 时不限制
+    max_tokens_ratio: float = 3.0
+    min_max_tokens: int = 256  # max_tokens 的下限，避免短文本的上限过小
+    # 以 `<Chinese>` 预填充助手消息，需要服务端支持续写最后一条助手消息
+    prefill: bool = False
+    # 估计超过该 token 数的正文段落，按句子切分为不超过该长度的多块并行翻译，为 0 时不切分
+    split_tokens: int = 1000
+
+
+class FigureConfig(BaseModel):
+    lazy: bool = True  # 解析时只改写路径，浏览器第一次请求图片时再转换
+    format: Literal["webp", "png"] = "webp"  # 展示图的格式
+    dpi: int = 150  # 渲染 pdf/eps 的分辨率
+    max_size: int = 1600  # 展示图最长边的像素上限
+    thumbnail_size: int = 320  # 缩略图最长边的像素
+    quality: int = 85  # webp 的压缩质量
+    max_workers: int = 4  # 转换图片的进程数
+
+
+class TaskConfig(BaseModel):
+    max_workers: int = 5  # 默认通道的并发上限
+    # 各通道的并发上限，llm: 调用大模型，download: 下载文件，cpu: 解析文档等计算任务
+    lanes: dict[str, int] = {"llm": 3, "download": 2, "cpu": 2}
+    aging_seconds: float = 30  # 排队每超过该秒数，优先级提升一级
+    result_ttl: float = 600  # 已结束的任务保留的秒数，期间重复请求直接返回结果
+    result_cache_size: int = 128  # 最多保留的已结束任务数
+    # 任务状态的后端，memory: 只在本进程中，database: 保存在数据库中，多个进程共享，
+    # redis: 保存在 redis 中(需要安装 redis)，多台机器共享
+    backend: Literal["memory", "database", "redis"] = "memory"
+    redis_url: Optional[str] = None  # 如 redis://localhost:6379/0
+    lease_seconds: float = 30  # 执行任务的进程和 leader 的租约时长
+
+    @model_validator(mode="after")
+    def check_backend(self):
+        if self.backend == "redis" and not self.redis_url:
+            raise ValueError("使用 redis 后端需要配置 redis_url")
+        return self
+
+
+class ScheduleConfig(BaseModel):
+    enabled: bool = True  # 是否定时获取文章
+    fetch_cron: str = "0 9 * * *"  # 定时获取文章的时间，crontab 格式：分 时 日 月 星期
+    max_parallel_days: int = 2  # 补抓多天的文章时，同时处理的天数
+    retry_days: int = 7  # 重试最近多少天内获取失败的类别
+
+    @property
+    def fetch_trigger_args(self) -> dict[str, str]:
+        """转换为 APScheduler CronTrigger 的参数"""
+        fields = self.fetch_cron.split()
+        if len(fields) != 5:
+            raise ValueError(f"fetch_cron 格式错误：{self.fetch_cron}")
+        return dict(zip(("minute", "hour", "day", "month", "day_of_week"), fields))
+
+    @model_validator(mode="after")
+    def check_cron(self):
+        self.fetch_trigger_args  # 检查字段数
+        if self.max_parallel_days < 1:
+            raise ValueError("max_parallel_days 需要大于 0")
+        return self
+
+
+class JobConfig(BaseModel):
+    lease_seconds: int = 60  # 任务租约时长，超时未续约的任务会被其他进程接管
+    heartbeat_interval: int = 15  # 续约间隔，需要小于 lease_seconds
+    poll_interval: int = 10  # 拉取待执行任务的间隔
+    max_attempts: int = 3  # 最大尝试次数，超过后标记为失败
+
+    @model_validator(mode="after")
+    def check_interval(self):
+        if self.heartbeat_interval >= self.lease_seconds:
+            raise ValueError("heartbeat_interval 需要小于 lease_seconds")
+        return self
@@ -1,9 +1,15 @@
 from arxiv_hero.controllers.article_controller import router as article_router
 from arxiv_hero.controllers.content_controller import router as content_router
 from arxiv_hero.controllers.history_controller import router as history_router
+from arxiv_hero.controllers.task_controller import router as task_router
+from arxiv_hero.controllers.metrics_controller import router as metrics_router
+from arxiv_hero.controllers.stats_controller import router as stats_router
 
 __all__ = [
     "article_router",
     "content_router",
     "history_router",
+    "task_router",
+    "metrics_router",
+    "stats_router",
 ]
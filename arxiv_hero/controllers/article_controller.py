@@ -1,3 +1,4 @@
+from typing import Callable, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import calendar
@@ -10,6 +11,7 @@ from arxiv_hero import logger
 from arxiv_hero.config import get_config
 from arxiv_hero.services import ArticleFetcher
 from arxiv_hero.services.task_manager import TaskManager
+from arxiv_hero.services.job_queue import JobQueue
 from arxiv_hero.repositories.article_repository.protocol import (
     QueryResult,
     DailyArticleCount,
@@ -38,6 +40,10 @@ def get_task_manager(request: Request) -> TaskManager:
     return request.app.state.task_manager
 
 
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+
 def callback(msg: str, data: dict, progress: float):
     if msg:
         logger.debug(
@@ -72,16 +78,52 @@ def get_article_counts(
     return result
 
 
+def create_articles_job(
+    date: Optional[str] = None,
+    entry_ids: Optional[list[str]] = None,
+    star: bool = False,
+    callback: Callable[[str, dict, float], None] = None,
+):
+    """持久化任务 create_articles 的处理函数，date 为 ISO 格式的日期"""
+    date = datetime.fromisoformat(date) if date else None
+    # 1. 联网获取文章和翻译
+    result = (
+        fetcher.fetch_and_translate(date=date, callback=callback)
+        if date
+        else fetcher.fetch_and_translate(entry_ids=entry_ids, callback=callback)
+    )
+    # 2. 更新收藏
+    if star:
+        fetcher.respository.bulk_update_star(
+            entry_ids=[article.entry_id for article in result.articles],
+            is_star=star,
+        )
+    # 3. 当根据 entry_ids 添加文章时，无需再次查询
+    if entry_ids:
+        return result
+
+    # 4. 根据日期添加文章时，只返回第一页的文章
+    published_start = datetime(date.year, date.month, date.day)
+    return fetcher.respository.query_articles_advanced(
+        published_start=published_start,
+        published_end=published_start + timedelta(days=1),
+        page=1,
+        page_size=5,
+    )
+
+
 @router.post(
     "/create",
     summary="添加文章",
     description="批量添加文章，date和entry_ids二选一，优先级为date>entry_ids，两者不能同时为空",
 )
 def create_articles(
+    request: Request,
     date: datetime = Body(None, description="文章发布日期"),
     entry_ids: list[str] = Body(None, description="文章的 entry_id 列表"),
     star: bool = Body(False, description="是否收藏，默认为 False"),
     task_manager: TaskManager = Depends(get_task_manager),
+    job_queue: JobQueue = Depends(get_job_queue),
 ):
     if not date and not entry_ids:
         raise HTTPException(
@@ -93,37 +135,22 @@ def create_articles(
         else "create_articles_by_entry_ids_" + str(sorted(entry_ids))
     )
 
-    def create_and_update_star(callback):
-        # 1. 联网获取文章和翻译
-        result = (
-            fetcher.fetch_and_translate(date=date, callback=callback)
-            if date
-            else fetcher.fetch_and_translate(entry_ids=entry_ids, callback=callback)
-        )
-        # 2. 更新收藏
-        if star:
-            fetcher.respository.bulk_update_star(
-                entry_ids=[article.entry_id for article in result.articles],
-                is_star=star,
-            )
-        # 3. 当根据 entry_ids 添加文章时，无需再次查询
-        if entry_ids:
-            return result
-
-        # 4. 根据日期添加文章时，只返回第一页的文章
-        published_start = datetime(date.year, date.month, date.day)
-        return fetcher.respository.query_articles_advanced(
-            published_start=published_start,
-            published_end=published_start + timedelta(days=1),
-            page=1,
-            page_size=5,
-        )
-
-    task = task_manager.get_task(task_id) or task_manager.create_task(
-        create_and_update_star, kwargs={"callback": callback}, task_id=task_id
+    task = job_queue.submit(
+        task_id,
+        "create_articles",
+        {
+            "date": date.isoformat() if date else None,
+            "entry_ids": entry_ids,
+            "star": star,
+        },
+        callback=callback,
+        # 按日期批量抓取的任务不应阻塞用户手动添加的文章
+        priority="background" if date else "interactive",
+    )
+    return StreamingResponse(
+        task_manager.stream_task(task.task_id, request),
+        media_type="text/event-stream",
     )
-    generator = task_manager.get_task_generator(task.task_id)
-    return StreamingResponse(generator(), media_type="text/event-stream")
 
 
 @router.get("/query/option", summary="检索选项")
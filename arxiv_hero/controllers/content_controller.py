@@ -1,12 +1,18 @@
 import os
+import hashlib
+import mimetypes
+from typing import Literal
 
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse, FileResponse, Response
 
 from arxiv_hero import logger
 from arxiv_hero.services import ContentProcessor
 from arxiv_hero.services.task_manager import TaskManager
+from arxiv_hero.services.job_queue import JobQueue
+from arxiv_hero.utils.http_utils import choose_encoding, etag_matches
 
+SOURCE_MAX_AGE = 7 * 24 * 3600  # 源文件的浏览器缓存时间，单位是秒
 
 processor = ContentProcessor()
 router = APIRouter(
@@ -19,6 +25,10 @@ def get_task_manager(request: Request) -> TaskManager:
     return request.app.state.task_manager
 
 
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+
 def callback(msg: str, data: dict, progress: float):
     if msg:
         logger.debug(
@@ -36,23 +46,47 @@ def get_pdf(entry_id: str):
     return FileResponse(pdf_path, media_type="application/pdf")
 
 
+def get_file_etag(file_path: str) -> str:
+    stat = os.stat(file_path)
+    etag_base = f"{stat.st_mtime_ns}-{stat.st_size}"
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
 @router.get("/source/{entry_id}/{filepath:path}", summary="下载源文件，主要是图片")
-def get_source(entry_id: str, filepath: str):
-    SUPPORTED_EXTS = {".png", ".jpg", ".jpeg"}
+def get_source(entry_id: str, filepath: str, request: Request):
+    SUPPORTED_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
     filename, ext = os.path.splitext(filepath)
     if ext not in SUPPORTED_EXTS:
         raise HTTPException(status_code=400, detail=f"Unsupported file format: {ext}")
-    source_dir = processor.download_source_and_extract(entry_id)
-    file_path = os.path.join(source_dir, filepath)
+    source_dir = os.path.abspath(processor.download_source_and_extract(entry_id))
+    file_path = os.path.abspath(os.path.join(source_dir, filepath))
+    if os.path.commonpath([file_path, source_dir]) != source_dir:
+        raise HTTPException(status_code=400, detail="Invalid file path")
+
+    # pdf/eps/bmp 格式的图片在第一次请求时转换
+    file_path = processor.figure_converter.resolve(source_dir, filepath) or file_path
     if not os.path.exists(file_path):
         logger.warning(f"文件不存在：{file_path}")
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path, media_type="application/octet-stream")
+
+    headers = {
+        "ETag": get_file_etag(file_path),
+        "Cache-Control": f"public, max-age={SOURCE_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        file_path,
+        media_type=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        headers=headers,
+    )
 
 
 @router.get("/source/{entry_id}", summary="下载源文件")
 def download_source(
-    entry_id: str, task_manager: TaskManager = Depends(get_task_manager)
+    entry_id: str,
+    request: Request,
+    task_manager: TaskManager = Depends(get_task_manager),
 ):
     def _download(entry_id, callback):
         callback("开始下载PDF文件", None, 0)
@@ -65,14 +99,84 @@ def download_source(
         return {"message": "success"}
 
     task_id = f"download_source_{entry_id}"
-    task = task_manager.get_task(task_id) or task_manager.create_task(
+    task = task_manager.create_task(
         _download,
         args=(entry_id,),
         kwargs={"callback": callback},
         task_id=task_id,
+        priority="interactive",
+        lane="download",
+        kind="download_source",
+    )
+    return StreamingResponse(
+        task_manager.stream_task(task.task_id, request),
+        media_type="text/event-stream",
+    )
+
+
+@router.get(
+    "/{entry_id}/stream",
+    summary="流式获取文章内容",
+    description="逐段返回文章内容，可以通过 from_idx 和 limit 分段加载，响应头 X-Total-Count 为段落总数",
+)
+def stream_content(
+    entry_id: str,
+    from_idx: int = Query(0, ge=0, description="起始段落的下标"),
+    limit: int = Query(None, ge=0, description="最多返回的段落数，默认返回到文章末尾"),
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="返回格式"),
+):
+    total_nums, pagagraphs = processor.iter_parse(entry_id, from_idx, limit)
+
+    def generator():
+        for pagagraph in pagagraphs:
+            data = pagagraph.model_dump_json()
+            yield f"data: {data}\n\n" if format == "sse" else data + "\n"
+
+    return StreamingResponse(
+        generator(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        headers={"X-Total-Count": str(total_nums)},
+    )
+
+
+@router.get(
+    "/export/{entry_id}",
+    summary="导出文章",
+    description="导出文章的 markdown 或 html，支持 ETag 和 gzip/brotli 预压缩",
+)
+def export_content(
+    entry_id: str,
+    request: Request,
+    lang: Literal["en", "zh"] = Query("zh", description="语言"),
+    format: Literal["md", "html"] = Query("md", description="导出格式"),
+):
+    version = processor.exporter.get_version(entry_id)
+    etag = f'"{version}-{lang}-{format}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",  # 每次都用 ETag 验证，内容变化后立即生效
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    export_file = processor.exporter.export(
+        entry_id, lang, format, processor.parse, version=version
+    )
+    # 未解析的文章在导出时解析，返回导出内容的版本
+    headers["ETag"] = export_file.etag
+    encoding = choose_encoding(
+        request.headers.get("accept-encoding"), export_file.encoded_paths
+    )
+    if encoding:
+        return FileResponse(
+            export_file.encoded_paths[encoding],
+            media_type=export_file.media_type,
+            headers={**headers, "Content-Encoding": encoding},
+        )
+    return FileResponse(
+        export_file.path, media_type=export_file.media_type, headers=headers
     )
-    generator = task_manager.get_task_generator(task.task_id)
-    return StreamingResponse(generator(), media_type="text/event-stream")
 
 
 @router.get("/{entry_id}", summary="获取文章内容")
@@ -83,19 +187,28 @@ def get_content(entry_id: str):
 @router.get("/translate/{entry_id}", summary="翻译文章")
 def translate_content(
     entry_id: str,
+    request: Request,
     task_manager: TaskManager = Depends(get_task_manager),
+    job_queue: JobQueue = Depends(get_job_queue),
 ):
-    task_id = f"translate_content_{entry_id}"
-    task = task_manager.get_task(task_id) or task_manager.create_task(
-        processor.translate,
-        args=(entry_id,),
-        kwargs={"callback": callback},
-        task_id=task_id,
+    task = job_queue.submit(
+        f"translate_content_{entry_id}",
+        "translate_content",
+        {"entry_id": entry_id},
+        callback=callback,
+    )
+    return StreamingResponse(
+        task_manager.stream_task(task.task_id, request),
+        media_type="text/event-stream",
     )
-    generator = task_manager.get_task_generator(task.task_id)
-    return StreamingResponse(generator(), media_type="text/event-stream")
 
 
 @router.delete("/{entry_id}", summary="删除文章内容")
-def delete_content(entry_id: str) -> bool:
+def delete_content(
+    entry_id: str,
+    task_manager: TaskManager = Depends(get_task_manager),
+) -> bool:
+    # 缓存的解析和翻译结果已失效
+    task_manager.invalidate_result(f"download_source_{entry_id}")
+    task_manager.invalidate_result(f"translate_content_{entry_id}")
     return processor.repository.remove_content_by_entry_id(entry_id)
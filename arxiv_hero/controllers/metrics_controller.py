@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from arxiv_hero.common.metrics import REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus 指标",
+    description="任务数、排队和执行耗时、大模型请求、数据库事务以及下载和解析各阶段的耗时",
+    response_class=PlainTextResponse,
+)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
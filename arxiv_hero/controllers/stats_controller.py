@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from arxiv_hero.controllers.content_controller import processor
+from arxiv_hero.repositories.usage_repository import (
+    USAGE_GROUP_FIELDS,
+    UsageRepository,
+    UsageStats,
+)
+from arxiv_hero.services.content_services.protocol import CostEstimate
+from arxiv_hero.services.usage_recorder import usage_recorder
+
+repository = UsageRepository()
+router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"],
+)
+
+
+@router.get(
+    "/usage",
+    summary="大模型用量统计",
+    description=(
+        "按日期、文章、段落类型、任务、端点或模型分组统计 token 数和花费，按花费从高到低排序。"
+        f"可用的分组字段：{', '.join(USAGE_GROUP_FIELDS)}"
+    ),
+)
+def get_usage(
+    start_date: Optional[date] = Query(None, description="开始日期，默认为 30 天前"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认为今天"),
+    entry_id: Optional[str] = Query(None, description="只统计该文章的用量"),
+    group_by: list[str] = Query(["date"], description="分组的字段，可以有多个"),
+) -> list[UsageStats]:
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=30)
+    usage_recorder.flush()  # 包括还未写入数据库的用量
+    try:
+        return repository.get_usage_stats(
+            start_date.isoformat(), end_date.isoformat(), entry_id, tuple(group_by)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/estimate/{entry_id}",
+    summary="估计翻译文章正文的花费",
+    description="翻译前在本地估计未翻译段落的 token 数和花费，未解析的文章会先下载和解析",
+)
+def estimate_cost(entry_id: str) -> CostEstimate:
+    return processor.estimate_article_cost(entry_id)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Request, Depends, HTTPException
+
+from arxiv_hero.services.task_manager import TaskManager, TaskInfo, LaneStats
+from arxiv_hero.services.job_queue import JobQueue
+
+router = APIRouter(
+    prefix="/tasks",
+    tags=["Task"],
+)
+
+
+def get_task_manager(request: Request) -> TaskManager:
+    return request.app.state.task_manager
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+
+@router.get("", summary="任务列表", description="本进程中全部任务的状态、进度和耗时")
+def list_tasks(
+    task_manager: TaskManager = Depends(get_task_manager),
+) -> list[TaskInfo]:
+    return task_manager.list_tasks()
+
+
+@router.get("/lanes", summary="各通道的排队情况")
+def get_lane_stats(
+    task_manager: TaskManager = Depends(get_task_manager),
+) -> list[LaneStats]:
+    return task_manager.get_lane_stats()
+
+
+@router.delete(
+    "/{task_id}",
+    summary="取消任务",
+    description="取消排队中或执行中的任务，进行中的大模型请求会被中断，持久化的任务不会再被重试",
+)
+def cancel_task(
+    task_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+) -> bool:
+    if not job_queue.cancel(task_id):
+        raise HTTPException(status_code=404, detail="Task not found or finished")
+    return True
@@ -1,11 +1,24 @@
+import time
+
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 from arxiv_hero.config import get_config
+from arxiv_hero.common.metrics import Histogram
 from arxiv_hero.models.base import Base
 from arxiv_hero.models.article import Article
 from arxiv_hero.models.content import Content
 from arxiv_hero.models.history import History
+from arxiv_hero.models.job import Job, JobResult
+from arxiv_hero.models.task_state import (
+    TaskState,
+    TaskEvent,
+    TaskCancel,
+    LeaderLease,
+)
+from arxiv_hero.models.fetch_checkpoint import FetchCheckpoint
+from arxiv_hero.models.translation_batch import TranslationBatch
+from arxiv_hero.models.llm_usage import LLMUsage
 
 db_config = get_config().sqlite or get_config().mysql
 
@@ -25,9 +38,36 @@ Base.metadata.create_all(engine)
 
 DBSession = sessionmaker(bind=engine)
 
+DB_TRANSACTION_DURATION = Histogram(
+    "arxiv_hero_db_transaction_seconds", "数据库会话中每个事务的耗时"
+)
+
+
+@event.listens_for(DBSession, "after_transaction_create")
+def _on_transaction_create(session, transaction):
+    if transaction.parent is None:
+        session.info["transaction_start"] = time.perf_counter()
+
+
+@event.listens_for(DBSession, "after_transaction_end")
+def _on_transaction_end(session, transaction):
+    if transaction.parent is None:
+        start_time = session.info.pop("transaction_start", None)
+        if start_time is not None:
+            DB_TRANSACTION_DURATION.observe(time.perf_counter() - start_time)
+
+
 __all__ = [
     "DBSession",
     "Article",
     "Content",
     "History",
+    "Job",
+    "JobResult",
+    "TaskState",
+    "TaskEvent",
+    "LeaderLease",
+    "FetchCheckpoint",
+    "TranslationBatch",
+    "LLMUsage",
 ]
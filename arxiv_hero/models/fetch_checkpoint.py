@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text, Integer
+
+from arxiv_hero.models.base import BaseModel
+
+
+class FetchCheckpoint(BaseModel):
+    __tablename__ = "fetch_checkpoint"
+
+    date = Column(String(10), primary_key=True, doc="文章的提交日期，YYYY-MM-DD")
+    category = Column(String(64), primary_key=True, doc="文章类别")
+    status = Column(String(16), nullable=False, doc="completed/error")
+    article_nums = Column(Integer, nullable=False, default=0, doc="获取的文章数")
+    error = Column(Text, nullable=True, doc="失败的原因")
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime
+
+from arxiv_hero.models.base import BaseModel
+
+
+class Job(BaseModel):
+    __tablename__ = "job"
+
+    id = Column(String(255), primary_key=True, doc="任务 ID，同一个任务重复提交时复用")
+    kind = Column(String(64), nullable=False, doc="任务类型，对应注册的处理函数")
+    payload = Column(Text, nullable=False, doc="处理函数的参数，JSON 格式")
+
+    status = Column(
+        String(16),
+        nullable=False,
+        default="pending",
+        doc="pending/running/completed/error/cancelled",
+    )
+    attempts = Column(Integer, nullable=False, default=0, doc="已尝试的次数")
+    max_attempts = Column(Integer, nullable=False, default=3)
+    error = Column(Text, nullable=True, doc="最近一次失败的原因")
+
+    worker_id = Column(String(255), nullable=True, doc="持有租约的进程")
+    lease_expires = Column(DateTime(timezone=True), nullable=True, doc="租约到期时间")
+    heartbeat_at = Column(
+        DateTime(timezone=True), nullable=True, doc="最近一次续约时间"
+    )
+
+
+class JobResult(BaseModel):
+    __tablename__ = "job_result"
+
+    id = Column(String(255), primary_key=True, doc="任务 ID")
+    result = Column(Text, nullable=True, doc="处理函数的返回值，JSON 格式")
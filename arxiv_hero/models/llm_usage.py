@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from arxiv_hero.models.base import BaseModel
+
+
+class LLMUsage(BaseModel):
+    __tablename__ = "llm_usage"
+
+    date = Column(String(10), primary_key=True, doc="请求的日期，YYYY-MM-DD")
+    entry_id = Column(
+        String(255), primary_key=True, doc="文章 ID，不属于某篇文章时为空"
+    )
+    type = Column(String(32), primary_key=True, doc="段落类型或提示词类型")
+    job = Column(String(64), primary_key=True, doc="任务类型")
+    endpoint = Column(String(64), primary_key=True, doc="大模型端点")
+    model = Column(String(128), primary_key=True, doc="模型")
+    requests = Column(Integer, nullable=False, default=0, doc="请求数")
+    prompt_tokens = Column(Integer, nullable=False, default=0, doc="输入 token 数")
+    completion_tokens = Column(Integer, nullable=False, default=0, doc="输出 token 数")
+    cost = Column(Float, nullable=False, default=0, doc="按配置中的价格计算的花费")
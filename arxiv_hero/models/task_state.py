@@ -0,0 +1,46 @@
+from sqlalchemy import Column, String, Text, Integer, Float
+
+from arxiv_hero.models.base import BaseModel
+
+
+class TaskState(BaseModel):
+    __tablename__ = "task_state"
+
+    task_id = Column(String(255), primary_key=True)
+    worker_id = Column(String(255), nullable=False, doc="执行任务的进程")
+    status = Column(
+        String(16),
+        nullable=False,
+        default="waiting",
+        doc="waiting/running/completed/cancelled/error",
+    )
+    lease_expires = Column(
+        Float, nullable=False, doc="租约到期时间(unix 时间戳)，过期表示进程已退出"
+    )
+
+
+class TaskEvent(BaseModel):
+    __tablename__ = "task_event"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String(255), nullable=False, index=True)
+    event_id = Column(Integer, nullable=False, doc="任务内单调递增的事件 ID")
+    # MySQL 中为 LONGTEXT，[DONE] 消息中包含完整的结果
+    frame = Column(Text(2**32 - 1), nullable=False, doc="序列化后的 SSE 帧")
+
+
+class LeaderLease(BaseModel):
+    __tablename__ = "leader_lease"
+
+    name = Column(String(255), primary_key=True, doc="选举的名称，如定时任务名")
+    worker_id = Column(String(255), nullable=False, doc="当前的 leader")
+    lease_expires = Column(Float, nullable=False, doc="租约到期时间(unix 时间戳)")
+
+
+class TaskCancel(BaseModel):
+    __tablename__ = "task_cancel"
+
+    task_id = Column(String(255), primary_key=True)
+    requested_at = Column(
+        Float, nullable=False, doc="其他进程请求取消的时间(unix 时间戳)"
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text
+
+from arxiv_hero.models.base import BaseModel
+
+
+class TranslationBatch(BaseModel):
+    __tablename__ = "translation_batch"
+
+    key = Column(String(64), primary_key=True, doc="由请求内容计算的幂等键")
+    batch_id = Column(String(128), nullable=False, doc="batch 接口返回的任务 ID")
+    status = Column(String(16), nullable=False, doc="submitted/completed/failed")
+    entry_ids = Column(Text, nullable=False, doc="翻译的文章 ID 列表，JSON 格式")
+    error = Column(Text, nullable=True, doc="失败的原因")
@@ -289,6 +289,41 @@ class ArticleRepository:
                 return True
         return False
 
+    def bulk_update_translations(
+        self, translations: dict[str, tuple[Optional[str], Optional[str]]]
+    ) -> int:
+        """
+        批量更新中文标题和摘要，为 None 的字段保持不变
+
+        Args:
+            translations: k:entry_id v:(中文标题, 中文摘要)
+
+        Returns:
+            int: 更新的文章数
+        """
+        if not translations:
+            return 0
+
+        with DBSession() as session:
+            article_mdls = (
+                session.query(ArticleModel.id, ArticleModel.entry_id)
+                .filter(ArticleModel.entry_id.in_(list(translations)))
+                .all()
+            )
+            mappings = []
+            for article_mdl in article_mdls:
+                zh_title, zh_summary = translations[article_mdl.entry_id]
+                mapping = {"id": article_mdl.id}
+                if zh_title:
+                    mapping["zh_title"] = zh_title
+                if zh_summary:
+                    mapping["zh_summary"] = zh_summary
+                if len(mapping) > 1:
+                    mappings.append(mapping)
+            session.bulk_update_mappings(ArticleModel, mappings)
+            session.commit()
+            return len(mappings)
+
     def update_star(self, entry_id: str, is_star: bool) -> bool:
         with DBSession() as session:
             article_mdl = (
@@ -1,4 +1,8 @@
+import hashlib
+from typing import Iterator, Optional
+
 from arxiv_hero.models import DBSession
+from arxiv_hero.models.article import Article as ArticleModel
 from arxiv_hero.models.content import Content as ContentModel
 from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
 
@@ -56,6 +60,92 @@ class ContentRepository:
                 return []
             return self._convert_orm_to_pydantic(content_mdls)
 
+    def get_content_version(self, entry_id: str) -> str:
+        """
+        文章内容的版本号，由段落和文章的标题、摘要的内容计算哈希，内容变化时版本号随之变化。
+        不使用更新时间，MySQL 中的时间只精确到秒，同一秒内的多次修改无法区分
+
+        Args:
+            entry_id: 文章的 entry_id
+
+        Returns:
+            str: 版本号
+        """
+        digest = hashlib.sha256()
+        with DBSession() as session:
+            article = (
+                session.query(
+                    ArticleModel.title,
+                    ArticleModel.zh_title,
+                    ArticleModel.summary,
+                    ArticleModel.zh_summary,
+                )
+                .filter(ArticleModel.entry_id == entry_id)
+                .first()
+            )
+            digest.update(repr(tuple(article) if article else None).encode("utf-8"))
+            rows = (
+                session.query(
+                    ContentModel.order_idx,
+                    ContentModel.type,
+                    ContentModel.text_level,
+                    ContentModel.text,
+                    ContentModel.zh_text,
+                )
+                .filter(ContentModel.entry_id == entry_id)
+                .order_by(ContentModel.order_idx)
+            )
+            for row in rows:
+                digest.update(repr(tuple(row)).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def count_pagagraphs(self, entry_id: str) -> int:
+        with DBSession() as session:
+            return (
+                session.query(ContentModel)
+                .filter(ContentModel.entry_id == entry_id)
+                .count()
+            )
+
+    def iter_pagagraphs(
+        self,
+        entry_id: str,
+        from_idx: int = 0,
+        limit: Optional[int] = None,
+        batch_size: int = 50,
+    ) -> Iterator[LatexPagagraph]:
+        """
+        按 order_idx 顺序逐批读取段落，避免一次性加载整篇文章。
+        每批按 order_idx 大于上一批的最后一个分页读取
+
+        Args:
+            entry_id: 文章的 entry_id
+            from_idx: 起始的 order_idx
+            limit: 最多读取的段落数，默认为 None，表示读取到文章末尾
+            batch_size: 每批从数据库读取的行数
+        """
+        last_idx = from_idx - 1
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            # 每批使用单独的短会话，在会话外返回，客户端读取缓慢时不会长时间占用连接和读锁
+            with DBSession() as session:
+                content_mdls = (
+                    session.query(ContentModel)
+                    .filter(ContentModel.entry_id == entry_id)
+                    .filter(ContentModel.order_idx > last_idx)
+                    .order_by(ContentModel.order_idx)
+                    .limit(size)
+                    .all()
+                )
+                pagagraphs = self._convert_orm_to_pydantic(content_mdls)
+            yield from pagagraphs
+            if len(pagagraphs) < size:
+                return
+            last_idx = pagagraphs[-1].order_idx
+            if remaining is not None:
+                remaining -= len(pagagraphs)
+
     def create_content(
         self,
         entry_id: str,
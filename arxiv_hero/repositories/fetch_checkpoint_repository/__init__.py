@@ -0,0 +1,13 @@
+from arxiv_hero.repositories.fetch_checkpoint_repository.protocol import (
+    FetchCheckpointRecord,
+    CheckpointStatus,
+)
+from arxiv_hero.repositories.fetch_checkpoint_repository.repository import (
+    FetchCheckpointRepository,
+)
+
+__all__ = [
+    "FetchCheckpointRepository",
+    "FetchCheckpointRecord",
+    "CheckpointStatus",
+]
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+CheckpointStatus = Literal["completed", "error"]
+
+
+class FetchCheckpointRecord(BaseModel):
+    date: str  # YYYY-MM-DD
+    category: str
+    status: CheckpointStatus
+    article_nums: int = 0
+    error: Optional[str] = None
+    time_updated: datetime
@@ -0,0 +1,72 @@
+from typing import Optional
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.fetch_checkpoint import FetchCheckpoint as FetchCheckpointModel
+from arxiv_hero.repositories.fetch_checkpoint_repository.protocol import (
+    CheckpointStatus,
+    FetchCheckpointRecord,
+)
+
+
+class FetchCheckpointRepository:
+    """记录按 (日期, 类别) 获取文章的进度，补抓中途失败时，已完成的部分不会重新获取"""
+
+    @staticmethod
+    def _to_record(checkpoint: FetchCheckpointModel) -> FetchCheckpointRecord:
+        return FetchCheckpointRecord(
+            date=checkpoint.date,
+            category=checkpoint.category,
+            status=checkpoint.status,
+            article_nums=checkpoint.article_nums,
+            error=checkpoint.error,
+            time_updated=checkpoint.time_updated,
+        )
+
+    def get_checkpoints(self, date: str) -> list[FetchCheckpointRecord]:
+        with DBSession() as session:
+            checkpoints = (
+                session.query(FetchCheckpointModel)
+                .filter(FetchCheckpointModel.date == date)
+                .all()
+            )
+            return [self._to_record(checkpoint) for checkpoint in checkpoints]
+
+    def get_completed_categories(self, date: str) -> set[str]:
+        return {
+            checkpoint.category
+            for checkpoint in self.get_checkpoints(date)
+            if checkpoint.status == "completed"
+        }
+
+    def get_failed_dates(self, since: str) -> list[str]:
+        """since 及之后有类别获取失败的日期"""
+        with DBSession() as session:
+            rows = (
+                session.query(FetchCheckpointModel.date)
+                .filter(
+                    FetchCheckpointModel.date >= since,
+                    FetchCheckpointModel.status == "error",
+                )
+                .distinct()
+                .order_by(FetchCheckpointModel.date)
+                .all()
+            )
+            return [row.date for row in rows]
+
+    def save_checkpoint(
+        self,
+        date: str,
+        category: str,
+        status: CheckpointStatus,
+        article_nums: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        with DBSession() as session:
+            checkpoint = session.get(FetchCheckpointModel, (date, category))
+            if checkpoint is None:
+                checkpoint = FetchCheckpointModel(date=date, category=category)
+                session.add(checkpoint)
+            checkpoint.status = status
+            checkpoint.article_nums = article_nums
+            checkpoint.error = error
+            session.commit()
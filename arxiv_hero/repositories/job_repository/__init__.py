@@ -0,0 +1,8 @@
+from arxiv_hero.repositories.job_repository.protocol import JobRecord, JobStatus
+from arxiv_hero.repositories.job_repository.repository import JobRepository
+
+__all__ = [
+    "JobRepository",
+    "JobRecord",
+    "JobStatus",
+]
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+JobStatus = Literal["pending", "running", "completed", "error", "cancelled"]
+
+# 已结束的状态，重新提交时会重置为 pending
+FINISHED_JOB_STATUS = ("completed", "error", "cancelled")
+
+
+class JobRecord(BaseModel):
+    id: str
+    kind: str
+    payload: dict
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    lease_expires: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    time_created: datetime
+    time_updated: datetime
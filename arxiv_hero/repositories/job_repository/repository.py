@@ -0,0 +1,241 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import pytz
+from sqlalchemy import and_, or_
+
+from arxiv_hero.config import get_config
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.job import Job as JobModel, JobResult as JobResultModel
+from arxiv_hero.repositories.job_repository.protocol import (
+    FINISHED_JOB_STATUS,
+    JobRecord,
+    JobStatus,
+)
+
+
+class JobRepository:
+    """
+    持久化的任务队列。
+
+    进程通过条件更新(UPDATE ... WHERE status=...)领取任务，只有影响行数为 1 的进程领取成功，
+    多个进程可以共享同一张任务表；领取后需要定期续约，租约过期的任务可以被其他进程重新领取。
+    """
+
+    def __init__(self):
+        self.tz = pytz.timezone(get_config().timezone)
+
+    def _now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    @staticmethod
+    def _to_record(job: JobModel) -> JobRecord:
+        return JobRecord(
+            id=job.id,
+            kind=job.kind,
+            payload=json.loads(job.payload),
+            status=job.status,
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+            error=job.error,
+            worker_id=job.worker_id,
+            lease_expires=job.lease_expires,
+            heartbeat_at=job.heartbeat_at,
+            time_created=job.time_created,
+            time_updated=job.time_updated,
+        )
+
+    def _claimable(self, now: datetime):
+        """可以领取的任务：等待执行，或执行中但租约已过期(进程崩溃)"""
+        return and_(
+            JobModel.attempts < JobModel.max_attempts,
+            or_(
+                JobModel.status == "pending",
+                and_(JobModel.status == "running", JobModel.lease_expires < now),
+            ),
+        )
+
+    def get_job(self, job_id: str) -> Optional[JobRecord]:
+        with DBSession() as session:
+            job = session.get(JobModel, job_id)
+            return self._to_record(job) if job else None
+
+    def enqueue(
+        self, job_id: str, kind: str, payload: dict, max_attempts: int = 3
+    ) -> JobRecord:
+        """
+        提交任务，任务已存在且未结束时不做修改，已结束时重置为 pending 重新执行
+
+        Args:
+            job_id: 任务 ID
+            kind: 任务类型
+            payload: 处理函数的参数，需要可以被 JSON 序列化
+            max_attempts: 最大尝试次数
+        """
+        with DBSession() as session:
+            job = session.get(JobModel, job_id)
+            if job is None:
+                job = JobModel(
+                    id=job_id,
+                    kind=kind,
+                    payload=json.dumps(payload, ensure_ascii=False),
+                    status="pending",
+                    attempts=0,
+                    max_attempts=max_attempts,
+                )
+                session.add(job)
+            elif job.status in FINISHED_JOB_STATUS:
+                job.kind = kind
+                job.payload = json.dumps(payload, ensure_ascii=False)
+                job.status = "pending"
+                job.attempts = 0
+                job.max_attempts = max_attempts
+                job.error = None
+                job.worker_id = None
+                job.lease_expires = None
+            session.commit()
+            return self._to_record(job)
+
+    def claim(self, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """原子地领取任务，成功时尝试次数加一"""
+        now = self._now()
+        with DBSession() as session:
+            rowcount = (
+                session.query(JobModel)
+                .filter(JobModel.id == job_id, self._claimable(now))
+                .update(
+                    {
+                        JobModel.status: "running",
+                        JobModel.worker_id: worker_id,
+                        JobModel.attempts: JobModel.attempts + 1,
+                        JobModel.lease_expires: now + timedelta(seconds=lease_seconds),
+                        JobModel.heartbeat_at: now,
+                        JobModel.time_updated: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            return rowcount == 1
+
+    def list_claimable_ids(
+        self, kinds: Optional[list[str]] = None, limit: int = 10
+    ) -> list[str]:
+        """按提交时间排序的可领取任务，需要再调用 `claim` 领取"""
+        with DBSession() as session:
+            query = session.query(JobModel.id).filter(self._claimable(self._now()))
+            if kinds is not None:
+                query = query.filter(JobModel.kind.in_(kinds))
+            rows = query.order_by(JobModel.time_created).limit(limit).all()
+            return [row.id for row in rows]
+
+    def fail_exhausted(self) -> int:
+        """租约过期且没有剩余尝试次数的任务标记为失败，返回修改的数量"""
+        now = self._now()
+        with DBSession() as session:
+            rowcount = (
+                session.query(JobModel)
+                .filter(
+                    JobModel.status == "running",
+                    JobModel.lease_expires < now,
+                    JobModel.attempts >= JobModel.max_attempts,
+                )
+                .update(
+                    {
+                        JobModel.status: "error",
+                        JobModel.error: "租约过期，已达到最大尝试次数",
+                        JobModel.worker_id: None,
+                        JobModel.lease_expires: None,
+                        JobModel.time_updated: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            return rowcount
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """续约，返回 False 表示租约已经被其他进程接管"""
+        now = self._now()
+        with DBSession() as session:
+            rowcount = (
+                session.query(JobModel)
+                .filter(
+                    JobModel.id == job_id,
+                    JobModel.worker_id == worker_id,
+                    JobModel.status == "running",
+                )
+                .update(
+                    {
+                        JobModel.lease_expires: now + timedelta(seconds=lease_seconds),
+                        JobModel.heartbeat_at: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            return rowcount == 1
+
+    def finish(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: JobStatus,
+        error: Optional[str] = None,
+        result: Any = None,
+    ) -> bool:
+        """
+        结束任务。status 为 error 且还有剩余尝试次数时，任务重新变为 pending，等待重试；
+        status 为 completed 时保存 result，供跟随执行的其他进程读取
+
+        Returns:
+            bool: 是否仍持有租约，租约已被接管时不做修改
+        """
+        with DBSession() as session:
+            job = (
+                session.query(JobModel)
+                .filter(JobModel.id == job_id, JobModel.worker_id == worker_id)
+                .with_for_update()
+                .first()
+            )
+            if job is None or job.status != "running":
+                return False
+            if status == "error" and job.attempts < job.max_attempts:
+                status = "pending"
+            job.status = status
+            job.error = error
+            job.worker_id = None
+            job.lease_expires = None
+            if status == "completed":
+                session.merge(
+                    JobResultModel(
+                        id=job_id, result=json.dumps(result, ensure_ascii=False)
+                    )
+                )
+            session.commit()
+            return True
+
+    def get_result(self, job_id: str) -> Any:
+        """已完成任务的结果，没有保存结果时返回 None"""
+        with DBSession() as session:
+            job_result = session.get(JobResultModel, job_id)
+            if job_result is None or job_result.result is None:
+                return None
+            return json.loads(job_result.result)
+
+    def cancel(self, job_id: str) -> bool:
+        with DBSession() as session:
+            rowcount = (
+                session.query(JobModel)
+                .filter(
+                    JobModel.id == job_id,
+                    JobModel.status.notin_(FINISHED_JOB_STATUS),
+                )
+                .update(
+                    {JobModel.status: "cancelled", JobModel.time_updated: self._now()},
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            return rowcount == 1
@@ -0,0 +1,7 @@
+from arxiv_hero.repositories.task_repository.protocol import TaskStateRecord
+from arxiv_hero.repositories.task_repository.repository import TaskRepository
+
+__all__ = [
+    "TaskRepository",
+    "TaskStateRecord",
+]
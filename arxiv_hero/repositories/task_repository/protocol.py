@@ -0,0 +1,22 @@
+import time
+
+from pydantic import BaseModel
+
+# 已结束的状态，与 TaskStatus 的取值一致
+FINISHED_TASK_STATUS = ("completed", "cancelled", "error")
+
+
+class TaskStateRecord(BaseModel):
+    task_id: str
+    worker_id: str
+    status: str
+    lease_expires: float
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_TASK_STATUS
+
+    @property
+    def is_alive(self) -> bool:
+        """执行任务的进程仍在续约"""
+        return self.lease_expires > time.time()
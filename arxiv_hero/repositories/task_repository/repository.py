@@ -0,0 +1,249 @@
+import time
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.task_state import (
+    TaskState as TaskStateModel,
+    TaskEvent as TaskEventModel,
+    TaskCancel as TaskCancelModel,
+    LeaderLease as LeaderLeaseModel,
+)
+from arxiv_hero.repositories.task_repository.protocol import (
+    FINISHED_TASK_STATUS,
+    TaskStateRecord,
+)
+
+
+class TaskRepository:
+    """
+    多进程共享的任务表、事件流和 leader 租约。
+
+    与 JobRepository 相同，通过条件更新(UPDATE ... WHERE)抢占，影响行数为 1 时成功，
+    记录不存在时插入，主键冲突表示已被其他进程抢先插入。租约时间使用 unix 时间戳。
+    """
+
+    def acquire_task(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        登记由本进程执行任务。任务未登记、已结束或执行的进程已退出(租约过期)时成功，
+        成功时清空之前的事件，新的执行从事件 1 开始
+        """
+        now = time.time()
+        with DBSession() as session:
+            rowcount = (
+                session.query(TaskStateModel)
+                .filter(
+                    TaskStateModel.task_id == task_id,
+                    or_(
+                        TaskStateModel.worker_id == worker_id,
+                        TaskStateModel.status.in_(FINISHED_TASK_STATUS),
+                        TaskStateModel.lease_expires < now,
+                    ),
+                )
+                .update(
+                    {
+                        TaskStateModel.worker_id: worker_id,
+                        TaskStateModel.status: "waiting",
+                        TaskStateModel.lease_expires: now + lease_seconds,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if rowcount == 0:
+                if session.get(TaskStateModel, task_id) is not None:
+                    return False  # 其他进程正在执行
+                session.add(
+                    TaskStateModel(
+                        task_id=task_id,
+                        worker_id=worker_id,
+                        status="waiting",
+                        lease_expires=now + lease_seconds,
+                    )
+                )
+                try:
+                    session.flush()
+                except IntegrityError:
+                    return False  # 其他进程抢先登记
+            session.query(TaskEventModel).filter(
+                TaskEventModel.task_id == task_id
+            ).delete(synchronize_session=False)
+            session.query(TaskCancelModel).filter(
+                TaskCancelModel.task_id == task_id
+            ).delete(synchronize_session=False)
+            session.commit()
+            return True
+
+    def renew_tasks(
+        self, task_ids: list[str], worker_id: str, lease_seconds: float
+    ) -> list[str]:
+        """
+        续约本进程正在执行的任务
+
+        Returns:
+            list[str]: 已被其他进程接管的任务
+        """
+        if not task_ids:
+            return []
+        with DBSession() as session:
+            query = session.query(TaskStateModel).filter(
+                TaskStateModel.task_id.in_(task_ids),
+                TaskStateModel.worker_id == worker_id,
+            )
+            query.update(
+                {TaskStateModel.lease_expires: time.time() + lease_seconds},
+                synchronize_session=False,
+            )
+            owned = {row.task_id for row in query.with_entities(TaskStateModel.task_id)}
+            session.commit()
+        return [task_id for task_id in task_ids if task_id not in owned]
+
+    def set_status(self, task_id: str, worker_id: str, status: str) -> bool:
+        """更新任务状态，任务结束时租约立即到期"""
+        values = {TaskStateModel.status: status}
+        if status in FINISHED_TASK_STATUS:
+            values[TaskStateModel.lease_expires] = time.time()
+        with DBSession() as session:
+            rowcount = (
+                session.query(TaskStateModel)
+                .filter(
+                    TaskStateModel.task_id == task_id,
+                    TaskStateModel.worker_id == worker_id,
+                )
+                .update(values, synchronize_session=False)
+            )
+            session.commit()
+            return rowcount == 1
+
+    def request_cancel(self, task_id: str) -> bool:
+        """请求执行任务的进程取消任务，任务不存在或已结束时返回 False"""
+        with DBSession() as session:
+            state = session.get(TaskStateModel, task_id)
+            if state is None or state.status in FINISHED_TASK_STATUS:
+                return False
+            if session.get(TaskCancelModel, task_id) is None:
+                session.add(TaskCancelModel(task_id=task_id, requested_at=time.time()))
+                try:
+                    session.commit()
+                except IntegrityError:
+                    pass  # 其他进程已请求取消
+            return True
+
+    def list_cancel_requests(self, task_ids: list[str]) -> list[str]:
+        """task_ids 中被其他进程请求取消的任务"""
+        if not task_ids:
+            return []
+        with DBSession() as session:
+            return [
+                row.task_id
+                for row in session.query(TaskCancelModel.task_id).filter(
+                    TaskCancelModel.task_id.in_(task_ids)
+                )
+            ]
+
+    def get_state(self, task_id: str) -> Optional[TaskStateRecord]:
+        with DBSession() as session:
+            state = session.get(TaskStateModel, task_id)
+            if state is None:
+                return None
+            return TaskStateRecord(
+                task_id=state.task_id,
+                worker_id=state.worker_id,
+                status=state.status,
+                lease_expires=state.lease_expires,
+            )
+
+    def add_event(self, task_id: str, event_id: int, frame: str, keep: int) -> None:
+        """保存事件，只保留最近的 keep 条"""
+        with DBSession() as session:
+            session.add(TaskEventModel(task_id=task_id, event_id=event_id, frame=frame))
+            if event_id > keep:
+                session.query(TaskEventModel).filter(
+                    TaskEventModel.task_id == task_id,
+                    TaskEventModel.event_id <= event_id - keep,
+                ).delete(synchronize_session=False)
+            session.commit()
+
+    def list_events(
+        self, task_id: str, after_event_id: int = 0
+    ) -> list[tuple[int, str]]:
+        with DBSession() as session:
+            rows = (
+                session.query(TaskEventModel.event_id, TaskEventModel.frame)
+                .filter(
+                    TaskEventModel.task_id == task_id,
+                    TaskEventModel.event_id > after_event_id,
+                )
+                .order_by(TaskEventModel.event_id)
+                .all()
+            )
+            return [(row.event_id, row.frame) for row in rows]
+
+    def clean(self, before: float) -> int:
+        """删除租约在 before 之前到期的任务及其事件，返回删除的任务数"""
+        with DBSession() as session:
+            task_ids = [
+                row.task_id
+                for row in session.query(TaskStateModel.task_id).filter(
+                    TaskStateModel.lease_expires < before
+                )
+            ]
+            if task_ids:
+                session.query(TaskEventModel).filter(
+                    TaskEventModel.task_id.in_(task_ids)
+                ).delete(synchronize_session=False)
+                session.query(TaskCancelModel).filter(
+                    TaskCancelModel.task_id.in_(task_ids)
+                ).delete(synchronize_session=False)
+                session.query(TaskStateModel).filter(
+                    TaskStateModel.task_id.in_(task_ids),
+                    TaskStateModel.lease_expires < before,
+                ).delete(synchronize_session=False)
+            session.commit()
+            return len(task_ids)
+
+    def acquire_leader(self, name: str, worker_id: str, lease_seconds: float) -> bool:
+        """成为或继续作为 leader，当前 leader 的租约未过期时失败"""
+        now = time.time()
+        with DBSession() as session:
+            rowcount = (
+                session.query(LeaderLeaseModel)
+                .filter(
+                    LeaderLeaseModel.name == name,
+                    or_(
+                        LeaderLeaseModel.worker_id == worker_id,
+                        LeaderLeaseModel.lease_expires < now,
+                    ),
+                )
+                .update(
+                    {
+                        LeaderLeaseModel.worker_id: worker_id,
+                        LeaderLeaseModel.lease_expires: now + lease_seconds,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if rowcount == 1:
+                session.commit()
+                return True
+            if session.get(LeaderLeaseModel, name) is not None:
+                return False
+            session.add(
+                LeaderLeaseModel(
+                    name=name, worker_id=worker_id, lease_expires=now + lease_seconds
+                )
+            )
+            try:
+                session.commit()
+            except IntegrityError:
+                return False
+            return True
+
+    def release_leader(self, name: str, worker_id: str) -> None:
+        with DBSession() as session:
+            session.query(LeaderLeaseModel).filter(
+                LeaderLeaseModel.name == name,
+                LeaderLeaseModel.worker_id == worker_id,
+            ).delete(synchronize_session=False)
+            session.commit()
@@ -0,0 +1,13 @@
+from arxiv_hero.repositories.translation_batch_repository.protocol import (
+    TranslationBatchRecord,
+    BatchStatus,
+)
+from arxiv_hero.repositories.translation_batch_repository.repository import (
+    TranslationBatchRepository,
+)
+
+__all__ = [
+    "TranslationBatchRepository",
+    "TranslationBatchRecord",
+    "BatchStatus",
+]
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+BatchStatus = Literal["submitted", "completed", "failed"]
+
+
+class TranslationBatchRecord(BaseModel):
+    key: str
+    batch_id: str
+    status: BatchStatus
+    entry_ids: list[str]
+    error: Optional[str] = None
+    time_updated: datetime
@@ -0,0 +1,50 @@
+import json
+from typing import Optional
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.translation_batch import (
+    TranslationBatch as TranslationBatchModel,
+)
+from arxiv_hero.repositories.translation_batch_repository.protocol import (
+    BatchStatus,
+    TranslationBatchRecord,
+)
+
+
+class TranslationBatchRepository:
+    """记录提交到 batch 接口的翻译任务，进程中断后再次翻译相同的内容时，继续等待已提交的任务"""
+
+    @staticmethod
+    def _to_record(batch: TranslationBatchModel) -> TranslationBatchRecord:
+        return TranslationBatchRecord(
+            key=batch.key,
+            batch_id=batch.batch_id,
+            status=batch.status,
+            entry_ids=json.loads(batch.entry_ids),
+            error=batch.error,
+            time_updated=batch.time_updated,
+        )
+
+    def get_batch(self, key: str) -> Optional[TranslationBatchRecord]:
+        with DBSession() as session:
+            batch = session.get(TranslationBatchModel, key)
+            return self._to_record(batch) if batch else None
+
+    def save_batch(
+        self,
+        key: str,
+        batch_id: str,
+        status: BatchStatus,
+        entry_ids: list[str],
+        error: Optional[str] = None,
+    ) -> None:
+        with DBSession() as session:
+            batch = session.get(TranslationBatchModel, key)
+            if batch is None:
+                batch = TranslationBatchModel(key=key)
+                session.add(batch)
+            batch.batch_id = batch_id
+            batch.status = status
+            batch.entry_ids = json.dumps(entry_ids)
+            batch.error = error
+            session.commit()
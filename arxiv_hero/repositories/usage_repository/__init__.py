@@ -0,0 +1,13 @@
+from arxiv_hero.repositories.usage_repository.protocol import (
+    UsageKey,
+    UsageStats,
+    USAGE_GROUP_FIELDS,
+)
+from arxiv_hero.repositories.usage_repository.repository import UsageRepository
+
+__all__ = [
+    "UsageRepository",
+    "UsageKey",
+    "UsageStats",
+    "USAGE_GROUP_FIELDS",
+]
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+# 可以用于分组统计的字段
+USAGE_GROUP_FIELDS = ("date", "entry_id", "type", "job", "endpoint", "model")
+
+
+# 按 USAGE_GROUP_FIELDS 的顺序：(日期 YYYY-MM-DD, 文章, 段落类型, 任务, 端点, 模型)
+UsageKey = tuple[str, str, str, str, str, str]
+
+
+class UsageStats(BaseModel):
+    # 分组的字段，不按该字段分组时为 None
+    date: Optional[str] = None
+    entry_id: Optional[str] = None
+    type: Optional[str] = None
+    job: Optional[str] = None
+    endpoint: Optional[str] = None
+    model: Optional[str] = None
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0
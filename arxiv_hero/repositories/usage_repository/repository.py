@@ -0,0 +1,83 @@
+from typing import Optional
+
+from sqlalchemy import desc
+from sqlalchemy.sql import func
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.llm_usage import LLMUsage as LLMUsageModel
+from arxiv_hero.repositories.usage_repository.protocol import (
+    USAGE_GROUP_FIELDS,
+    UsageKey,
+    UsageStats,
+)
+
+
+class UsageRepository:
+    """按 (日期, 文章, 段落类型, 任务, 端点, 模型) 累计大模型的用量"""
+
+    def add_usages(self, usages: dict[UsageKey, UsageStats]) -> None:
+        """累加用量，usages 的值中只使用 requests、tokens 和 cost"""
+        if not usages:
+            return
+
+        with DBSession() as session:
+            for key, stats in usages.items():
+                usage = session.get(LLMUsageModel, key)
+                if usage is None:
+                    usage = LLMUsageModel(
+                        **dict(zip(USAGE_GROUP_FIELDS, key)),
+                        requests=0,
+                        prompt_tokens=0,
+                        completion_tokens=0,
+                        cost=0,
+                    )
+                    session.add(usage)
+                usage.requests += stats.requests
+                usage.prompt_tokens += stats.prompt_tokens
+                usage.completion_tokens += stats.completion_tokens
+                usage.cost += stats.cost
+            session.commit()
+
+    def get_usage_stats(
+        self,
+        start_date: str,
+        end_date: str,
+        entry_id: Optional[str] = None,
+        group_by: tuple[str, ...] = ("date",),
+    ) -> list[UsageStats]:
+        """
+        统计 [start_date, end_date] 之间的用量
+
+        Args:
+            start_date: 开始日期，YYYY-MM-DD
+            end_date: 结束日期，YYYY-MM-DD
+            entry_id: 只统计该文章的用量
+            group_by: 分组的字段，见 USAGE_GROUP_FIELDS
+
+        Returns:
+            list[UsageStats]: 各组的用量，按花费从高到低排序
+        """
+        for field in group_by:
+            if field not in USAGE_GROUP_FIELDS:
+                raise ValueError(f"不支持按 {field} 分组")
+
+        columns = [getattr(LLMUsageModel, field) for field in group_by]
+        with DBSession() as session:
+            query = session.query(
+                *columns,
+                func.sum(LLMUsageModel.requests).label("requests"),
+                func.sum(LLMUsageModel.prompt_tokens).label("prompt_tokens"),
+                func.sum(LLMUsageModel.completion_tokens).label("completion_tokens"),
+                func.sum(LLMUsageModel.cost).label("cost"),
+            ).filter(
+                LLMUsageModel.date >= start_date,
+                LLMUsageModel.date <= end_date,
+            )
+            if entry_id is not None:
+                query = query.filter(LLMUsageModel.entry_id == entry_id)
+            rows = (
+                query.group_by(*columns)
+                .order_by(desc("cost"), desc("prompt_tokens"))
+                .all()
+            )
+            return [UsageStats(**row._asdict()) for row in rows]
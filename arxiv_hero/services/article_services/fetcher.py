@@ -1,10 +1,22 @@
-from typing import Callable
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
 from datetime import datetime, timedelta
 
 import arxiv
 
 from arxiv_hero import logger
 from arxiv_hero.config import get_config
+from arxiv_hero.utils.cancel_utils import (
+    CancelToken,
+    CancelledError,
+    get_cancel_token,
+    use_cancel_token,
+)
+from arxiv_hero.repositories.fetch_checkpoint_repository import (
+    FetchCheckpointRepository,
+)
 from arxiv_hero.repositories.article_repository.protocol import (
     Article,
     Author,
@@ -21,12 +33,19 @@ class ArticleFetcher:
     def __init__(self):
         self.translator = Translator()
         self.respository = ArticleRepository()
+        self.checkpoints = FetchCheckpointRepository()
 
         self.client = arxiv.Client(delay_seconds=15)
+        # arxiv 的接口有频率限制，并行补抓多天时，只并行翻译，获取文章依次进行
+        self._client_lock = threading.Lock()
+
+    @staticmethod
+    def _get_entry_id(article: arxiv.Result) -> str:
+        return article.entry_id.rsplit("/", 1)[-1]
 
     def _convert_result_to_pydantic(self, article: arxiv.Result) -> Article:
         return Article(
-            entry_id=article.entry_id.rsplit("/", 1)[-1],
+            entry_id=self._get_entry_id(article),
             updated=article.updated,
             published=article.published,
             title=article.title,
@@ -53,6 +72,7 @@ class ArticleFetcher:
         self,
         category: str,
         date: datetime = None,
+        exclude_entry_ids: set[str] = None,
     ) -> QueryResult:
         """
         获取指定类别的文章
@@ -60,6 +80,7 @@ class ArticleFetcher:
         Args:
             category: 类别
             date: 搜索的日期，默认为None，表示当天时间
+            exclude_entry_ids: 跳过的文章，如已在其他类别中获取的交叉列出的文章
 
         Returns:
             QueryResult: 查询结果，包括文章列表和总数
@@ -73,8 +94,14 @@ class ArticleFetcher:
             sort_by=arxiv.SortCriterion.SubmittedDate,
             sort_order=arxiv.SortOrder.Descending,
         )
-        results = self.client.results(search)
-        aritcles = [self._convert_result_to_pydantic(article) for article in results]
+        with self._client_lock:
+            results = list(self.client.results(search))
+        exclude_entry_ids = exclude_entry_ids or set()
+        aritcles = [
+            self._convert_result_to_pydantic(article)
+            for article in results
+            if self._get_entry_id(article) not in exclude_entry_ids
+        ]
         if self.config.only_primary:  # 只获取主要类别
             aritcles = [
                 article for article in aritcles if article.primary_category == category
@@ -94,7 +121,8 @@ class ArticleFetcher:
         Returns:
             QueryResult: 查询结果，包括文章列表和总数
         """
-        results = self.client.results(arxiv.Search(id_list=entry_ids))
+        with self._client_lock:
+            results = list(self.client.results(arxiv.Search(id_list=entry_ids)))
         aritcles = [self._convert_result_to_pydantic(article) for article in results]
         return QueryResult(articles=aritcles, total_nums=len(aritcles))
 
@@ -103,7 +131,10 @@ class ArticleFetcher:
         *,
         date: datetime = None,
         entry_ids: list[str] = None,
+        categories: list[str] = None,
         callback: Callable[[str, dict, float], None] = None,
+        cancel_token: Optional[CancelToken] = None,
+        batch: bool = False,
     ) -> QueryResult:
         """
         获取并翻译文章的标题和摘要
@@ -111,12 +142,16 @@ class ArticleFetcher:
         Args:
             date: 搜索的日期，默认为None
             entry_ids: 文章ID列表，默认为None
+            categories: 按日期搜索时的类别，默认为配置中的全部类别
             callback: 进度回调函数，输入参数依次为：描述信息、数据和进度百分比
+            cancel_token: 取消令牌，默认使用当前上下文中的令牌，每个类别、每组翻译前检查一次
+            batch: 是否通过 batch 接口离线翻译。文章先保存再翻译，中断后再次执行时，
+                继续等待已提交的任务，并翻译已保存但未翻译完成的文章
 
         Returns:
             QueryResult: 翻译后的文章列表和总数
         """
-        trans_fail_nums = 0  # 翻译失败的文章数
+        cancel_token = cancel_token or get_cancel_token() or CancelToken()
 
         if not date and not entry_ids:
             raise ValueError("date or entry_ids must be provided")
@@ -129,14 +164,19 @@ class ArticleFetcher:
                 0,
             )
 
-        query_articles = []
+        # k:entry_id v:文章，交叉列出在多个类别中的文章只保留一份
+        query_articles: dict[str, Article] = {}
         if date:
-            for category in self.config.categories:
-                query_articles.extend(
-                    self.fetch_articles_by_category(category, date).articles
-                )
+            for category in categories or self.config.categories:
+                cancel_token.raise_if_cancelled()
+                for article in self.fetch_articles_by_category(
+                    category, date, exclude_entry_ids=set(query_articles)
+                ).articles:
+                    query_articles.setdefault(article.entry_id, article)
         else:
-            query_articles = self.fetch_articles_by_entry_ids(entry_ids).articles
+            for article in self.fetch_articles_by_entry_ids(entry_ids).articles:
+                query_articles.setdefault(article.entry_id, article)
+        query_articles = list(query_articles.values())
 
         if callback:
             callback(
@@ -146,14 +186,10 @@ class ArticleFetcher:
             )
 
         # 去除已在数据库中的文章
-        exist_entry_ids = set(
-            [
-                article.entry_id
-                for article in self.respository.get_articles_by_entry_ids(
-                    [article.entry_id for article in query_articles]
-                )
-            ]
+        exist_articles = self.respository.get_articles_by_entry_ids(
+            [article.entry_id for article in query_articles]
         )
+        exist_entry_ids = set([article.entry_id for article in exist_articles])
 
         articles = [
             article
@@ -161,35 +197,20 @@ class ArticleFetcher:
             if article.entry_id not in exist_entry_ids
         ]
 
-        # 分组翻译
-        max_workers = self.translator.config.max_workers
-        article_groups = [
-            articles[i : i + max_workers] for i in range(0, len(articles), max_workers)
-        ]
-        for i, article_group in enumerate(article_groups):
-            zh_titles = self.translator.batch_translate_titles(
-                [article.title for article in article_group]
+        if batch:
+            # 已保存但未翻译完成的文章，如上次离线翻译中断
+            untranslated = [
+                article
+                for article in exist_articles
+                if not article.zh_title or not article.zh_summary
+            ]
+            trans_fail_nums = self._batch_translate(
+                articles, untranslated, callback, cancel_token
             )
-            zh_abstracts = self.translator.batch_translate_abstracts(
-                [article.summary for article in article_group]
+        else:
+            trans_fail_nums = self._translate_in_groups(
+                articles, callback, cancel_token
             )
-            for article, zh_title, zh_abstract in zip(
-                article_group, zh_titles, zh_abstracts
-            ):
-                article.zh_title = zh_title
-                article.zh_summary = zh_abstract
-                if not zh_title or not zh_abstract:
-                    trans_fail_nums += 1
-
-            # 批量保存
-            self.respository.create_articles(article_group)
-            if callback and i < len(article_groups) - 1:
-                callback(
-                    f" 第 {i+1} / {len(article_groups)} 组翻译完成，正在翻译下一组... ",
-                    None,
-                    (0.2 + ((i + 1) / len(article_groups)) * 0.8)
-                    / len(self.config.categories),
-                )  # 翻译完成，group的进度从1开始
 
         # 更新进度
         if callback:
@@ -218,3 +239,197 @@ class ArticleFetcher:
             [article.entry_id for article in query_articles]
         )
         return QueryResult(articles=articles, total_nums=len(articles))
+
+    def _translate_in_groups(
+        self,
+        articles: list[Article],
+        callback: Callable[[str, dict, float], None],
+        cancel_token: CancelToken,
+    ) -> int:
+        """分组翻译并保存文章，返回翻译失败的文章数"""
+        trans_fail_nums = 0
+        max_workers = self.translator.config.max_workers
+        article_groups = [
+            articles[i : i + max_workers] for i in range(0, len(articles), max_workers)
+        ]
+        for i, article_group in enumerate(article_groups):
+            cancel_token.raise_if_cancelled()
+            with use_cancel_token(cancel_token):  # 传递给 parallel_func 的各个线程
+                entry_ids = [article.entry_id for article in article_group]
+                zh_titles = self.translator.batch_translate_titles(
+                    [article.title for article in article_group], entry_ids=entry_ids
+                )
+                zh_abstracts = self.translator.batch_translate_abstracts(
+                    [article.summary for article in article_group],
+                    entry_ids=entry_ids,
+                )
+            for article, zh_title, zh_abstract in zip(
+                article_group, zh_titles, zh_abstracts
+            ):
+                article.zh_title = zh_title
+                article.zh_summary = zh_abstract
+                if not zh_title or not zh_abstract:
+                    trans_fail_nums += 1
+
+            # 批量保存
+            self.respository.create_articles(article_group)
+            if callback and i < len(article_groups) - 1:
+                callback(
+                    f" 第 {i+1} / {len(article_groups)} 组翻译完成，正在翻译下一组... ",
+                    None,
+                    (0.2 + ((i + 1) / len(article_groups)) * 0.8)
+                    / len(self.config.categories),
+                )  # 翻译完成，group的进度从1开始
+        return trans_fail_nums
+
+    def _batch_translate(
+        self,
+        articles: list[Article],
+        untranslated: list[Article],
+        callback: Callable[[str, dict, float], None],
+        cancel_token: CancelToken,
+    ) -> int:
+        """先保存新文章，再通过 batch 接口翻译并批量更新，返回翻译失败的文章数"""
+        self.respository.create_articles(articles)
+        articles = articles + untranslated
+        if callback and articles:
+            callback(
+                f" 已保存{len(articles)}篇文章，等待离线翻译完成... ",
+                None,
+                0.3,
+            )
+        translations = self.translator.batch_translate_articles(
+            articles, cancel_token=cancel_token
+        )
+        self.respository.bulk_update_translations(translations)
+        return sum(
+            1
+            for zh_title, zh_summary in translations.values()
+            if not zh_title or not zh_summary
+        )
+
+    def fetch_day(
+        self,
+        date: datetime,
+        cancel_token: Optional[CancelToken] = None,
+        batch: bool = False,
+    ) -> tuple[int, int]:
+        """
+        按类别获取并翻译一天的文章，每个类别完成后记录检查点，已完成的类别跳过
+
+        Args:
+            date: 搜索的日期
+            cancel_token: 取消令牌，默认使用当前上下文中的令牌
+            batch: 是否通过 batch 接口离线翻译
+
+        Returns:
+            tuple[int, int]: 获取的文章数和失败的类别数
+        """
+        cancel_token = cancel_token or get_cancel_token() or CancelToken()
+        day = date.strftime("%Y-%m-%d")
+        completed = self.checkpoints.get_completed_categories(day)
+
+        article_nums, fail_nums = 0, 0
+        for category in self.config.categories:
+            if category in completed:
+                continue
+            cancel_token.raise_if_cancelled()
+            try:
+                result = self.fetch_and_translate(
+                    date=date,
+                    categories=[category],
+                    cancel_token=cancel_token,
+                    batch=batch,
+                )
+            except CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"获取 {day} {category} 的文章失败：{e}")
+                self.checkpoints.save_checkpoint(day, category, "error", error=str(e))
+                fail_nums += 1
+                continue
+            self.checkpoints.save_checkpoint(
+                day, category, "completed", article_nums=result.total_nums
+            )
+            article_nums += result.total_nums
+        return article_nums, fail_nums
+
+    def backfill(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        max_parallel_days: int = 2,
+        retry_days: int = 7,
+        callback: Callable[[str, dict, float], None] = None,
+        cancel_token: Optional[CancelToken] = None,
+        batch: bool = False,
+    ) -> int:
+        """
+        补抓 [start_date, end_date] 之间每一天的文章，最多同时处理 max_parallel_days 天。
+
+        按 (日期, 类别) 记录检查点，中途失败后再次执行时，只处理未完成的部分；
+        end_date 之前 retry_days 天内失败的 (日期, 类别) 也会重试。
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            max_parallel_days: 同时处理的天数
+            retry_days: 重试最近多少天内失败的部分
+            callback: 进度回调函数
+            cancel_token: 取消令牌，默认使用当前上下文中的令牌
+            batch: 是否通过 batch 接口离线翻译
+
+        Returns:
+            int: 获取的文章数
+        """
+        cancel_token = cancel_token or get_cancel_token() or CancelToken()
+        days = {}
+        date = start_date
+        while date.date() <= end_date.date():
+            days[date.strftime("%Y-%m-%d")] = date
+            date += timedelta(days=1)
+        since = (end_date - timedelta(days=retry_days)).strftime("%Y-%m-%d")
+        for day in self.checkpoints.get_failed_dates(since):
+            days.setdefault(
+                day, datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=end_date.tzinfo)
+            )
+        if not days:
+            return 0
+
+        # 某一天出错时停止其他日期，但不取消调用方的令牌
+        stop_token = CancelToken()
+        unregister = cancel_token.register(stop_token.cancel)
+        article_nums, fail_nums, finished = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=max(max_parallel_days, 1)) as executor:
+            futures_map = {
+                executor.submit(
+                    contextvars.copy_context().run,  # 传递大模型任务等上下文变量
+                    self.fetch_day,
+                    date,
+                    stop_token,
+                    batch,
+                ): day
+                for day, date in sorted(days.items())
+            }
+            try:
+                for future in as_completed(futures_map):
+                    nums, fails = future.result()
+                    article_nums += nums
+                    fail_nums += fails
+                    finished += 1
+                    if callback:
+                        callback(
+                            f"{futures_map[future]} 获取完成，{nums} 篇",
+                            None,
+                            finished / len(futures_map),
+                        )
+            except BaseException:
+                stop_token.cancel()
+                raise
+            finally:
+                unregister()
+
+        logger.info(
+            f"补抓 {len(days)} 天的文章完成，共 {article_nums} 篇，失败 {fail_nums} 个类别"
+        )
+        return article_nums
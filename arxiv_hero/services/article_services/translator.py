@@ -1,81 +1,118 @@
-import re
+import json
+import hashlib
+from typing import Callable, Optional
+
+from openai.types import CompletionUsage
 
 from arxiv_hero import logger
 from arxiv_hero.config import get_config
-from arxiv_hero.utils.chat_utils import chat
+from arxiv_hero.utils.cancel_utils import CancelToken, get_cancel_token
+from arxiv_hero.utils.chat_utils import TruncatedError, chat, get_route
 from arxiv_hero.utils.parallel_utils import parallel_func
+from arxiv_hero.utils.translate_utils import (
+    STOP_SEQUENCES,
+    match_zh_translated,
+    max_tokens_for,
+    prefill_message,
+)
+from arxiv_hero.utils.usage_utils import use_usage_scope
+from arxiv_hero.repositories.article_repository.protocol import Article
+from arxiv_hero.repositories.translation_batch_repository import (
+    TranslationBatchRepository,
+)
 from arxiv_hero.services.article_services.prompts import (
     title_system_prompt,
     abstract_system_prompt,
     user_template,
 )
 
+# batch 任务的终止状态，其中只有 completed 表示全部请求都已处理
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
 
 class Translator(object):
     config = get_config().translate
 
-    @staticmethod
-    def _match_zh_translated(text: str) -> str | None:
-        match = re.search(r"<Chinese>(.*?)</Chinese>", text, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        return None
+    def __init__(self):
+        self.batches = TranslationBatchRepository()
 
-    def translate_title(
-        self, title: str, max_retries: int = config.max_retries
+    @classmethod
+    def _match_zh_translated(cls, text: str) -> str | None:
+        return match_zh_translated(text, cls.config.prefill)
+
+    @classmethod
+    def _build_messages(cls, system_prompt: str, content: str) -> list[dict]:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_template.format(content=content)},
+        ]
+        if cls.config.prefill:
+            messages.append(prefill_message())
+        return messages
+
+    def _translate(
+        self, system_prompt: str, content: str, kind: str, max_retries: int
     ) -> str | None:
-        retries = 0
-
-        while retries < max_retries:
-            response = chat(
-                messages=[
-                    {"role": "system", "content": title_system_prompt},
-                    {"role": "user", "content": user_template.format(content=title)},
-                ]
-            )
-            zh_title = self._match_zh_translated(response)
-            if zh_title:
-                return zh_title.strip()
+        """翻译并匹配译文，输出被 max_tokens 截断时加倍上限重试"""
+        max_tokens = max_tokens_for(content, self.config)
+
+        for _ in range(max_retries):
+            try:
+                response = chat(
+                    messages=self._build_messages(system_prompt, content),
+                    kind=kind,
+                    max_tokens=max_tokens,
+                    stop=STOP_SEQUENCES,
+                    temperature=self.config.temperature,
+                )
+            except TruncatedError as e:
+                logger.warning(f"{e}，加大上限重试：\n输入：{content}")
+                max_tokens *= 2
+                continue
+            zh_content = self._match_zh_translated(response)
+            if zh_content:
+                return zh_content
 
             logger.warning(
-                f"\n-------\n没有匹配到中文翻译结果：\n输入：{title}\n输出：{response}\n-------"
+                f"\n-------\n没有匹配到中文翻译结果：\n输入：{content}\n输出：{response}\n-------"
             )
-            retries += 1
 
         return None
 
+    def translate_title(
+        self, title: str, max_retries: int = config.max_retries
+    ) -> str | None:
+        return self._translate(title_system_prompt, title, "title", max_retries)
+
     def translate_abstract(
         self, abstract: str, max_retries: int = config.max_retries
     ) -> str | None:
-        retries = 0
-
-        while retries < max_retries:
-            response = chat(
-                messages=[
-                    {"role": "system", "content": abstract_system_prompt},
-                    {"role": "user", "content": user_template.format(content=abstract)},
-                ]
-            )
-            zh_abstract = self._match_zh_translated(response)
-            if zh_abstract:
-                return zh_abstract.strip()
+        return self._translate(
+            abstract_system_prompt, abstract, "abstract", max_retries
+        )
 
-            logger.warning(
-                f"\n-------\n没有匹配到中文翻译结果：\n输入：{abstract}\n输出：{response}\n-------"
-            )
-            retries += 1
+    @staticmethod
+    def _with_usage_scope(
+        func: Callable[[str], str | None],
+    ) -> Callable[[str, Optional[str]], str | None]:
+        """翻译时将用量记录到 entry_id 对应的文章"""
 
-        return None
+        def wrapper(content: str, entry_id: Optional[str] = None) -> str | None:
+            with use_usage_scope(entry_id=entry_id):
+                return func(content)
+
+        return wrapper
 
     def batch_translate_titles(
         self,
         titles: list[str],
         max_workers: int = config.max_workers,
+        entry_ids: list[str] = None,
     ) -> list[str | None]:
-        """并行翻译多个标题"""
+        """并行翻译多个标题，entry_ids 为对应文章的 ID，用于统计用量"""
         return parallel_func(
-            self.translate_title,
-            [(title,) for title in titles],
+            self._with_usage_scope(self.translate_title),
+            list(zip(titles, entry_ids or [None] * len(titles))),
             max_workers=max_workers,
         )
 
@@ -83,10 +120,167 @@ class Translator(object):
         self,
         abstracts: list[str],
         max_workers: int = config.max_workers,
+        entry_ids: list[str] = None,
     ) -> list[str | None]:
-        """并行翻译多个摘要"""
+        """并行翻译多个摘要，entry_ids 为对应文章的 ID，用于统计用量"""
         return parallel_func(
-            self.translate_abstract,
-            [(abstract,) for abstract in abstracts],
+            self._with_usage_scope(self.translate_abstract),
+            list(zip(abstracts, entry_ids or [None] * len(abstracts))),
             max_workers=max_workers,
         )
+
+    def batch_translate_articles(
+        self,
+        articles: list[Article],
+        poll_interval: float = config.batch_poll_interval,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> dict[str, tuple[str | None, str | None]]:
+        """
+        通过 openai 兼容的 batch 接口离线翻译文章的标题和摘要
+
+        标题和摘要的请求写入一个 JSONL 文件，上传后提交 batch 任务，轮询直到任务结束。
+        提交的任务按请求内容记录在数据库中，进程中断后再次翻译相同的文章时，
+        继续等待已提交的任务，不会重复提交。batch 中失败或没有匹配到译文的请求，
+        改为逐个调用大模型翻译。
+
+        Args:
+            articles: 需要翻译的文章
+            poll_interval: 轮询 batch 任务状态的间隔，单位是秒
+            cancel_token: 取消令牌，默认使用当前上下文中的令牌，只停止等待，不取消已提交的任务
+
+        Returns:
+            dict[str, tuple[str | None, str | None]]: k:entry_id v:(中文标题, 中文摘要)
+        """
+        if not articles:
+            return {}
+        cancel_token = cancel_token or get_cancel_token() or CancelToken()
+        endpoint = get_route("abstract")[0]
+        requests = {}  # k:custom_id v:请求体
+        sources = {}  # k:custom_id v:(提示词类型, 原文, entry_id)，用于逐个重新翻译
+        for article in articles:
+            for kind, system_prompt, content in (
+                ("title", title_system_prompt, article.title),
+                ("abstract", abstract_system_prompt, article.summary),
+            ):
+                sources[f"{article.entry_id}/{kind}"] = (
+                    kind,
+                    content,
+                    article.entry_id,
+                )
+                requests[f"{article.entry_id}/{kind}"] = {
+                    "model": endpoint.model,
+                    "messages": self._build_messages(system_prompt, content),
+                    "temperature": self.config.temperature,
+                    "stop": STOP_SEQUENCES,
+                }
+                max_tokens = max_tokens_for(content, self.config)
+                if max_tokens is not None:
+                    requests[f"{article.entry_id}/{kind}"]["max_tokens"] = max_tokens
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
+                },
+                ensure_ascii=False,
+            )
+            for custom_id, body in requests.items()
+        ]
+        entry_ids = [article.entry_id for article in articles]
+        key = hashlib.sha256(
+            "\n".join([endpoint.model, *sorted(lines)]).encode()
+        ).hexdigest()
+
+        record = self.batches.get_batch(key)
+        if record and record.status != "failed":
+            batch_id = record.batch_id
+            logger.info(f"继续等待已提交的翻译任务 {batch_id}，共 {len(articles)} 篇")
+        else:
+            input_file = endpoint.client.files.create(
+                file=(f"{key}.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch_id = endpoint.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window=self.config.batch_completion_window,
+            ).id
+            self.batches.save_batch(key, batch_id, "submitted", entry_ids)
+            logger.info(f"已提交翻译任务 {batch_id}，共 {len(articles)} 篇")
+
+        while True:
+            batch = endpoint.client.batches.retrieve(batch_id)
+            if batch.status in BATCH_FINAL_STATUSES:
+                break
+            cancel_token.wait(poll_interval)
+            cancel_token.raise_if_cancelled()
+
+        # 过期或取消的任务可能已完成一部分请求；已读取过的结果不再重复记录用量
+        count_usage = not (record and record.status == "completed")
+        responses = {}
+        if batch.output_file_id:
+            for line in endpoint.client.files.content(
+                batch.output_file_id
+            ).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                entry_id, kind = result["custom_id"].rsplit("/", 1)
+                if count_usage and response["body"].get("usage"):
+                    with use_usage_scope(entry_id=entry_id):
+                        endpoint.record_usage(
+                            CompletionUsage.model_validate(response["body"]["usage"]),
+                            kind,
+                        )
+                choice = response["body"]["choices"][0]
+                if choice.get("finish_reason") == "length":
+                    continue  # 被截断的译文改为逐个翻译
+                zh_content = self._match_zh_translated(
+                    choice["message"]["content"] or ""
+                )
+                if zh_content:
+                    responses[result["custom_id"]] = zh_content
+        error = None
+        if batch.status != "completed":
+            error = f"batch 任务结束状态为 {batch.status}"
+        self.batches.save_batch(
+            key, batch_id, "completed" if error is None else "failed", entry_ids, error
+        )
+
+        missing = [custom_id for custom_id in requests if custom_id not in responses]
+        if missing:
+            logger.warning(
+                f"翻译任务 {batch_id} 中 {len(missing)} / {len(requests)} 个请求失败，逐个重新翻译"
+            )
+            translate_funcs = {
+                "title": self._with_usage_scope(self.translate_title),
+                "abstract": self._with_usage_scope(self.translate_abstract),
+            }
+            results = parallel_func(
+                lambda kind, content, entry_id: translate_funcs[kind](
+                    content, entry_id
+                ),
+                [sources[custom_id] for custom_id in missing],
+                max_workers=self.config.max_workers,
+                cancel_token=cancel_token,
+            )
+            responses.update(
+                {
+                    custom_id: result
+                    for custom_id, result in zip(missing, results)
+                    if result
+                }
+            )
+
+        return {
+            entry_id: (
+                responses.get(f"{entry_id}/title"),
+                responses.get(f"{entry_id}/abstract"),
+            )
+            for entry_id in entry_ids
+        }
@@ -0,0 +1,105 @@
+import re
+from typing import Literal, Optional
+
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+from arxiv_hero.services.content_services.masking import MASK_PATTERN
+from arxiv_hero.services.content_services import utils
+
+# translate: 翻译全文；copy: 不翻译，原样展示；caption: 只翻译图表的标题
+Action = Literal["translate", "copy", "caption"]
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+LATEX_COMMAND_PATTERN = re.compile(r"\\[a-zA-Z]+\*?")
+WORD_PATTERN = re.compile(r"[A-Za-z]{2,}")
+# 连续 4 个以上的单词，视为自然语言的句子，代码中很少出现
+PROSE_PATTERN = re.compile(r"(?:[A-Za-z]{2,}[,;:.]?[ \t]+){3}[A-Za-z]{2,}")
+AFFILIATION_PATTERN = re.compile(
+    r"\b(?:University|Institute|Department|Dept\.|School of|College|Laboratory|Lab|"
+    r"Academy|Inc\.|Ltd\.|Corporation|Research Center)\b"
+)
+# 图表的标题，由 LatexParser 生成，如 `**Figure 1**: xxx`
+CAPTION_PATTERN = re.compile(
+    r"^\*\*(?P<label>Figure|Table) (?P<order>[^*]*)\*\*: ?(?P<caption>.*)$",
+    re.MULTILINE,
+)
+CAPTION_LABELS = {"Figure": "图", "Table": "表"}
+
+MIN_WORDS = 3  # 少于该单词数的段落不翻译
+MAX_AFFILIATION_WORDS = 30  # 作者单位一般较短
+MIN_PROSE_RATIO = 0.3  # 代码块、表格中包含句子的行的比例，低于该比例时不翻译
+
+
+def _strip(text: str) -> str:
+    """去除公式、引用、链接、html 标签和 latex 命令，只保留可能需要翻译的文字"""
+    text = MASK_PATTERN.sub(" ", text)
+    text = URL_PATTERN.sub(" ", text)
+    text = EMAIL_PATTERN.sub(" ", text)
+    text = HTML_TAG_PATTERN.sub(" ", text)
+    return LATEX_COMMAND_PATTERN.sub(" ", text)
+
+
+def count_words(text: str) -> int:
+    return len(WORD_PATTERN.findall(_strip(text)))
+
+
+def prose_ratio(text: str) -> float:
+    """包含句子的行占非空行的比例"""
+    lines = [line for line in _strip(text).splitlines() if line.strip()]
+    if not lines:
+        return 0.0
+    return sum(1 for line in lines if PROSE_PATTERN.search(line)) / len(lines)
+
+
+def is_affiliation(text: str) -> bool:
+    """作者单位、邮箱等信息"""
+    if len(text.split()) > MAX_AFFILIATION_WORDS:
+        return False
+    if EMAIL_PATTERN.search(text):
+        return True
+    return bool(AFFILIATION_PATTERN.search(text)) and not text.rstrip().endswith(".")
+
+
+def find_caption(text: str) -> Optional[re.Match]:
+    return CAPTION_PATTERN.search(text)
+
+
+def classify_paragraph(paragraph: LatexPagagraph) -> Action:
+    """
+    按规则判断段落是否需要翻译
+
+    - text: 纯公式、纯链接、锚点、数字表格和作者单位等不翻译；
+    - title: 有单词时翻译；
+    - figure: 只翻译标题，图片路径不需要翻译；
+    - table: 表格中有句子时翻译全文，否则只翻译标题；
+    - latex: 有标题(如算法)或句子时翻译，代码等不翻译；
+    - 其他类型(公式、参考文献等)不翻译。
+    """
+    text = paragraph.text or ""
+    if not text.strip() or utils.is_all_digits(text):
+        return "copy"
+
+    if paragraph.type == "text":
+        if "<div" in text:
+            return "copy"
+        if count_words(text) < MIN_WORDS or is_affiliation(text):
+            return "copy"
+        return "translate"
+    if paragraph.type == "title":
+        return "translate" if count_words(text) > 0 else "copy"
+    if paragraph.type == "figure":
+        if find_caption(text):
+            return "caption"
+        return "translate" if count_words(text) >= MIN_WORDS else "copy"
+    if paragraph.type == "table":
+        match = find_caption(text)
+        body = text[: match.start()] + text[match.end() :] if match else text
+        if prose_ratio(body) >= MIN_PROSE_RATIO:
+            return "translate"
+        return "caption" if match else "copy"
+    if paragraph.type == "latex":
+        if "\\caption" in text or prose_ratio(text) >= MIN_PROSE_RATIO:
+            return "translate"
+        return "copy"
+    return "copy"
@@ -0,0 +1,165 @@
+import os
+import gzip
+import glob
+import threading
+from typing import Callable, Literal, Optional
+
+import pypandoc
+
+from arxiv_hero import logger
+from arxiv_hero.config import get_config
+from arxiv_hero.repositories.content_repository import ContentRepository
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+from arxiv_hero.services.content_services.protocol import ExportFile
+from arxiv_hero.services.content_services import utils
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只生成 gzip
+    brotli = None
+
+EXPORT_DIR = "export"
+MEDIA_TYPES = {
+    "md": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
+
+class ContentExporter:
+    """
+    导出文章的 markdown/html，并按内容版本缓存在 `{download_dir}/{entry_id}/export` 中。
+
+    版本号由 `ContentRepository.get_content_version` 计算，段落翻译或重新解析后自动失效；
+    每个版本同时保存 gzip(以及 brotli) 预压缩文件，重复请求直接返回文件。
+    """
+
+    def __init__(self, repository: Optional[ContentRepository] = None):
+        self.config = get_config().arxiv
+        self.repository = repository or ContentRepository()
+        self._lock = threading.Lock()
+        self._export_locks: dict[str, threading.Lock] = {}
+
+    @property
+    def encodings(self) -> list[str]:
+        return ["br", "gzip"] if brotli else ["gzip"]
+
+    def get_version(self, entry_id: str) -> str:
+        return self.repository.get_content_version(entry_id)
+
+    def _get_export_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._export_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def render_markdown(
+        entry_id: str,
+        pagagraphs: list[LatexPagagraph],
+        lang: Literal["en", "zh"],
+    ) -> str:
+        texts = []
+        for pagagraph in pagagraphs:
+            text = pagagraph.to_markdown(lang=lang)
+            if pagagraph.type == "figure":
+                # 图片改为下载源文件接口的相对路径
+                for figure_path in dict.fromkeys(utils.extract_figure_path(text)):
+                    text = text.replace(
+                        f"]({figure_path}", f"](../source/{entry_id}/{figure_path}"
+                    )
+            texts.append(text)
+        return "\n\n".join(texts)
+
+    @staticmethod
+    def render_html(md_text: str, title: str) -> str:
+        return pypandoc.convert_text(
+            md_text,
+            "html5",
+            format="gfm+tex_math_dollars",
+            extra_args=["--standalone", "--mathjax", f"--metadata=title:{title}"],
+        )
+
+    def export(
+        self,
+        entry_id: str,
+        lang: Literal["en", "zh"],
+        fmt: Literal["md", "html"],
+        get_pagagraphs: Callable[[str], list[LatexPagagraph]],
+        version: Optional[str] = None,
+    ) -> ExportFile:
+        """
+        导出文章，缓存命中时不会读取段落
+
+        Args:
+            entry_id: 文章的 entry_id
+            lang: 语言
+            fmt: 导出格式
+            get_pagagraphs: 读取文章全部段落的函数，只在缓存未命中时调用
+            version: 内容版本号，默认为 None，表示重新查询
+
+        Returns:
+            ExportFile: 导出的文件及其预压缩文件，etag 为导出内容的版本，
+                缓存未命中时可能与传入的 version 不同
+        """
+        version = version or self.get_version(entry_id)
+        export_dir = os.path.join(self.config.download_dir, entry_id, EXPORT_DIR)
+        path = os.path.join(export_dir, f"{lang}.{version}.{fmt}")
+
+        with self._get_export_lock(f"{entry_id}/{lang}.{fmt}"):
+            if not os.path.isfile(path):
+                pagagraphs = get_pagagraphs(entry_id)
+                # 未解析的文章在读取段落时才解析，内容和版本都会变化，按读取后的版本保存
+                version = self.get_version(entry_id)
+                name = f"{lang}.{version}.{fmt}"
+                path = os.path.join(export_dir, name)
+                if not os.path.isfile(path):
+                    os.makedirs(export_dir, exist_ok=True)
+                    text = self.render_markdown(entry_id, pagagraphs, lang)
+                    if fmt == "html":
+                        title = entry_id
+                        if pagagraphs:
+                            head = pagagraphs[0]
+                            title = (
+                                head.zh_text if lang == "zh" else None
+                            ) or head.text
+                        text = self.render_html(text, title)
+                    self._write(path, text.encode("utf-8"))
+                    self._remove_stale(export_dir, lang, fmt, keep=name)
+                    logger.info(f"导出文章：{path}")
+
+        return ExportFile(
+            path=path,
+            etag=f'"{version}-{lang}-{fmt}"',
+            media_type=MEDIA_TYPES[fmt],
+            encoded_paths={
+                encoding: f"{path}.{self._suffix(encoding)}"
+                for encoding in self.encodings
+                if os.path.isfile(f"{path}.{self._suffix(encoding)}")
+            },
+        )
+
+    @staticmethod
+    def _suffix(encoding: str) -> str:
+        return "gz" if encoding == "gzip" else encoding
+
+    def _write(self, path: str, data: bytes) -> None:
+        # 压缩文件先写，原文件最后写，原文件存在即表示缓存完整
+        if brotli:
+            self._atomic_write(f"{path}.br", brotli.compress(data))
+        self._atomic_write(f"{path}.gz", gzip.compress(data, compresslevel=9))
+        self._atomic_write(path, data)
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove_stale(export_dir: str, lang: str, fmt: str, keep: str) -> None:
+        for path in glob.glob(os.path.join(export_dir, f"{lang}.*.{fmt}*")):
+            if os.path.basename(path).startswith(keep):
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除过期的导出文件失败：{path}，{e}")
@@ -0,0 +1,389 @@
+import os
+import json
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from arxiv_hero import logger
+from arxiv_hero.config import get_config, FigureConfig
+from arxiv_hero.services.content_services.protocol import FigureRecord
+from arxiv_hero.services.content_services import utils
+
+# 浏览器不能直接展示、需要转换的图片格式
+CONVERTIBLE_EXTS = (".pdf", ".eps", ".bmp")
+FIGURE_MANIFEST_FILE = "__figure_manifest__.json"
+
+
+def get_display_path(fig_path: str, fmt: str) -> str:
+    """保留原图的扩展名，如 `fig.pdf.webp`，避免 `fig.pdf` 和 `fig.eps` 的展示图重名"""
+    return f"{fig_path}.{fmt}"
+
+
+def get_thumbnail_path(fig_path: str, fmt: str) -> str:
+    return f"{fig_path}.thumb.{fmt}"
+
+
+def _render(fig_path: str, config: FigureConfig) -> Image.Image:
+    ext = os.path.splitext(fig_path)[1].lower()
+    if ext == ".pdf":
+        page = fitz.open(fig_path).load_page(0)
+        # 按 dpi 渲染，但最长边不超过 max_size，避免先渲染一张巨图再缩小
+        zoom = min(
+            config.dpi / 72,
+            config.max_size / max(page.rect.width, page.rect.height, 1),
+        )
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+    image = Image.open(fig_path)
+    if ext == ".eps":
+        image.load(scale=max(1, round(config.dpi / 72)))
+    return image
+
+
+def _save(image: Image.Image, path: str, config: FigureConfig) -> None:
+    if config.format == "webp":
+        image.save(path, "WEBP", quality=config.quality, method=4)
+    else:
+        image.save(path, "PNG", optimize=True)
+
+
+def convert_figure(fig_path: str, config: FigureConfig) -> tuple[str, str]:
+    """
+    将图片转换为展示图和缩略图，在子进程中执行
+
+    Args:
+        fig_path: 原图的绝对路径
+        config: 图片转换配置
+
+    Returns:
+        tuple[str, str]: 展示图和缩略图的绝对路径
+    """
+    image = _render(fig_path, config)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    display_path = get_display_path(fig_path, config.format)
+    image.thumbnail((config.max_size, config.max_size))
+    _save(image, display_path, config)
+
+    thumbnail_path = get_thumbnail_path(fig_path, config.format)
+    image.thumbnail((config.thumbnail_size, config.thumbnail_size))
+    _save(image, thumbnail_path, config)
+    return display_path, thumbnail_path
+
+
+class FigureConverter:
+    """
+    转换文章中的图片。
+
+    - 解析时可以用进程池批量转换(`convert`)，也可以只改写路径(`rewrite_path`)，
+      等浏览器第一次请求时再转换(`resolve`)；
+    - 转换结果记录在 source_dir 下的图片清单中，原图和转换配置都没有变化时跳过转换；
+    - 同一张图片同时只会被转换一次，其他请求等待转换结果；
+    - 批量转换共用一个进程池，第一次使用时创建，由 `shutdown` 关闭。
+    """
+
+    hash_cache_size = 1024  # 最多缓存的文件哈希数，超过时淘汰最久未使用的
+
+    def __init__(self, config: Optional[FigureConfig] = None):
+        self.config = config or get_config().figure
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()  # 保护进程池、下面的锁表、哈希缓存和清单文件
+        # k:原图的绝对路径 v:(锁, 使用中的请求数)，没有请求使用时删除
+        self._figure_locks: dict[str, tuple[threading.Lock, int]] = {}
+        # k:绝对路径 v:(mtime,size,hash)
+        self._hash_cache: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 不使用 fork，避免子进程继承服务进程中的线程和锁
+                method = (
+                    "forkserver"
+                    if "forkserver" in multiprocessing.get_all_start_methods()
+                    else "spawn"
+                )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.config.max_workers,
+                    mp_context=multiprocessing.get_context(method),
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """关闭进程池，取消排队中的转换"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_config(self, fmt: Optional[str] = None) -> FigureConfig:
+        if fmt is None or fmt == self.config.format:
+            return self.config
+        return self.config.model_copy(update={"format": fmt})
+
+    @staticmethod
+    def _options_hash(config: FigureConfig) -> str:
+        return utils.hash_text(config.model_dump_json())
+
+    def _hash_file(self, path: str) -> str:
+        """按 (mtime, size) 缓存文件哈希，避免每次请求都重新计算"""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._hash_cache.get(path)
+            if cached:
+                self._hash_cache.move_to_end(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        file_hash = utils.hash_file(path)
+        with self._lock:
+            self._hash_cache[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+            self._hash_cache.move_to_end(path)
+            while len(self._hash_cache) > self.hash_cache_size:
+                self._hash_cache.popitem(last=False)
+        return file_hash
+
+    @contextmanager
+    def _figure_lock(self, path: str) -> Iterator[None]:
+        """同一张图片的请求互斥，锁在最后一个请求结束后删除"""
+        with self._lock:
+            lock, users = self._figure_locks.get(path, (None, 0))
+            lock = lock or threading.Lock()
+            self._figure_locks[path] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._figure_locks[path]
+                if users > 1:
+                    self._figure_locks[path] = (lock, users - 1)
+                else:
+                    del self._figure_locks[path]
+
+    def _load_manifest(self, source_dir: str) -> dict[str, FigureRecord]:
+        path = os.path.join(source_dir, FIGURE_MANIFEST_FILE)
+        if not os.path.isfile(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {k: FigureRecord(**v) for k, v in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"图片清单损坏，忽略：{path}，{e}")
+            return {}
+
+    def _update_manifest(self, source_dir: str, records: list[FigureRecord]) -> None:
+        with self._lock:
+            manifest = self._load_manifest(source_dir)
+            for record in records:
+                manifest[record.display_path] = record
+            utils.save_text(
+                json.dumps(
+                    {k: v.model_dump() for k, v in manifest.items()},
+                    ensure_ascii=False,
+                    indent=2,
+                ),
+                os.path.join(source_dir, FIGURE_MANIFEST_FILE),
+            )
+
+    def _is_converted(
+        self,
+        source_dir: str,
+        record: Optional[FigureRecord],
+        source_hash: str,
+        config: FigureConfig,
+    ) -> bool:
+        return (
+            record is not None
+            and record.source_hash == source_hash
+            and record.options_hash == self._options_hash(config)
+            and os.path.isfile(os.path.join(source_dir, record.display_path))
+            and os.path.isfile(os.path.join(source_dir, record.thumbnail_path))
+        )
+
+    def _make_record(
+        self,
+        source_dir: str,
+        figure_path: str,
+        source_hash: str,
+        paths: tuple[str, str],
+        config: FigureConfig,
+    ) -> FigureRecord:
+        display_path, thumbnail_path = (
+            os.path.relpath(p, source_dir).replace("\\", "/") for p in paths
+        )
+        return FigureRecord(
+            source_path=figure_path,
+            source_hash=source_hash,
+            options_hash=self._options_hash(config),
+            display_path=display_path,
+            thumbnail_path=thumbnail_path,
+        )
+
+    def rewrite_path(self, figure_path: str) -> str:
+        """只改写图片路径，不转换，浏览器请求时再由 `resolve` 转换"""
+        if not figure_path.lower().endswith(CONVERTIBLE_EXTS):
+            return figure_path
+        return get_display_path(figure_path, self.config.format)
+
+    def resolve(self, source_dir: str, filepath: str) -> Optional[str]:
+        """
+        按需转换图片，供下载源文件的接口使用
+
+        Args:
+            source_dir: 源文件目录
+            filepath: 请求的图片相对 source_dir 的路径，例如 `figs/a.pdf.webp` 或 `figs/a.pdf.thumb.webp`
+
+        Returns:
+            str | None: 转换后的图片的绝对路径。不是由 pdf/eps/bmp 转换得到的图片返回 None，
+                由调用方按普通文件处理；转换失败时也返回 None
+        """
+        basename, ext = os.path.splitext(filepath)
+        fmt = ext.lstrip(".").lower()
+        if fmt not in ("png", "webp"):
+            return None
+        is_thumbnail = basename.endswith(".thumb")
+        if is_thumbnail:
+            basename = basename[: -len(".thumb")]
+
+        if basename.lower().endswith(CONVERTIBLE_EXTS):
+            figure_path = basename
+        else:
+            # 旧版本解析的内容中，展示图的路径不含原图的扩展名，如 `figs/a.webp`
+            figure_path = next(
+                (
+                    basename + source_ext
+                    for source_ext in CONVERTIBLE_EXTS
+                    if os.path.isfile(os.path.join(source_dir, basename + source_ext))
+                ),
+                None,
+            )
+        if figure_path is None or not os.path.isfile(
+            os.path.join(source_dir, figure_path)
+        ):
+            return None
+
+        config = self._get_config(fmt)
+        display_path = get_display_path(figure_path, fmt)
+        abs_path = os.path.join(source_dir, figure_path)
+        with self._figure_lock(abs_path):
+            record = self._load_manifest(source_dir).get(display_path)
+            if record is None and os.path.isfile(os.path.join(source_dir, filepath)):
+                return os.path.join(source_dir, filepath)  # 作者提供的同名图片
+
+            source_hash = self._hash_file(abs_path)
+            if not self._is_converted(source_dir, record, source_hash, config):
+                try:
+                    paths = convert_figure(abs_path, config)
+                except Exception as e:
+                    # 原图损坏或格式不支持，由调用方返回 404，不影响其他图片
+                    logger.warning(f"图片转换失败：{abs_path}，{e}")
+                    logger.debug(traceback.format_exc())
+                    return None
+                record = self._make_record(
+                    source_dir, figure_path, source_hash, paths, config
+                )
+                self._update_manifest(source_dir, [record])
+                logger.info(f"按需转换图片：{abs_path}")
+
+        return os.path.join(
+            source_dir, record.thumbnail_path if is_thumbnail else record.display_path
+        )
+
+    def convert(self, source_dir: str, figure_paths: list[str]) -> dict[str, str]:
+        """
+        用进程池批量转换图片
+
+        Args:
+            source_dir: 源文件目录
+            figure_paths: 图片相对 source_dir 的路径列表
+
+        Returns:
+            dict[str, str]: k:原图的相对路径 v:展示图的相对路径，转换失败的图片不在其中
+        """
+        manifest = self._load_manifest(source_dir)
+        result: dict[str, str] = {}
+        to_convert: dict[str, str] = {}  # k:相对路径 v:原图哈希
+
+        for figure_path in dict.fromkeys(figure_paths):
+            if not figure_path.lower().endswith(CONVERTIBLE_EXTS):
+                continue
+            abs_path = os.path.join(source_dir, figure_path)
+            if not os.path.isfile(abs_path):
+                logger.warning(f"图片不存在：{abs_path}")
+                continue
+            display_path = get_display_path(figure_path, self.config.format)
+            record = manifest.get(display_path)
+            if record is None and os.path.isfile(
+                os.path.join(source_dir, display_path)
+            ):
+                result[figure_path] = display_path  # 作者提供的同名图片
+                continue
+            source_hash = self._hash_file(abs_path)
+            if self._is_converted(source_dir, record, source_hash, self.config):
+                result[figure_path] = display_path
+            else:
+                to_convert[figure_path] = source_hash
+
+        if not to_convert:
+            return result
+
+        skipped_nums = len(result)
+        records = []
+        for figure_path, paths in self._run(source_dir, list(to_convert)).items():
+            record = self._make_record(
+                source_dir, figure_path, to_convert[figure_path], paths, self.config
+            )
+            records.append(record)
+            result[figure_path] = record.display_path
+
+        self._update_manifest(source_dir, records)
+        logger.info(
+            f"图片转换完成：{source_dir}，转换 {len(records)} 张，"
+            f"失败 {len(to_convert) - len(records)} 张，跳过 {skipped_nums} 张"
+        )
+        return result
+
+    def _run(
+        self, source_dir: str, figure_paths: list[str]
+    ) -> dict[str, tuple[str, str]]:
+        results = {}
+        if len(figure_paths) == 1 or self.config.max_workers <= 1:
+            for figure_path in figure_paths:
+                try:
+                    results[figure_path] = convert_figure(
+                        os.path.join(source_dir, figure_path), self.config
+                    )
+                except Exception as e:
+                    logger.warning(f"图片转换失败：{figure_path}，{e}")
+            return results
+
+        executor = self._get_executor()
+        futures_map = {
+            executor.submit(
+                convert_figure, os.path.join(source_dir, figure_path), self.config
+            ): figure_path
+            for figure_path in figure_paths
+        }
+        for future in as_completed(futures_map):
+            figure_path = futures_map[future]
+            try:
+                results[figure_path] = future.result()
+            except BrokenProcessPool as e:
+                logger.warning(f"图片转换失败：{figure_path}，{e}")
+                with self._lock:  # 子进程异常退出，下次转换时重新创建进程池
+                    if self._executor is executor:
+                        self._executor = None
+            except Exception as e:
+                logger.warning(f"图片转换失败：{figure_path}，{e}")
+                logger.debug(traceback.format_exc())
+        return results
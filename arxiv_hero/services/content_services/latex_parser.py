@@ -13,8 +13,16 @@ from arxiv_hero.services.content_services.protocol import (
     LatexTitleMatched,
     LatexFile,
 )
+from arxiv_hero.services.content_services.manifest import ParseManifest, FLATTEN_FILE
 from arxiv_hero.services.content_services import utils
 
+# 解析逻辑(LatexParser 的预处理、pandoc 转换和后处理)发生变化时需要升级版本号，
+# 使已有的解析缓存失效
+PARSER_VERSION = "1"
+# 合并逻辑(LatexFiller 展开 \input、\include 等)发生变化时需要升级版本号，
+# 使已有的合并结果和解析缓存都失效
+FLATTEN_VERSION = "1"
+
 RESERVE_ENV_TYPE = (
     "itemize",
     "enumerate",
@@ -56,13 +64,18 @@ SKIP_ENV_TYPE = (
 
 
 class LatexFiller:
-    def __init__(self, source_dir: str) -> None:
+    def __init__(
+        self, source_dir: str, manifest: Optional[ParseManifest] = None
+    ) -> None:
         self.source_dir = source_dir
+        self.manifest = manifest
         self.include_pattern = re.compile(r"\\(?:input|include)\{([^}]+)\}")
         self.latex_files = self.get_latex_files()
 
-        if os.path.isfile(os.path.join(source_dir, "__main_full__.tex")):
-            self.flatten = lambda: os.path.join(source_dir, "__main_full__.tex")
+        if manifest and manifest.is_flatten_valid():
+            # 输入文件未变化，复用上次合并的结果
+            manifest.reuse_flatten()
+            self.flatten = lambda: manifest.flatten_path
         elif len(self.latex_files) == 1:
             self.flatten = lambda: str(self.latex_files[0])
         else:
@@ -73,6 +86,8 @@ class LatexFiller:
         latex_files = []
         for root, _, files in os.walk(self.source_dir):
             for name in files:
+                if name == FLATTEN_FILE:  # 上次合并生成的文件
+                    continue
                 if name.endswith(".tex"):
                     latex_files.append(Path(os.path.join(root, name)).absolute())
         return latex_files
@@ -129,7 +144,7 @@ class LatexFiller:
 
     def flatten(self) -> str:
         full_content = self._flatten()
-        save_path = os.path.join(self.source_dir, "__main_full__.tex")
+        save_path = os.path.join(self.source_dir, FLATTEN_FILE)
         with open(save_path, "w", encoding="utf-8") as f:
             f.write(full_content)
         return save_path
@@ -146,8 +161,12 @@ class LatexParser:
         self.environments: list[LatexEnvMatched] = []
         self.env_paragraphs: list[LatexPagagraph] = []
 
-    def _load_latex(self, source_dir: str) -> str:
-        latex_path = LatexFiller(source_dir).flatten()
+    def _load_latex(
+        self, source_dir: str, manifest: Optional[ParseManifest] = None
+    ) -> str:
+        latex_path = LatexFiller(source_dir, manifest).flatten()
+        if manifest:
+            manifest.set_flatten(latex_path)
         with open(latex_path, "r", encoding="utf-8") as f:
             latex_cache = []
             for line in f:
@@ -533,15 +552,24 @@ class LatexParser:
                 result.append(LatexPagagraph(type="text", text=line))
         return result
 
-    def parse(self, source_dir: str) -> list[LatexPagagraph]:
+    def parse(self, source_dir: str, use_cache: bool = True) -> list[LatexPagagraph]:
+        manifest = ParseManifest(source_dir, PARSER_VERSION, FLATTEN_VERSION)
+        if use_cache and manifest.is_parse_valid():
+            logger.info(f"源文件和解析器均未变化，使用解析缓存：{source_dir}")
+            return manifest.load_paragraphs()
+
         self._init_global_cachers()
 
-        latex_text = self._load_latex(source_dir)
-        latex_text = self.pre_process(latex_text)
-        md_text = utils.trans_latex_to_markdown(latex_text)
+        with manifest.timer("flatten"):
+            latex_text = self._load_latex(source_dir, manifest)
+        with manifest.timer("pre_process"):
+            latex_text = self.pre_process(latex_text)
+        with manifest.timer("pandoc"):
+            md_text = utils.trans_latex_to_markdown(latex_text)
 
         bib_path = utils.find_file(source_dir, ".bib")
-        md_text = self.post_process(md_text, True if bib_path else False)
+        with manifest.timer("post_process"):
+            md_text = self.post_process(md_text, True if bib_path else False)
 
         post_content = md_text[md_text.rfind("【-END_OF_DOCUMENT-】") + 19 :].strip()
         doc_match = re.search(
@@ -559,7 +587,8 @@ class LatexParser:
         if start_idxs:
             md_text = md_text[min(start_idxs) :]
 
-        latex_paragraphs = self.build_latex_paragraphs(md_text)
+        with manifest.timer("build_paragraphs"):
+            latex_paragraphs = self.build_latex_paragraphs(md_text)
         if post_content:
             latex_paragraphs.append(
                 LatexPagagraph(
@@ -569,13 +598,16 @@ class LatexParser:
             )
 
         if bib_path:
-            refs, refs_text = self._parse_bib(bib_path)
+            with manifest.timer("parse_bib"):
+                refs, refs_text = self._parse_bib(bib_path)
             latex_paragraphs.insert(0, refs)
             latex_paragraphs.append(refs_text)
 
         for i, paragraph in enumerate(latex_paragraphs):
             paragraph.order_idx = i
 
+        manifest.save_paragraphs(latex_paragraphs)
+        logger.info(f"解析完成：{source_dir}，各阶段耗时：{manifest.record.timings}")
         return latex_paragraphs
 
 
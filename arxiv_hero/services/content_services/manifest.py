@@ -0,0 +1,132 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from arxiv_hero import logger
+from arxiv_hero.common.metrics import Histogram
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+from arxiv_hero.services.content_services.protocol import ParseManifestRecord
+from arxiv_hero.services.content_services import utils
+
+MANIFEST_FILE = "__parse_manifest__.json"
+FLATTEN_FILE = "__main_full__.tex"
+PARAGRAPHS_CACHE_FILE = "__parse_cache__.json"
+
+# 生成的文件不参与输入哈希的计算
+GENERATED_FILES = (MANIFEST_FILE, FLATTEN_FILE, PARAGRAPHS_CACHE_FILE)
+# 会影响解析结果的输入文件
+INPUT_EXTS = (".tex", ".bib")
+
+PARSE_STAGE_DURATION = Histogram(
+    "arxiv_hero_parse_stage_seconds", "解析各阶段的耗时", ("stage",)
+)
+
+
+class ParseManifest:
+    """
+    解析清单，保存在 source_dir 中，记录各输入文件的哈希、合并和解析的版本以及各阶段耗时。
+
+    - 输入文件和合并版本都未变化时，跳过合并(flatten)；
+    - 输入文件、合并版本和解析器版本都未变化时，直接读取解析结果缓存；
+    - 重新下载了源文件(如文章更新了版本)或升级了合并、解析的逻辑时，缓存自动失效。
+    """
+
+    def __init__(
+        self, source_dir: str, parser_version: str, flatten_version: str
+    ) -> None:
+        self.source_dir = source_dir
+        self.parser_version = parser_version
+        self.flatten_version = flatten_version
+        self.path = os.path.join(source_dir, MANIFEST_FILE)
+        self.flatten_path = os.path.join(source_dir, FLATTEN_FILE)
+        self.paragraphs_path = os.path.join(source_dir, PARAGRAPHS_CACHE_FILE)
+
+        self.input_hashes = self.compute_input_hashes()
+        self.previous = self._load()
+        self.record = ParseManifestRecord(
+            parser_version=parser_version,
+            flatten_version=flatten_version,
+            input_hashes=self.input_hashes,
+        )
+
+    def compute_input_hashes(self) -> dict[str, str]:
+        hashes = {}
+        for root, _, files in os.walk(self.source_dir):
+            for name in files:
+                if name in GENERATED_FILES or not name.endswith(INPUT_EXTS):
+                    continue
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, self.source_dir).replace("\\", "/")
+                hashes[rel_path] = utils.hash_file(path)
+        return dict(sorted(hashes.items()))
+
+    def _load(self) -> Optional[ParseManifestRecord]:
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return ParseManifestRecord(**json.load(f))
+        except Exception as e:
+            logger.warning(f"解析清单损坏，忽略：{self.path}，{e}")
+            return None
+
+    def save(self) -> None:
+        utils.save_text(self.record.model_dump_json(indent=2), self.path)
+
+    def is_flatten_valid(self) -> bool:
+        """输入文件和合并版本未变化，且上次合并的结果没有被修改"""
+        return (
+            self.previous is not None
+            and self.previous.flatten_version == self.flatten_version
+            and self.previous.input_hashes == self.input_hashes
+            and self.previous.flatten_hash is not None
+            and os.path.isfile(self.flatten_path)
+            and utils.hash_file(self.flatten_path) == self.previous.flatten_hash
+        )
+
+    def is_parse_valid(self) -> bool:
+        """输入文件、合并版本和解析器版本都未变化，且解析结果缓存完好"""
+        return (
+            self.previous is not None
+            and self.previous.parser_version == self.parser_version
+            and self.previous.flatten_version == self.flatten_version
+            and self.previous.input_hashes == self.input_hashes
+            and self.previous.paragraphs_hash is not None
+            and os.path.isfile(self.paragraphs_path)
+            and utils.hash_file(self.paragraphs_path) == self.previous.paragraphs_hash
+        )
+
+    def set_flatten(self, flatten_path: str) -> None:
+        self.record.flatten_hash = (
+            utils.hash_file(flatten_path)
+            if os.path.abspath(flatten_path) == os.path.abspath(self.flatten_path)
+            else None
+        )
+        self.save()
+
+    def reuse_flatten(self) -> None:
+        self.record.flatten_hash = self.previous.flatten_hash
+
+    def load_paragraphs(self) -> list[LatexPagagraph]:
+        with open(self.paragraphs_path, "r", encoding="utf-8") as f:
+            return [LatexPagagraph(**item) for item in json.load(f)]
+
+    def save_paragraphs(self, paragraphs: list[LatexPagagraph]) -> None:
+        utils.save_text(
+            json.dumps([p.model_dump() for p in paragraphs], ensure_ascii=False),
+            self.paragraphs_path,
+        )
+        self.record.paragraphs_hash = utils.hash_file(self.paragraphs_path)
+        self.save()
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start_time
+            self.record.timings[stage] = round(duration, 4)
+            PARSE_STAGE_DURATION.observe(duration, stage=stage)
@@ -0,0 +1,71 @@
+import re
+from collections import Counter
+from typing import Optional
+
+PLACEHOLDER = "⟦{}⟧"
+# 大模型有时会在占位符中插入空格
+PLACEHOLDER_PATTERN = re.compile(r"⟦\s*(\d+)\s*⟧")
+
+# 不需要翻译、由大模型原样抄写的内容，按顺序匹配
+MASK_PATTERN = re.compile(
+    "|".join(
+        [
+            r"\$\$.+?\$\$",  # 行间公式
+            r"\\\[.+?\\\]",
+            r"\\\(.+?\\\)",  # 行内公式
+            r"(?<![\\$])\$(?!\$)(?:\\.|[^$\\\n])+?\$",
+            r"<a\s[^>]*>.*?</a>",  # post_process 生成的交叉引用
+            r"<span\b[^>]*>.*?</span>",  # 锚点
+            r"<span\b[^>]*/>",
+            r"!\[[^\]\n]*\]\([^)\n]*\)",  # 图片
+            r"\[\[[^\[\]\n]+\](?:,\s*\[[^\[\]\n]+\])*\]",  # 引用，如 [[1]]、[[3], [4]]
+        ]
+    ),
+    re.DOTALL,
+)
+
+
+def mask_text(text: str) -> tuple[str, list[str]]:
+    """
+    将公式、交叉引用、锚点、图片和引用替换为 `⟦n⟧` 形式的占位符，n 从 1 开始
+
+    Returns:
+        tuple[str, list[str]]: 替换后的文本，以及被替换的内容，第 n 项对应 `⟦n⟧`
+    """
+    if PLACEHOLDER_PATTERN.search(text):
+        return text, []  # 原文中已有占位符，无法区分，不替换
+
+    spans: list[str] = []
+
+    def replace(match: re.Match) -> str:
+        spans.append(match.group(0))
+        return PLACEHOLDER.format(len(spans))
+
+    return MASK_PATTERN.sub(replace, text), spans
+
+
+def unmask_text(text: str, spans: list[str]) -> Optional[str]:
+    """
+    还原占位符。每个占位符都需要恰好出现一次，否则返回 None，表示翻译结果不可用
+
+    Args:
+        text: 大模型输出的译文
+        spans: `mask_text` 返回的被替换的内容
+    """
+    counts = Counter(int(n) for n in PLACEHOLDER_PATTERN.findall(text))
+    if counts != Counter(range(1, len(spans) + 1)):
+        return None
+    return PLACEHOLDER_PATTERN.sub(lambda m: spans[int(m.group(1)) - 1], text)
+
+
+def unmask_partial(text: str, spans: list[str]) -> str:
+    """还原流式输出中的部分译文，末尾不完整的占位符暂不展示，不做校验"""
+    text = re.sub(r"⟦[\s\d]*$", "", text)
+    return PLACEHOLDER_PATTERN.sub(
+        lambda m: (
+            spans[int(m.group(1)) - 1]
+            if 1 <= int(m.group(1)) <= len(spans)
+            else m.group(0)
+        ),
+        text,
+    )
@@ -1,17 +1,44 @@
 import os
 import time
-from typing import Callable
+from typing import Callable, Iterator, Optional
 
 import arxiv
 
+from arxiv_hero import logger
 from arxiv_hero.config import get_config
+from arxiv_hero.common.metrics import Counter, Histogram
+from arxiv_hero.utils.cancel_utils import (
+    CancelToken,
+    get_cancel_token,
+    use_cancel_token,
+)
+from arxiv_hero.utils.chat_utils import get_route
+from arxiv_hero.utils.usage_utils import use_usage_scope
 from arxiv_hero.repositories.article_repository import ArticleRepository
+from arxiv_hero.repositories.article_repository.protocol import Article
 from arxiv_hero.repositories.content_repository import ContentRepository
 from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
 from arxiv_hero.services.content_services.latex_parser import LatexParser
 from arxiv_hero.services.content_services.translator import Translator
+from arxiv_hero.services.content_services.classifier import (
+    Action,
+    CAPTION_LABELS,
+    classify_paragraph,
+    find_caption,
+)
+from arxiv_hero.services.content_services.figure import FigureConverter
+from arxiv_hero.services.content_services.exporter import ContentExporter
+from arxiv_hero.services.content_services.protocol import CostEstimate
 from arxiv_hero.services.content_services import utils
 
+DOWNLOAD_DURATION = Histogram(
+    "arxiv_hero_download_seconds", "下载 pdf 和源文件的耗时", ("type",)
+)
+PARTIAL_INTERVAL = 0.3  # 推送部分译文的最小间隔，单位是秒
+PARAGRAPH_ACTIONS = Counter(
+    "arxiv_hero_paragraphs_total", "按处理方式统计的正文段落数", ("type", "action")
+)
+
 
 class ContentProcessor:
     def __init__(self):
@@ -19,6 +46,8 @@ class ContentProcessor:
         self.repository = ContentRepository()
         self.article_repository = ArticleRepository()
         self.translator = Translator()
+        self.figure_converter = FigureConverter()
+        self.exporter = ContentExporter(self.repository)
 
     def download_pdf(self, article_id: str) -> str:
         download_dir = os.path.join(self.config.download_dir, article_id)
@@ -27,14 +56,17 @@ class ContentProcessor:
             return download_path
 
         os.makedirs(download_dir, exist_ok=True)
-        paper = next(
-            arxiv.Client(delay_seconds=600).results(arxiv.Search(id_list=[article_id]))
-        )
-        download_path = paper.download_pdf(
-            dirpath=download_dir,
-            filename=f"{article_id}.pdf",
-            download_domain="arxiv.org",
-        )
+        with DOWNLOAD_DURATION.time(type="pdf"):
+            paper = next(
+                arxiv.Client(delay_seconds=600).results(
+                    arxiv.Search(id_list=[article_id])
+                )
+            )
+            download_path = paper.download_pdf(
+                dirpath=download_dir,
+                filename=f"{article_id}.pdf",
+                download_domain="arxiv.org",
+            )
         return download_path
 
     def download_source_and_extract(self, article_id: str) -> str:
@@ -44,93 +76,202 @@ class ContentProcessor:
             return source_dir
 
         os.makedirs(source_dir, exist_ok=True)
-        paper = next(
-            arxiv.Client(delay_seconds=600).results(arxiv.Search(id_list=[article_id]))
-        )
-        download_path = paper.download_source(
-            dirpath=download_dir,
-            filename=f"{article_id}.tar.gz",
-        )
+        with DOWNLOAD_DURATION.time(type="source"):
+            paper = next(
+                arxiv.Client(delay_seconds=600).results(
+                    arxiv.Search(id_list=[article_id])
+                )
+            )
+            download_path = paper.download_source(
+                dirpath=download_dir,
+                filename=f"{article_id}.tar.gz",
+            )
         utils.extract_tar_gz(download_path, source_dir)
         return source_dir
 
     def post_process_paragraphs(
         self, entry_id: str, paragraphs: list[LatexPagagraph]
     ) -> None:
-        for paragraph in paragraphs:
-            if paragraph.type == "figure":
-                figure_path_list = utils.extract_figure_path(paragraph.text)
-                for figure_path in figure_path_list:
-                    if figure_path.endswith((".pdf", ".eps", ".bmp")):
-                        basename, ext = figure_path.rsplit(".", 1)
-                        utils.trans_figure_to_png(
-                            os.path.join(
-                                self.config.download_dir,
-                                entry_id,
-                                "source",
-                                figure_path,
-                            )
-                        )
-                        paragraph.text = paragraph.text.replace(
-                            figure_path, f"{basename}.png"
-                        )
+        figure_paragraphs = [p for p in paragraphs if p.type == "figure"]
+        figure_paths = [
+            figure_path
+            for paragraph in figure_paragraphs
+            for figure_path in utils.extract_figure_path(paragraph.text)
+        ]
+        if self.figure_converter.config.lazy:
+            # 只改写路径，图片在第一次被请求时再转换
+            converted = {
+                figure_path: self.figure_converter.rewrite_path(figure_path)
+                for figure_path in figure_paths
+            }
+        else:
+            # 并行转换 pdf/eps/bmp 格式的图片
+            converted = self.figure_converter.convert(
+                os.path.join(self.config.download_dir, entry_id, "source"),
+                figure_paths,
+            )
+        for paragraph in figure_paragraphs:
+            # 展示图的路径包含原图的路径，逐个 str.replace 会重复替换
+            paragraph.text = utils.replace_figure_path(paragraph.text, converted)
 
     def translate_paragraph(
         self,
         paragraph: LatexPagagraph,
         history: list[list[str]] = None,
-    ) -> tuple[LatexPagagraph, bool]:
+        on_partial: Optional[Callable[[str], None]] = None,
+    ) -> tuple[LatexPagagraph, Optional[Action]]:
+        """
+        按 `classify_paragraph` 的结果翻译段落
+
+        Args:
+            paragraph: 段落
+            history: 翻译正文时作为示例的原文和译文
+            on_partial: 翻译全文时，以流式输出中已生成的部分译文调用
+
+        Returns:
+            tuple[LatexPagagraph, Optional[Action]]: 段落，以及对段落的处理方式，已翻译时为 None
+        """
         history = history or []
         if paragraph.zh_text is not None:
-            return paragraph, False
+            return paragraph, None
 
-        if utils.is_all_digits(paragraph.text):
-            return paragraph, False
+        action = classify_paragraph(paragraph)
+        PARAGRAPH_ACTIONS.inc(type=paragraph.type, action=action)
+        if action == "copy":
+            return paragraph, action
 
-        if paragraph.type == "text":
-            if "<div" in paragraph.text or "<span" in paragraph.text:
-                return paragraph, False
-            zh_text = self.translator.translate_content(paragraph.text, history)
-            paragraph.zh_text = zh_text
-            return paragraph, True
+        with use_usage_scope(type=paragraph.type):  # 用量按段落类型统计
+            paragraph.zh_text = self._translate_by_action(
+                paragraph, action, history, on_partial
+            )
+        return paragraph, action
+
+    def _translate_by_action(
+        self,
+        paragraph: LatexPagagraph,
+        action: Action,
+        history: list[list[str]],
+        on_partial: Optional[Callable[[str], None]],
+    ) -> Optional[str]:
+        if action == "caption":
+            # 图片路径、表格内容不翻译，只翻译标题
+            match = find_caption(paragraph.text)
+            zh_caption = self.translator.translate_content(match.group("caption"))
+            return (
+                paragraph.text[: match.start()]
+                + f"**{CAPTION_LABELS[match.group('label')]}{match.group('order')}**："
+                + zh_caption
+                + paragraph.text[match.end() :]
+                if zh_caption
+                else None
+            )
         if paragraph.type == "title":
-            zh_text = self.translator.translate_title(paragraph.text)
-            paragraph.zh_text = zh_text
-            return paragraph, True
-        if paragraph.type in ("table", "figure", "latex"):
-            zh_text = self.translator.translate_markdown(paragraph.text)
-            paragraph.zh_text = zh_text
-            return paragraph, True
-        if paragraph.type in (
-            "equation",
-            "post_content",
-            "reference",
-            "article_name",
-            "abstract",
-        ):
-            return paragraph, False
+            return self.translator.translate_title(paragraph.text)
+        if paragraph.type == "text":
+            return self.translator.translate_content(
+                paragraph.text, history, on_partial=on_partial
+            )
+        return self.translator.translate_markdown(paragraph.text, on_partial=on_partial)
 
-    def parse(self, entry_id: str) -> list[LatexPagagraph]:
+    def estimate_article_cost(self, entry_id: str) -> CostEstimate:
+        """翻译前估计翻译文章正文的用量和花费，未解析的文章会先下载和解析"""
         article = self.article_repository.get_article_by_entry_id(entry_id)
         if not article:
             raise Exception(f"【{entry_id}】不存在")
+        history = (
+            [[article.summary.replace("\n", " "), article.zh_summary]]
+            if article.zh_summary
+            else []
+        )
+        return self.estimate_cost(self.parse(entry_id), history)
 
-        pagagraphs = self.repository.get_pagagraphs(entry_id=entry_id)
-        if not pagagraphs:
-            # 0. 下载PDF和源文件
-            self.download_pdf(entry_id)
-            source_dir = self.download_source_and_extract(entry_id)
-
-            # 1. 解析 Latex
-            pagagraphs = LatexParser().parse(source_dir)
-
-            # 2. 后处理
-            self.post_process_paragraphs(entry_id, pagagraphs)
+    def estimate_cost(
+        self,
+        pagagraphs: list[LatexPagagraph],
+        history: list[list[str]] = None,
+    ) -> CostEstimate:
+        """
+        在本地估计翻译未翻译段落的用量和花费，和 `translate_paragraph` 的请求一一对应，
+        不包括没有匹配到译文时的重试
+        """
+        estimate = CostEstimate()
+        for paragraph in pagagraphs:
+            if paragraph.zh_text is not None:
+                continue
+            action = classify_paragraph(paragraph)
+            if action == "copy":
+                continue
+            if action == "caption":
+                kind, text, examples = (
+                    "content",
+                    find_caption(paragraph.text).group("caption"),
+                    None,
+                )
+            elif paragraph.type == "title":
+                kind, text, examples = "title", paragraph.text, None
+            elif paragraph.type == "text":
+                kind, text, examples = "content", paragraph.text, history
+            else:
+                kind, text, examples = "markdown", paragraph.text, None
+            prompt_tokens, completion_tokens = self.translator.estimate_tokens(
+                kind, text, examples
+            )
+            estimate.paragraphs += 1
+            estimate.prompt_tokens += prompt_tokens
+            estimate.completion_tokens += completion_tokens
+            estimate.cost += get_route(kind)[0].estimate_cost(
+                prompt_tokens, completion_tokens
+            )
+            estimate.tokens_by_type[paragraph.type] = (
+                estimate.tokens_by_type.get(paragraph.type, 0)
+                + prompt_tokens
+                + completion_tokens
+            )
+        return estimate
 
-            # 3. 入库
-            self.repository.create_content(entry_id, pagagraphs, is_translated=True)
+    @staticmethod
+    def _partial_callback(
+        callback: Callable[[str, dict, float], None],
+        paragraph: LatexPagagraph,
+        order_idx: int,
+    ) -> Callable[[str], None]:
+        """
+        以不超过每 PARTIAL_INTERVAL 秒一次的频率推送部分译文，只用于展示，不保存。
+        消息中 partial 为 True，之后的完整段落以相同的 order_idx 替换
+        """
+        last_time = 0.0
+
+        def on_partial(zh_text: str) -> None:
+            nonlocal last_time
+            now = time.monotonic()
+            if now - last_time < PARTIAL_INTERVAL:
+                return
+            last_time = now
+            data = paragraph.model_dump()
+            data.update(order_idx=order_idx, zh_text=zh_text, partial=True)
+            callback(None, data, None)
+
+        return on_partial
+
+    def _parse_and_save(self, entry_id: str) -> list[LatexPagagraph]:
+        # 0. 下载PDF和源文件
+        self.download_pdf(entry_id)
+        source_dir = self.download_source_and_extract(entry_id)
+
+        # 1. 解析 Latex
+        pagagraphs = LatexParser().parse(source_dir)
+
+        # 2. 后处理
+        self.post_process_paragraphs(entry_id, pagagraphs)
+
+        # 3. 入库
+        self.repository.create_content(entry_id, pagagraphs, is_translated=True)
+        return pagagraphs
 
-        pagagraphs = [
+    @staticmethod
+    def _get_head_paragraphs(article: Article) -> list[LatexPagagraph]:
+        """文章名和摘要，不保存在 content 表中"""
+        return [
             LatexPagagraph(
                 type="article_name",
                 text=article.title,
@@ -141,24 +282,76 @@ class ContentProcessor:
                 text=article.summary.replace("\n", " "),
                 zh_text=article.zh_summary,
             ),
-        ] + pagagraphs
+        ]
 
-        md_path = os.path.join(
-            self.config.download_dir, entry_id, "source", f"{entry_id}_en.md"
-        )
-        if not os.path.isfile(md_path):
-            utils.save_text(
-                "\n\n".join([p.to_markdown(lang="en") for p in pagagraphs]),
-                md_path,
+    def iter_parse(
+        self,
+        entry_id: str,
+        from_idx: int = 0,
+        limit: int = None,
+    ) -> tuple[int, Iterator[LatexPagagraph]]:
+        """
+        逐段读取文章内容，段落的下标和 `parse` 的返回值一致
+
+        Args:
+            entry_id: 文章的 entry_id
+            from_idx: 起始下标
+            limit: 最多返回的段落数，默认为 None，表示读取到文章末尾
+
+        Returns:
+            tuple[int, Iterator[LatexPagagraph]]: 段落总数和段落迭代器
+        """
+        article = self.article_repository.get_article_by_entry_id(entry_id)
+        if not article:
+            raise Exception(f"【{entry_id}】不存在")
+
+        total_nums = self.repository.count_pagagraphs(entry_id)
+        if total_nums == 0:
+            total_nums = len(self._parse_and_save(entry_id))
+
+        head_pagagraphs = self._get_head_paragraphs(article)
+        total_nums += len(head_pagagraphs)
+
+        def generator() -> Iterator[LatexPagagraph]:
+            nums = 0
+            for pagagraph in head_pagagraphs[from_idx:]:
+                if limit is not None and nums >= limit:
+                    return
+                nums += 1
+                yield pagagraph
+            yield from self.repository.iter_pagagraphs(
+                entry_id,
+                from_idx=max(from_idx - len(head_pagagraphs), 0),
+                limit=None if limit is None else limit - nums,
             )
 
-        return pagagraphs
+        return total_nums, generator()
+
+    def parse(self, entry_id: str) -> list[LatexPagagraph]:
+        article = self.article_repository.get_article_by_entry_id(entry_id)
+        if not article:
+            raise Exception(f"【{entry_id}】不存在")
+
+        pagagraphs = self.repository.get_pagagraphs(
+            entry_id=entry_id
+        ) or self._parse_and_save(entry_id)
+        return self._get_head_paragraphs(article) + pagagraphs
 
     def translate(
         self,
         entry_id: str,
         callback: Callable[[str, dict, float], None] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> list[LatexPagagraph]:
+        """
+        翻译文章正文，已翻译的段落会跳过
+
+        Args:
+            entry_id: 文章的 entry_id
+            callback: 进度回调函数
+            cancel_token: 取消令牌，默认使用当前上下文中的令牌，每翻译一段检查一次
+        """
+        cancel_token = cancel_token or get_cancel_token() or CancelToken()
         article = self.article_repository.get_article_by_entry_id(entry_id)
         if not article or not article.zh_summary:
             raise Exception(f"【{entry_id}】没有中文摘要")
@@ -178,11 +371,43 @@ class ContentProcessor:
                 0.2,
             )
 
-        history = [article.summary.replace("\n", " "), article.zh_summary]
+        history = (
+            [[article.summary.replace("\n", " "), article.zh_summary]]
+            if article.zh_summary
+            else []
+        )
+
+        estimate = self.estimate_cost(pagagraphs, history)
+        if estimate.paragraphs:
+            logger.info(
+                f"【{entry_id}】预计翻译 {estimate.paragraphs} 段，输入约 {estimate.prompt_tokens} tokens，"
+                f"输出约 {estimate.completion_tokens} tokens，花费约 {estimate.cost:.4f}"
+            )
+            if callback:
+                callback(
+                    f"预计消耗约 {estimate.prompt_tokens + estimate.completion_tokens} tokens ",
+                    None,
+                    0.2,
+                )
 
         # 2. 翻译
+        action_nums = {"translate": 0, "caption": 0, "copy": 0}
         for i, pagagraph in enumerate(pagagraphs):
-            pagagraph, is_translated = self.translate_paragraph(pagagraph, history)
+            cancel_token.raise_if_cancelled()
+            # 取消时中断进行中的请求，用量记录到这篇文章
+            with use_cancel_token(cancel_token), use_usage_scope(entry_id=entry_id):
+                pagagraph, action = self.translate_paragraph(
+                    pagagraph,
+                    history,
+                    on_partial=(
+                        self._partial_callback(callback, pagagraph, i)
+                        if callback
+                        else None
+                    ),
+                )
+            if action:
+                action_nums[action] += 1
+            is_translated = action in ("translate", "caption")
             # 3. 填充翻译
             if is_translated:
                 self.repository.update_zh_field(
@@ -196,6 +421,14 @@ class ContentProcessor:
                     0.2 + 0.8 * ((i + 1) / len(pagagraphs)),
                 )
 
+        classified_nums = sum(action_nums.values())
+        if classified_nums:
+            logger.info(
+                f"【{entry_id}】待翻译 {classified_nums} 段，翻译全文 {action_nums['translate']} 段，"
+                f"只翻译标题 {action_nums['caption']} 段，跳过 {action_nums['copy']} 段，"
+                f"跳过比例 {action_nums['copy'] / classified_nums:.1%}"
+            )
+
         if callback:
             callback(
                 f"【{entry_id}】翻译完成，共用时{time.time() - start_time:.2f}s ",
@@ -203,15 +436,6 @@ class ContentProcessor:
                 1,
             )
 
-        md_path = os.path.join(
-            self.config.download_dir, entry_id, "source", f"{entry_id}_zh.md"
-        )
-        if not os.path.isfile(md_path):
-            utils.save_text(
-                "\n\n".join([p.to_markdown(lang="zh") for p in pagagraphs]),
-                md_path,
-            )
-
         return pagagraphs
 
 
@@ -3,8 +3,9 @@ content_system_prompt = r"""\
 
 规则：
 - 保证内容的原意的基础上，使其更易于理解，更符合中文的表达习惯
-- 以markdown友好的格式输出，行内latex公式保留前后的`$`符号
+- 以markdown友好的格式输出，未替换为占位符的行内latex公式保留前后的`$`符号
 - 在确保能正确渲染的基础上，尽可能保留原文的格式，如引用、html标签、代码块等
+- `⟦1⟧`、`⟦2⟧` 等占位符代表公式、引用等内容，原样保留在译文中对应的位置，不要修改、删除或增加
 
 输入格式如下，"｛xxx｝"表示占位符：
 <English>
@@ -18,24 +19,24 @@ content_system_prompt = r"""\
 
 下面是示例：
 <English>
-For LLM decision-making problems [[1]], an LLM with profile $\widehat{p}$ receives a partially observable state $\widehat{o}_t$ and generates actions according to $\widehat{a}t = LLM{\widehat{p}}(\widehat{o}_t)$, where each input and output is represented as a sequence of tokens in text form. Given that chain-of-thought (CoT) reasoning [[3], [4]] will be frequently used in the following sections, we define the CoT output as:
+For LLM decision-making problems ⟦1⟧, an LLM with profile ⟦2⟧ receives a partially observable state ⟦3⟧ and generates actions according to ⟦4⟧, where each input and output is represented as a sequence of tokens in text form. Given that chain-of-thought (CoT) reasoning ⟦5⟧ will be frequently used in the following sections, we define the CoT output as:
 </English>
 
 <Chinese>
-针对大语言模型（LLM）的决策问题[[1]]，一个具有参数配置$\widehat{p}$的LLM接收部分可观测状态$\widehat{o}_t$ ，并依据$\widehat{a}t = LLM{\widehat{p}}(\widehat{o}_t)$生成动作，其中每个输入输出均以文本形式的token序列表示。鉴于思维链（CoT）推理[[3], [4]]将在后续章节频繁使用，我们将思维链输出定义为：
+针对大语言模型（LLM）的决策问题⟦1⟧，一个具有参数配置⟦2⟧的LLM接收部分可观测状态⟦3⟧，并依据⟦4⟧生成动作，其中每个输入输出均以文本形式的token序列表示。鉴于思维链（CoT）推理⟦5⟧将在后续章节频繁使用，我们将思维链输出定义为：
 </Chinese>
 
 <English>
-This section introduces the SIM-RAG framework, outlining its design in Section <a href="#sec:sim-rag-main">Section 3.1</a>. The overview of the SIM-RAG framework is illustrated in Figure <a href="#fig:overview">2</a>, following the information flow during the inference-time thinking process.
+This section introduces the SIM-RAG framework, outlining its design in Section ⟦1⟧. The overview of the SIM-RAG framework is illustrated in Figure ⟦2⟧, following the information flow during the inference-time thinking process.
 </English>
 
 <Chinese>
-本节将介绍SIM-RAG框架，其具体设计详见<a href="#sec:sim-rag-main">Section 3.1</a>。SIM-RAG框架的总体架构如图<a href="#fig:overview">2</a>所示，该图遵循了推理时思维过程中的信息流动方向。
+本节将介绍SIM-RAG框架，其具体设计详见⟦1⟧。SIM-RAG框架的总体架构如图⟦2⟧所示，该图遵循了推理时思维过程中的信息流动方向。
 </Chinese>
 """
 
 title_system_prompt = """\
-请帮我将论文标题翻译为中文
+请帮我将论文标题翻译为中文，`⟦1⟧` 等占位符原样保留
 
 输入格式如下，"｛xxx｝"表示占位符：
 <English>
@@ -86,6 +87,7 @@ markdown_systen_prompt = r"""\
 规则：
 - 保证内容的原意的基础上，使其更易于理解，更符合中文的表达习惯
 - 以markdown友好的格式输出，确保前端能够正常渲染
+- `⟦1⟧`、`⟦2⟧` 等占位符代表公式、锚点、图片等内容，原样保留在译文中对应的位置，不要修改、删除或增加
 
 输入格式如下，"｛xxx｝"表示占位符：
 <English>
@@ -99,14 +101,14 @@ markdown_systen_prompt = r"""\
 
 下面是示例：
 <English>
-<span id="CDM" class="label"></span>
-![](CDM.eps)
+⟦1⟧
+⟦2⟧
 **Figure 1**: Illustrative examples of (a) answer records of Yasser and Lisa: "?" denotes unanswered; (b) relation between exercises and knowledge concepts: gray denotes inactive; (c) interaction among knowledge concepts; (d) cognitive states.
 </English>
 
 <Chinese>
-<span id="CDM" class="label"></span>
-![](CDM.eps)
+⟦1⟧
+⟦2⟧
 **图1**：示例说明：(a) Yasser和Lisa的答题记录："?"表示未作答；(b) 习题与知识点关联：灰色表示未激活；(c) 知识点间的相互作用；(d) 认知状态。
 </Chinese>
 
@@ -35,3 +35,37 @@ class LatexFile(BaseModel):
     content: Optional[str] = None
     included_files: Optional[list["LatexFile"]] = None
     parent_file: Optional["LatexFile"] = None
+
+
+class ParseManifestRecord(BaseModel):
+    parser_version: str
+    flatten_version: Optional[str] = None
+    input_hashes: dict[str, str]  # k:相对 source_dir 的路径 v:sha256
+    flatten_hash: Optional[str] = None  # __main_full__.tex 的 sha256
+    paragraphs_hash: Optional[str] = None  # 解析结果缓存的 sha256
+    timings: dict[str, float] = {}  # k:阶段名称 v:耗时(秒)
+
+
+class FigureRecord(BaseModel):
+    source_path: str  # 原图相对 source_dir 的路径
+    source_hash: str  # 原图的 sha256
+    options_hash: str  # 转换配置的 sha256
+    display_path: str  # 展示图相对 source_dir 的路径
+    thumbnail_path: str  # 缩略图相对 source_dir 的路径
+
+
+class ExportFile(BaseModel):
+    path: str  # 导出文件的路径
+    etag: str
+    media_type: str
+    encoded_paths: dict[str, str] = {}  # k:Content-Encoding v:预压缩文件的路径
+
+
+class CostEstimate(BaseModel):
+    """翻译前在本地估计的用量"""
+
+    paragraphs: int = 0  # 需要调用大模型翻译的段落数
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0  # 按配置中的价格计算
+    tokens_by_type: dict[str, int] = {}  # k:段落类型 v:输入和输出的 token 数
@@ -0,0 +1,107 @@
+import re
+
+from arxiv_hero.utils.usage_utils import estimate_tokens
+from arxiv_hero.services.content_services.masking import (
+    MASK_PATTERN,
+    PLACEHOLDER_PATTERN,
+)
+
+# 句末标点(可跟右引号、右括号)之后的空白，或换行，如合并的列表项之间
+BOUNDARY_PATTERN = re.compile(r"[.!?][\"'”’)]*\s+|\n\s*")
+# 句子的开头：大写字母、数字、公式、占位符、括号、引号、列表标记等
+SENTENCE_START = re.compile(r"[A-Z0-9⟦$\\(\[\"“*<-]")
+# 以点结尾但通常不是句末的缩写
+ABBREVIATIONS = {
+    "e.g",
+    "i.e",
+    "al",
+    "etc",
+    "cf",
+    "vs",
+    "resp",
+    "approx",
+    "fig",
+    "figs",
+    "eq",
+    "eqs",
+    "sec",
+    "secs",
+    "tab",
+    "ref",
+    "refs",
+    "no",
+    "ch",
+    "app",
+    "dr",
+    "mr",
+    "ms",
+    "prof",
+}
+
+
+def _is_abbreviation(text: str) -> bool:
+    """text 以点结尾，判断最后一个词是否为缩写或姓名首字母，如 `et al.`、`J.`"""
+    word = re.search(r"[^\s(\[]*$", text[:-1]).group(0)
+    return word.lower() in ABBREVIATIONS or re.fullmatch(r"[A-Z]", word) is not None
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    按句子切分文本，每个句子保留其后的空白，拼接后与原文相同
+
+    公式、引用、交叉引用、图片和 `⟦n⟧` 占位符内部不切分，缩写后的点不视为句末
+    """
+    protected = [m.span() for m in MASK_PATTERN.finditer(text)]
+    protected += [m.span() for m in PLACEHOLDER_PATTERN.finditer(text)]
+
+    sentences = []
+    start = 0
+    for match in BOUNDARY_PATTERN.finditer(text):
+        end = match.end()
+        if end >= len(text) or any(s < match.start() < e for s, e in protected):
+            continue
+        if not match.group(0).startswith("\n"):
+            if not SENTENCE_START.match(text, end):
+                continue
+            if match.group(0)[0] == "." and _is_abbreviation(text[: match.start() + 1]):
+                continue
+        sentences.append(text[start:end])
+        start = end
+    sentences.append(text[start:])
+    return sentences
+
+
+def split_paragraph(text: str, max_tokens: int) -> list[str]:
+    """
+    将估计超过 max_tokens 的段落在句子边界切分为多块，每块不超过 max_tokens，
+    超过上限的单个句子单独成块；max_tokens 为 0 时不切分
+
+    Returns:
+        list[str]: 各块原文，保留块之间的空白，拼接后与原文相同
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    chunk, chunk_tokens = "", 0
+    for sentence in split_sentences(text):
+        tokens = estimate_tokens(sentence)
+        if chunk and chunk_tokens + tokens > max_tokens:
+            chunks.append(chunk)
+            chunk, chunk_tokens = "", 0
+        chunk += sentence
+        chunk_tokens += tokens
+    chunks.append(chunk)
+    return chunks
+
+
+def stitch_translations(chunks: list[str], zh_chunks: list[str]) -> str:
+    """
+    按顺序拼接各块的译文。原文块之间有换行时保留原来的空白，否则直接相连
+    """
+    parts = []
+    for chunk, zh_chunk in zip(chunks, zh_chunks):
+        parts.append(zh_chunk.strip())
+        separator = chunk[len(chunk.rstrip()) :]
+        parts.append(separator if "\n" in separator else "")
+    return "".join(parts).strip()
@@ -1,8 +1,28 @@
-import re
+import threading
+from typing import Callable, Optional
 
 from arxiv_hero import logger
 from arxiv_hero.config import get_config
-from arxiv_hero.utils.chat_utils import chat
+from arxiv_hero.utils.chat_utils import TruncatedError, chat
+from arxiv_hero.utils.parallel_utils import parallel_func
+from arxiv_hero.utils.translate_utils import (
+    STOP_SEQUENCES,
+    ZH_END,
+    ZH_START,
+    match_zh_translated,
+    max_tokens_for,
+    prefill_message,
+)
+from arxiv_hero.utils.usage_utils import estimate_tokens
+from arxiv_hero.services.content_services.masking import (
+    mask_text,
+    unmask_text,
+    unmask_partial,
+)
+from arxiv_hero.services.content_services.splitter import (
+    split_paragraph,
+    stitch_translations,
+)
 from arxiv_hero.services.content_services.prompts import (
     title_system_prompt,
     content_system_prompt,
@@ -11,57 +31,55 @@ from arxiv_hero.services.content_services.prompts import (
     user_template,
 )
 
+MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色等额外的 token 数
+
 
 class Translator(object):
     config = get_config().translate
 
-    @staticmethod
-    def _match_zh_translated(text: str) -> str | None:
-        match = re.search(r"<Chinese>(.*?)</Chinese>", text, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        return None
+    @classmethod
+    def _match_zh_translated(cls, text: str) -> str | None:
+        return match_zh_translated(text, cls.config.prefill)
 
-    def translate_title(
-        self,
-        title: str,
-        max_retries: int = config.max_retries,
-    ) -> str | None:
-        retries = 0
+    @classmethod
+    def _match_zh_partial(cls, text: str) -> str | None:
+        """匹配流式输出中 `<Chinese>` 之后已生成的部分译文"""
+        if cls.config.prefill and not text.lstrip().startswith(ZH_START):
+            text = ZH_START + text
+        start = text.find(ZH_START)
+        if start < 0:
+            return None
+        text = text[start + len(ZH_START) :]
+        end = text.find(ZH_END)
+        if end >= 0:
+            text = text[:end]
+        else:
+            # 去掉末尾还未生成完的结束标签，如 `</Chi`
+            tag_start = text.rfind("<")
+            if tag_start >= 0 and ZH_END.startswith(text[tag_start:]):
+                text = text[:tag_start]
+        return text.strip()
 
-        while retries < max_retries:
-            response = chat(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": title_system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": user_template.format(content=title),
-                    },
-                ]
-            )
-            zh_title = self._match_zh_translated(response)
-            if zh_title:
-                return zh_title.strip()
+    def _partial_handler(
+        self, on_partial: Callable[[str], None], spans: list[str]
+    ) -> Callable[[str], None]:
+        """把大模型输出的增量转换为部分译文"""
+        response = ""
 
-            logger.warning(
-                f"\n-------\n没有匹配到中文翻译结果：\n输入：{title}\n输出：{response}\n-------"
-            )
-            retries += 1
+        def on_delta(delta: str) -> None:
+            nonlocal response
+            response += delta
+            zh_content = self._match_zh_partial(response)
+            if zh_content:
+                on_partial(unmask_partial(zh_content, spans))
 
-        return None
+        return on_delta
 
-    def translate_content(
-        self,
-        content: str,
-        history: list[list[str]] = None,
-        max_retries: int = config.max_retries,
-    ) -> str | None:
-        retries = 0
-
-        messages = [{"role": "system", "content": content_system_prompt}]
+    @staticmethod
+    def _build_messages(
+        system_prompt: str, content: str, history: list[list[str]] = None
+    ) -> list[dict]:
+        messages = [{"role": "system", "content": system_prompt}]
         for item in history or []:
             messages.extend(
                 [
@@ -78,55 +96,188 @@ class Translator(object):
         messages.append(
             {"role": "user", "content": user_template.format(content=content)}
         )
+        return messages
 
-        while retries < max_retries:
-            response = chat(messages=messages)
-            zh_content = self._match_zh_translated(response)
-            if zh_content:
-                return zh_content.strip()
+    def estimate_tokens(
+        self, kind: str, content: str, history: list[list[str]] = None
+    ) -> tuple[int, int]:
+        """
+        在本地估计翻译的输入和输出 token 数，输出按与原文长度相同估计，
+        过长的正文按切分后的每块分别计算
 
-            logger.warning(
-                f"\n-------\n没有匹配到中文翻译结果：\n输入：\ncontent={content}\nhistory={history}\n\n输出：\n{response}\n-------"
+        Args:
+            kind: 提示词类型，title、content 或 markdown
+            content: 原文
+            history: 作为示例的原文和译文
+        """
+        system_prompt = {
+            "title": title_system_prompt,
+            "content": content_system_prompt,
+            "markdown": markdown_systen_prompt,
+        }[kind]
+        chunks = (
+            split_paragraph(content, self.config.split_tokens)
+            if kind == "content"
+            else [content]
+        )
+        prompt_tokens, completion_tokens = 0, 0
+        for chunk in chunks:
+            messages = self._build_messages(system_prompt, chunk, history)
+            prompt_tokens += sum(
+                estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+                for message in messages
             )
-            retries += 1
-
-        return None
+            completion_tokens += estimate_tokens(
+                assistant_template.format(zh_content=chunk)
+            )
+            if self.config.prefill:
+                prompt_tokens += estimate_tokens(ZH_START) + MESSAGE_OVERHEAD_TOKENS
+        return prompt_tokens, completion_tokens
 
-    def translate_markdown(
+    def _translate(
         self,
+        system_prompt: str,
         content: str,
         history: list[list[str]] = None,
         max_retries: int = config.max_retries,
+        on_partial: Optional[Callable[[str], None]] = None,
+        kind: Optional[str] = None,
     ) -> str | None:
-        retries = 0
+        """
+        翻译并匹配 `<Chinese>` 中的译文
 
-        messages = [{"role": "system", "content": markdown_systen_prompt}]
-        for item in history or []:
-            messages.extend(
-                [
-                    {
-                        "role": "user",
-                        "content": user_template.format(content=item[0]),
-                    },
-                    {
-                        "role": "assistant",
-                        "content": assistant_template.format(zh_content=item[1]),
-                    },
-                ]
-            )
-        messages.append(
-            {"role": "user", "content": user_template.format(content=content)}
-        )
+        开启 mask 时，公式、引用等先替换为占位符，译文中的占位符校验完整后再还原；
+        校验失败时，之后的重试改为发送原文。
+        on_partial 不为空时以流式请求，每收到一段输出，以已生成的部分译文调用一次，
+        重试时从头输出。kind 为提示词类型，用于选择大模型端点
+
+        输出以 `</Chinese>` 停止，上限按原文长度估计，被截断时加倍上限重试；
+        开启 prefill 时以 `<Chinese>` 预填充助手消息，跳过开场白
+        """
+        masked, spans = mask_text(content) if self.config.mask else (content, [])
+        messages = self._build_messages(system_prompt, masked, history)
+        if self.config.prefill:
+            messages.append(prefill_message())
+        user_index = len(messages) - (2 if self.config.prefill else 1)
+        max_tokens = max_tokens_for(content, self.config)
 
-        while retries < max_retries:
-            response = chat(messages=messages)
+        for _ in range(max_retries):
+            on_delta = self._partial_handler(on_partial, spans) if on_partial else None
+            try:
+                response = chat(
+                    messages=messages,
+                    on_delta=on_delta,
+                    kind=kind,
+                    max_tokens=max_tokens,
+                    stop=STOP_SEQUENCES,
+                    temperature=self.config.temperature,
+                )
+            except TruncatedError as e:
+                logger.warning(f"{e}，加大上限重试：\n输入：\n{content}")
+                max_tokens *= 2
+                continue
             zh_content = self._match_zh_translated(response)
+            if zh_content and spans:
+                zh_content = unmask_text(zh_content, spans)
+                if zh_content is None:
+                    logger.warning(
+                        f"\n-------\n占位符还原失败，改为发送原文：\n输入：\n{masked}\n\n输出：\n{response}\n-------"
+                    )
+                    spans = []
+                    messages[user_index]["content"] = user_template.format(
+                        content=content
+                    )
+                    continue
             if zh_content:
                 return zh_content.strip()
 
             logger.warning(
                 f"\n-------\n没有匹配到中文翻译结果：\n输入：\ncontent={content}\nhistory={history}\n\n输出：\n{response}\n-------"
             )
-            retries += 1
 
         return None
+
+    def translate_title(
+        self,
+        title: str,
+        max_retries: int = config.max_retries,
+    ) -> str | None:
+        return self._translate(
+            title_system_prompt, title, max_retries=max_retries, kind="title"
+        )
+
+    def _translate_chunks(
+        self,
+        system_prompt: str,
+        chunks: list[str],
+        history: list[list[str]],
+        max_retries: int,
+        on_partial: Optional[Callable[[str], None]],
+        kind: str,
+    ) -> str | None:
+        """
+        并行翻译切分后的各块并按顺序拼接，最多同时翻译 max_workers 块，任意一块失败时返回 None。
+        on_partial 以各块已生成的部分译文拼接后的结果调用
+        """
+        partials = [""] * len(chunks)
+        lock = threading.Lock()
+
+        def translate_chunk(index: int, chunk: str) -> str | None:
+            on_chunk_partial = None
+            if on_partial:
+
+                def on_chunk_partial(zh_text: str) -> None:
+                    with lock:
+                        partials[index] = zh_text
+                        on_partial(stitch_translations(chunks, partials))
+
+            return self._translate(
+                system_prompt, chunk, history, max_retries, on_chunk_partial, kind
+            )
+
+        results = parallel_func(
+            translate_chunk,
+            list(enumerate(chunks)),
+            max_workers=min(len(chunks), self.config.max_workers),
+        )
+        if any(result is None for result in results):
+            return None
+        return stitch_translations(chunks, results)
+
+    def translate_content(
+        self,
+        content: str,
+        history: list[list[str]] = None,
+        max_retries: int = config.max_retries,
+        on_partial: Optional[Callable[[str], None]] = None,
+    ) -> str | None:
+        """翻译正文，估计超过 split_tokens 的段落按句子切分后并行翻译"""
+        chunks = split_paragraph(content, self.config.split_tokens)
+        if len(chunks) > 1:
+            return self._translate_chunks(
+                content_system_prompt,
+                chunks,
+                history,
+                max_retries,
+                on_partial,
+                "content",
+            )
+        return self._translate(
+            content_system_prompt, content, history, max_retries, on_partial, "content"
+        )
+
+    def translate_markdown(
+        self,
+        content: str,
+        history: list[list[str]] = None,
+        max_retries: int = config.max_retries,
+        on_partial: Optional[Callable[[str], None]] = None,
+    ) -> str | None:
+        return self._translate(
+            markdown_systen_prompt,
+            content,
+            history,
+            max_retries,
+            on_partial,
+            "markdown",
+        )
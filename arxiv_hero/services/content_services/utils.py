@@ -1,11 +1,10 @@
 import re
 import os
 import string
+import hashlib
 
-import fitz  # PyMuPDF
 import tarfile
 import pypandoc
-from PIL import Image
 
 from arxiv_hero import logger
 from arxiv_hero.services.content_services.protocol import (
@@ -22,6 +21,18 @@ def is_all_digits(s: str) -> bool:
     return all(ch in allowed_chars for ch in s)
 
 
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def save_text(text: str, path: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
@@ -469,19 +480,13 @@ def extract_figure_path(text: str) -> list[str]:
     return [match.split(" ", 1)[0] for match in matches]
 
 
-def trans_figure_to_png(fig_path: str) -> str:
-    basename, ext = os.path.splitext(fig_path)
-    save_path = basename + ".png"
-    if os.path.isfile(save_path):
-        return save_path
-    if ext == ".pdf":
-        page = fitz.open(fig_path).load_page(0)
-        page.get_pixmap(dpi=300).save(save_path)
-        return save_path
-    if ext in (".eps", ".bmp"):
-        Image.open(fig_path).save(save_path, "PNG")
-        return save_path
-    return fig_path
+def replace_figure_path(text: str, mapping: dict[str, str]) -> str:
+    """按 mapping 替换 markdown 图片中的路径，每个图片只替换一次"""
+
+    def replace(match: re.Match) -> str:
+        return match.group(1) + mapping.get(match.group(2), match.group(2))
+
+    return re.sub(r"(!\[[^\]]*\]\()([^)\s]+)", replace, text)
 
 
 def get_root_file(file: LatexFile) -> LatexFile:
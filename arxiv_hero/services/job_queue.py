@@ -0,0 +1,248 @@
+import threading
+from typing import Any, Callable, Optional
+
+from apscheduler.triggers.interval import IntervalTrigger
+from pydantic_core import to_jsonable_python
+
+from arxiv_hero import logger
+from arxiv_hero.config import get_config, JobConfig
+from arxiv_hero.repositories.job_repository import JobRepository
+from arxiv_hero.utils.cancel_utils import CancelToken, CancelledError, get_cancel_token
+from arxiv_hero.services.task_manager import (
+    DEFAULT_LANE,
+    FINISHED_STATUS,
+    RETRYABLE_STATUS,
+    Priority,
+    Task,
+    TaskManager,
+)
+
+
+def log_callback(msg: str, data: dict, progress: float):
+    if msg:
+        logger.debug(f"{msg}: {(progress or 0)*100:.2f}%")
+
+
+class JobQueue:
+    """
+    持久化的任务队列，任务保存在数据库的 job 表中，由 TaskManager 在本进程中执行。
+
+    - 任务按类型(kind)注册处理函数，参数(payload)以 JSON 保存，处理函数需要是幂等的；
+    - 执行前原子地领取任务，执行期间定期续约，进程崩溃后租约过期，任务会被重新领取；
+    - 启动时和之后每隔 poll_interval 秒拉取待执行的任务，多个进程可以共享同一张任务表；
+    - 任务的租约只保存在 job 表中，创建 Task 时 shared=False，不再通过 TaskManager 的后端登记。
+    """
+
+    def __init__(
+        self,
+        task_manager: TaskManager,
+        repository: Optional[JobRepository] = None,
+        config: Optional[JobConfig] = None,
+    ):
+        self.task_manager = task_manager
+        self.repository = repository or JobRepository()
+        self.config = config or get_config().job
+        self.worker_id = task_manager.worker_id
+
+        self._handlers: dict[str, Callable[..., Any]] = {}
+        self._options: dict[str, tuple[str, Priority]] = (
+            {}
+        )  # k:任务类型 v:(通道,优先级)
+        self._lock = threading.Lock()
+        self._running: set[str] = set()  # 本进程正在执行的任务
+
+    def register(
+        self,
+        kind: str,
+        handler: Callable[..., Any],
+        lane: str = DEFAULT_LANE,
+        priority: Priority = "background",
+    ) -> None:
+        """
+        注册处理函数，处理函数以 `handler(**payload, callback=callback)` 的形式调用
+
+        Args:
+            kind: 任务类型
+            handler: 处理函数
+            lane: 执行任务的通道
+            priority: 默认优先级，进程重启后恢复的任务总是以 background 执行
+        """
+        self._handlers[kind] = handler
+        self._options[kind] = (lane, priority)
+
+    def start(self) -> None:
+        """恢复未完成的任务，并开始定期拉取任务和续约"""
+        self.task_manager.scheduler.add_job(
+            self.poll,
+            trigger=IntervalTrigger(seconds=self.config.poll_interval),
+            id="job_queue_poll",
+            replace_existing=True,
+        )
+        self.task_manager.scheduler.add_job(
+            self.heartbeat,
+            trigger=IntervalTrigger(seconds=self.config.heartbeat_interval),
+            id="job_queue_heartbeat",
+            replace_existing=True,
+        )
+        logger.info(f"任务队列已启动：{self.worker_id}")
+        self.poll()
+
+    def submit(
+        self,
+        job_id: str,
+        kind: str,
+        payload: dict,
+        callback: Optional[Callable[[str, dict, float], None]] = None,
+        priority: Optional[Priority] = None,
+    ) -> Task:
+        """
+        提交任务并返回本进程中对应的 Task，Task 开始执行后才会领取任务
+
+        Args:
+            job_id: 任务 ID，同时也是 Task 的 ID
+            kind: 任务类型
+            payload: 处理函数的参数，需要可以被 JSON 序列化
+            callback: 回调函数
+            priority: 优先级，默认使用注册时的优先级
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"未注册的任务类型：{kind}")
+
+        task = self.task_manager.get_task(job_id)
+        if task is not None and task.get_status() not in RETRYABLE_STATUS:
+            return task  # 执行中，或已完成且结果仍在缓存中
+
+        self.repository.enqueue(job_id, kind, payload, self.config.max_attempts)
+        if task is not None:
+            self.task_manager.delete_task(job_id)
+        lane, default_priority = self._options[kind]
+        return self.task_manager.create_task(
+            self._execute,
+            args=(job_id,),
+            kwargs={"callback": callback or log_callback},
+            task_id=job_id,
+            priority=priority or default_priority,
+            lane=lane,
+            kind=kind,
+            shared=False,
+        )
+
+    def poll(self) -> None:
+        """领取待执行和租约过期的任务，在本进程中执行"""
+        limit = self.task_manager.max_workers - len(self._running)
+        if limit <= 0:
+            return
+        try:
+            self.repository.fail_exhausted()
+            job_ids = self.repository.list_claimable_ids(
+                kinds=list(self._handlers), limit=limit
+            )
+        except Exception as e:
+            logger.warning(f"拉取任务失败：{e}")
+            return
+
+        for job_id in job_ids:
+            job = self.repository.get_job(job_id)
+            if job is None:
+                continue
+            task = self.task_manager.get_task(job_id)
+            if task is not None:
+                if task.get_status() not in FINISHED_STATUS:
+                    continue  # 已提交，等待客户端开始执行
+                self.task_manager.delete_task(job_id)
+            self.task_manager.create_task(
+                self._execute,
+                args=(job_id,),
+                kwargs={"callback": log_callback, "follow": False},
+                task_id=job_id,
+                priority="background",
+                lane=self._options[job.kind][0],
+                kind=job.kind,
+                shared=False,
+            )
+            self.task_manager.run_task(job_id)
+            logger.info(f"恢复执行任务 {job_id}")
+
+    def heartbeat(self) -> None:
+        with self._lock:
+            job_ids = list(self._running)
+        for job_id in job_ids:
+            try:
+                if not self.repository.heartbeat(
+                    job_id, self.worker_id, self.config.lease_seconds
+                ):
+                    # 任务已被取消或被其他进程接管，停止本进程中的执行
+                    logger.warning(f"任务 {job_id} 已失去租约，停止执行")
+                    self.task_manager.cancel_task(job_id)
+            except Exception as e:
+                logger.warning(f"任务 {job_id} 续约失败：{e}")
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        取消任务，取消后不会再被重试或恢复。在其他进程中执行的任务会在下次续约时停止。
+        也可以用于取消不是由任务队列提交的 Task
+
+        Returns:
+            bool: 任务存在且未结束时返回 True
+        """
+        job_cancelled = self.repository.cancel(job_id)
+        task_cancelled = self.task_manager.cancel_task(job_id)
+        return job_cancelled or task_cancelled
+
+    def _execute(
+        self,
+        job_id: str,
+        follow: bool = True,
+        callback: Callable[[str, dict, float], None] = None,
+    ) -> Any:
+        """
+        领取并执行任务
+
+        Args:
+            job_id: 任务 ID
+            follow: 任务已被其他进程领取时，是否等待其执行结束
+            callback: 回调函数
+        """
+        cancel_token = get_cancel_token() or CancelToken()
+        notified = False
+        while not self.repository.claim(
+            job_id, self.worker_id, self.config.lease_seconds
+        ):
+            if not follow:
+                # 不能作为已完成的结果缓存，客户端再次提交时会重新创建任务并等待
+                raise CancelledError(f"任务 {job_id} 已被其他进程领取")
+            job = self.repository.get_job(job_id)
+            if job is None or job.status == "cancelled":
+                raise RuntimeError(f"任务 {job_id} 已取消")
+            if job.status == "completed":
+                return self.repository.get_result(job_id)
+            if job.status == "error":
+                raise RuntimeError(job.error)
+            if callback and not notified:
+                callback(f"任务正在其他进程中执行：{job.worker_id}", None, None)
+                notified = True
+            cancel_token.wait(self.config.poll_interval)
+            cancel_token.raise_if_cancelled()
+
+        job = self.repository.get_job(job_id)
+        with self._lock:
+            self._running.add(job_id)
+        try:
+            logger.info(f"开始执行任务 {job_id}，第 {job.attempts} 次尝试")
+            result = self._handlers[job.kind](**job.payload, callback=callback)
+        except CancelledError:
+            self.repository.finish(job_id, self.worker_id, "cancelled")
+            raise
+        except Exception as e:
+            self.repository.finish(job_id, self.worker_id, "error", error=str(e))
+            raise
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+        try:
+            stored = to_jsonable_python(result)
+        except Exception as e:
+            logger.warning(f"任务 {job_id} 的结果无法序列化，不保存：{e}")
+            stored = None
+        self.repository.finish(job_id, self.worker_id, "completed", result=stored)
+        return result
@@ -0,0 +1,374 @@
+import time
+import threading
+from typing import Optional
+
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from arxiv_hero import logger
+from arxiv_hero.config import TaskConfig
+from arxiv_hero.repositories.task_repository import TaskRepository, TaskStateRecord
+from arxiv_hero.repositories.task_repository.protocol import FINISHED_TASK_STATUS
+
+try:
+    import redis
+except ImportError:  # redis 为可选依赖，只在 backend = "redis" 时需要
+    redis = None
+
+# 租约仍由 ARGV[1] 持有时续期 ARGV[2] 毫秒，比较和续期在 redis 中原子执行
+RENEW_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+# 租约仍由 ARGV[1] 持有时删除
+RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+# 租约 KEYS[1] 仍由 ARGV[1] 持有时，将任务 KEYS[2] 的状态设为 ARGV[2]；
+# 任务结束时(ARGV[3] 为保留的秒数)释放租约，任务状态和事件 KEYS[3] 在 ARGV[3] 秒后过期
+SET_STATUS_SCRIPT = """
+if redis.call("get", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call("hset", KEYS[2], "status", ARGV[2])
+if ARGV[3] ~= "" then
+    redis.call("hset", KEYS[2], "lease_expires", ARGV[4])
+    redis.call("del", KEYS[1])
+    redis.call("expire", KEYS[2], ARGV[3])
+    redis.call("expire", KEYS[3], ARGV[3])
+end
+return 1
+"""
+
+
+class TaskBackend:
+    """
+    任务登记表和事件流的后端，使多个进程(如 uvicorn --workers N)共享任务状态。
+
+    - 执行任务前通过 `acquire_task` 登记，同一个任务同时只在一个进程中执行，
+      其他进程中的客户端通过 `list_events` 和 `get_state` 跟随执行进度；
+    - 执行任务的进程定期续约，进程退出后租约过期，任务可以被其他进程接管；
+    - 其他进程通过 `request_cancel` 请求取消，执行任务的进程续约时通过
+      `list_cancel_requests` 检查并取消；
+    - `acquire_leader` 用于选举，如定时抓取文章只在 leader 进程中执行。
+
+    默认实现只有一个进程，不需要共享，所有操作都直接成功。
+    """
+
+    shared = False  # 是否在多个进程之间共享
+
+    def acquire_task(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return True
+
+    def renew_tasks(
+        self, task_ids: list[str], worker_id: str, lease_seconds: float
+    ) -> list[str]:
+        """续约，返回已被其他进程接管的任务"""
+        return []
+
+    def set_status(self, task_id: str, worker_id: str, status: str) -> None:
+        pass
+
+    def request_cancel(self, task_id: str) -> bool:
+        """请求执行任务的进程取消任务，任务不存在或已结束时返回 False"""
+        return False
+
+    def list_cancel_requests(self, task_ids: list[str]) -> list[str]:
+        """返回 task_ids 中被请求取消的任务"""
+        return []
+
+    def get_state(self, task_id: str) -> Optional[TaskStateRecord]:
+        return None
+
+    def publish(self, task_id: str, event_id: int, frame: bytes) -> None:
+        pass
+
+    def list_events(
+        self, task_id: str, after_event_id: int = 0
+    ) -> list[tuple[int, bytes]]:
+        return []
+
+    def clean(self, before: float) -> None:
+        """删除在 before 之前结束的任务"""
+
+    def acquire_leader(self, name: str, worker_id: str, lease_seconds: float) -> bool:
+        return True
+
+    def release_leader(self, name: str, worker_id: str) -> None:
+        pass
+
+
+class DatabaseTaskBackend(TaskBackend):
+    """保存在数据库中，默认的 sqlite 数据库可以在同一台机器的多个进程之间共享"""
+
+    shared = True
+
+    def __init__(
+        self, repository: Optional[TaskRepository] = None, history_size: int = 256
+    ):
+        self.repository = repository or TaskRepository()
+        self.history_size = history_size
+
+    def acquire_task(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return self.repository.acquire_task(task_id, worker_id, lease_seconds)
+
+    def renew_tasks(
+        self, task_ids: list[str], worker_id: str, lease_seconds: float
+    ) -> list[str]:
+        return self.repository.renew_tasks(task_ids, worker_id, lease_seconds)
+
+    def set_status(self, task_id: str, worker_id: str, status: str) -> None:
+        self.repository.set_status(task_id, worker_id, status)
+
+    def request_cancel(self, task_id: str) -> bool:
+        return self.repository.request_cancel(task_id)
+
+    def list_cancel_requests(self, task_ids: list[str]) -> list[str]:
+        return self.repository.list_cancel_requests(task_ids)
+
+    def get_state(self, task_id: str) -> Optional[TaskStateRecord]:
+        return self.repository.get_state(task_id)
+
+    def publish(self, task_id: str, event_id: int, frame: bytes) -> None:
+        self.repository.add_event(
+            task_id, event_id, frame.decode("utf-8"), keep=self.history_size
+        )
+
+    def list_events(
+        self, task_id: str, after_event_id: int = 0
+    ) -> list[tuple[int, bytes]]:
+        return [
+            (event_id, frame.encode("utf-8"))
+            for event_id, frame in self.repository.list_events(task_id, after_event_id)
+        ]
+
+    def clean(self, before: float) -> None:
+        self.repository.clean(before)
+
+    def acquire_leader(self, name: str, worker_id: str, lease_seconds: float) -> bool:
+        return self.repository.acquire_leader(name, worker_id, lease_seconds)
+
+    def release_leader(self, name: str, worker_id: str) -> None:
+        self.repository.release_leader(name, worker_id)
+
+
+class RedisTaskBackend(TaskBackend):
+    """
+    保存在 redis 中，可以在多台机器之间共享。
+
+    - `{prefix}task:{task_id}`: 任务状态(hash)，`{prefix}task:{task_id}:lease`: 执行进程的租约；
+    - `{prefix}task:{task_id}:events`: 事件列表，每项为 `{event_id}\\n{frame}`；
+    - `{prefix}task:{task_id}:cancel`: 其他进程请求取消任务；
+    - `{prefix}leader:{name}`: leader 的租约。
+
+    租约通过 `SET NX PX` 抢占，续约、释放等先比较持有者再修改的操作通过 lua 脚本原子执行，
+    结束的任务在 result_ttl 秒后由 redis 自动删除。
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        client: "redis.Redis",
+        prefix: str = "arxiv_hero:",
+        history_size: int = 256,
+        result_ttl: float = 600,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.history_size = history_size
+        self.result_ttl = result_ttl
+        self._renew_lease = client.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = client.register_script(RELEASE_LEASE_SCRIPT)
+        self._set_status = client.register_script(SET_STATUS_SCRIPT)
+
+    @staticmethod
+    def _str(value: bytes | str | None) -> Optional[str]:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _key(self, task_id: str, suffix: str = "") -> str:
+        return f"{self.prefix}task:{task_id}{suffix}"
+
+    def _acquire(self, key: str, worker_id: str, lease_seconds: float) -> bool:
+        """抢占或续约租约"""
+        ms = int(lease_seconds * 1000)
+        if self.client.set(key, worker_id, nx=True, px=ms):
+            return True
+        return bool(self._renew_lease(keys=[key], args=[worker_id, ms]))
+
+    def acquire_task(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        if not self._acquire(self._key(task_id, ":lease"), worker_id, lease_seconds):
+            return False
+        self.client.delete(self._key(task_id, ":events"), self._key(task_id, ":cancel"))
+        self.client.hset(
+            self._key(task_id),
+            mapping={
+                "worker_id": worker_id,
+                "status": "waiting",
+                "lease_expires": time.time() + lease_seconds,
+            },
+        )
+        self.client.persist(self._key(task_id))
+        return True
+
+    def renew_tasks(
+        self, task_ids: list[str], worker_id: str, lease_seconds: float
+    ) -> list[str]:
+        lost = []
+        for task_id in task_ids:
+            if self._acquire(self._key(task_id, ":lease"), worker_id, lease_seconds):
+                self.client.hset(
+                    self._key(task_id), "lease_expires", time.time() + lease_seconds
+                )
+            else:
+                lost.append(task_id)
+        return lost
+
+    def set_status(self, task_id: str, worker_id: str, status: str) -> None:
+        finished = status in FINISHED_TASK_STATUS
+        self._set_status(
+            keys=[
+                self._key(task_id, ":lease"),
+                self._key(task_id),
+                self._key(task_id, ":events"),
+            ],
+            args=[
+                worker_id,
+                status,
+                int(self.result_ttl) if finished else "",
+                time.time(),
+            ],
+        )
+
+    def request_cancel(self, task_id: str) -> bool:
+        state = self.get_state(task_id)
+        if state is None or state.is_finished:
+            return False
+        self.client.set(
+            self._key(task_id, ":cancel"), "1", px=int(self.result_ttl * 1000)
+        )
+        return True
+
+    def list_cancel_requests(self, task_ids: list[str]) -> list[str]:
+        return [
+            task_id
+            for task_id in task_ids
+            if self.client.get(self._key(task_id, ":cancel")) is not None
+        ]
+
+    def get_state(self, task_id: str) -> Optional[TaskStateRecord]:
+        state = {
+            self._str(k): self._str(v)
+            for k, v in self.client.hgetall(self._key(task_id)).items()
+        }
+        if not state:
+            return None
+        return TaskStateRecord(
+            task_id=task_id,
+            worker_id=state["worker_id"],
+            status=state["status"],
+            lease_expires=float(state["lease_expires"]),
+        )
+
+    def publish(self, task_id: str, event_id: int, frame: bytes) -> None:
+        key = self._key(task_id, ":events")
+        self.client.rpush(key, f"{event_id}\n".encode("utf-8") + frame)
+        self.client.ltrim(key, -self.history_size, -1)
+
+    def list_events(
+        self, task_id: str, after_event_id: int = 0
+    ) -> list[tuple[int, bytes]]:
+        events = []
+        for item in self.client.lrange(self._key(task_id, ":events"), 0, -1):
+            if isinstance(item, str):
+                item = item.encode("utf-8")
+            event_id, frame = item.split(b"\n", 1)
+            if int(event_id) > after_event_id:
+                events.append((int(event_id), frame))
+        return events
+
+    def acquire_leader(self, name: str, worker_id: str, lease_seconds: float) -> bool:
+        return self._acquire(f"{self.prefix}leader:{name}", worker_id, lease_seconds)
+
+    def release_leader(self, name: str, worker_id: str) -> None:
+        self._release_lease(keys=[f"{self.prefix}leader:{name}"], args=[worker_id])
+
+
+def create_task_backend(config: TaskConfig, history_size: int = 256) -> TaskBackend:
+    """按配置创建任务后端"""
+    if config.backend == "database":
+        return DatabaseTaskBackend(history_size=history_size)
+    if config.backend == "redis":
+        if redis is None:
+            raise ImportError("使用 redis 后端需要安装 redis：pip install redis")
+        return RedisTaskBackend(
+            redis.Redis.from_url(config.redis_url),
+            history_size=history_size,
+            result_ttl=config.result_ttl,
+        )
+    return TaskBackend()
+
+
+class LeaderElector:
+    """
+    选举 leader，只有 leader 进程执行定时任务等只需要执行一次的工作。
+
+    leader 每隔 lease_seconds / 3 秒续约，进程退出后租约过期，由其他进程接替。
+    """
+
+    def __init__(
+        self,
+        backend: TaskBackend,
+        name: str,
+        worker_id: str,
+        lease_seconds: float = 30,
+    ):
+        self.backend = backend
+        self.name = name
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._is_leader = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def elect(self) -> bool:
+        """参与选举或续约，返回本进程是否为 leader"""
+        with self._lock:
+            try:
+                is_leader = self.backend.acquire_leader(
+                    self.name, self.worker_id, self.lease_seconds
+                )
+            except Exception as e:
+                logger.warning(f"选举 {self.name} 的 leader 失败：{e}")
+                is_leader = False
+            if is_leader != self._is_leader:
+                logger.info(
+                    f"{self.worker_id} {'成为' if is_leader else '不再是'} "
+                    f"{self.name} 的 leader"
+                )
+            self._is_leader = is_leader
+            return is_leader
+
+    def start(self, scheduler: BaseScheduler) -> None:
+        """立即参与选举，之后定期续约"""
+        self.elect()
+        scheduler.add_job(
+            self.elect,
+            trigger=IntervalTrigger(seconds=max(self.lease_seconds / 3, 1)),
+            id=f"leader_{self.name}",
+            replace_existing=True,
+        )
+
+    def resign(self) -> None:
+        with self._lock:
+            if self._is_leader:
+                self.backend.release_leader(self.name, self.worker_id)
+                self._is_leader = False
@@ -1,17 +1,27 @@
+import os
+import asyncio
+import time
+import socket
 import threading
 import uuid
 import traceback
+from collections import deque
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Literal, Optional, Iterator, Callable
+from typing import Any, AsyncIterator, Literal, Optional, Callable
 
 from pydantic import BaseModel
+from fastapi import Request
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.job import Job
 
 from arxiv_hero import logger
+from arxiv_hero.common.metrics import REGISTRY, Gauge, Histogram
+from arxiv_hero.services.task_backend import TaskBackend, LeaderElector
+from arxiv_hero.utils.cancel_utils import CancelToken, CancelledError, use_cancel_token
+from arxiv_hero.utils.concurrency_utils import LLMJob, use_llm_job
 
 
 class TaskStatus(Enum):
@@ -22,6 +32,58 @@ class TaskStatus(Enum):
     ERROR = "error"
 
 
+FINISHED_STATUS = {TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.ERROR}
+# 可以重新执行的状态，已完成的任务直接使用缓存的结果
+RETRYABLE_STATUS = {TaskStatus.CANCELLED, TaskStatus.ERROR}
+
+# 优先级，数值越小越先执行
+Priority = Literal["interactive", "background", "bulk"]
+PRIORITY_LEVELS: dict[str, int] = {"interactive": 0, "background": 1, "bulk": 2}
+DEFAULT_LANE = "default"
+
+
+TASKS = Gauge("arxiv_hero_tasks", "任务数", ("kind", "status"))
+LANE_RUNNING = Gauge("arxiv_hero_lane_running", "通道中正在执行的任务数", ("lane",))
+LANE_QUEUED = Gauge("arxiv_hero_lane_queued", "通道中排队的任务数", ("lane",))
+LANE_CAPACITY = Gauge("arxiv_hero_lane_capacity", "通道的并发上限", ("lane",))
+TASK_QUEUE_WAIT = Histogram(
+    "arxiv_hero_task_queue_wait_seconds", "任务排队等待的时间", ("lane", "kind")
+)
+TASK_RUN = Histogram(
+    "arxiv_hero_task_run_seconds", "任务执行的时间", ("kind", "status")
+)
+LOCK_HOLD = Histogram(
+    "arxiv_hero_task_lock_hold_seconds",
+    "持有任务表锁的时间",
+    ("operation",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+
+class TaskInfo(BaseModel):
+    task_id: str
+    kind: str
+    status: TaskStatus
+    progress: float
+    priority: str
+    lane: str
+    subscribers: int  # 正在接收消息的客户端数
+    age: float  # 创建至今的秒数
+    wait_time: Optional[float] = None  # 排队等待的秒数
+    run_time: Optional[float] = None  # 执行的秒数，执行中的任务为已执行的秒数
+
+
+class LaneStats(BaseModel):
+    lane: str
+    max_workers: int  # 并发上限
+    running: int  # 正在执行的任务数
+    queued: int  # 排队中的任务数
+    queued_by_priority: dict[str, int]
+    oldest_wait: float  # 排队最久的任务已等待的秒数
+    avg_wait: float  # 已开始执行的任务的平均等待秒数
+    dispatched: int  # 已开始执行的任务数
+
+
 class TaskMessage(BaseModel):
     code: Literal[200, 400, 500] = 200
     msg: Optional[str] = None
@@ -30,11 +92,23 @@ class TaskMessage(BaseModel):
 
 
 class Task:
-    def __init__(self, task_id: str, func: Callable, args: tuple, kwargs: dict):
+    def __init__(
+        self,
+        task_id: str,
+        func: Callable,
+        args: tuple,
+        kwargs: dict,
+        history_size: int = 256,
+        priority: Priority = "background",
+        lane: str = DEFAULT_LANE,
+        kind: Optional[str] = None,
+        shared: bool = True,
+    ):
         args = args or ()
         kwargs = kwargs or {}
 
         self.task_id = task_id
+        self.kind = kind or getattr(func, "__name__", "unknown")  # 任务类型，用于统计
         self._func = func
         self._args = args
         self._callback: Optional[Callable[[str, dict, float], None]] = kwargs.pop(
@@ -45,21 +119,145 @@ class Task:
         self._status = TaskStatus.WAITING
         self._progress: float = 0.0  # 执行进度
 
-        self.history: list[TaskMessage] = []  # 存储执行过程中的信息
+        self.cancel_token = CancelToken()  # 取消时中断正在执行的函数
+        self.priority = priority
+        self.lane = lane
+        # 是否通过 TaskManager 的后端在多个进程之间登记，
+        # 自己维护租约的任务(如 JobQueue 的任务)为 False，避免一个任务有两个租约
+        self.shared = shared
+        self.enqueued_at: Optional[float] = None  # 进入队列的时间，不在队列中时为 None
+        self.created_at = time.monotonic()
+        self.wait_time: Optional[float] = None  # 最近一次执行前排队等待的秒数
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        # 执行过程中的信息，保存序列化后的 SSE 帧，只保留最近的 history_size 条
+        self.history: deque[tuple[int, bytes]] = deque(maxlen=history_size)
+        self._event_id = 0  # 单调递增的事件 ID
         self.result: Optional[dict | Any] = None
         self.condition = threading.Condition()  # 用于线程间通知
+        # 异步订阅者，任务线程通过 call_soon_threadsafe 把消息推送到各自的事件循环
+        self._subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        # 由 TaskManager 设置，把消息和状态同步到多进程共享的后端
+        self._on_event: Optional[Callable[[int, bytes], None]] = None
+        self._on_status: Optional[Callable[[TaskStatus], None]] = None
+
+    def _publish(self, item: tuple[int, bytes] | TaskStatus) -> None:
+        """
+        推送消息或新的状态给所有订阅者，需要在 self.condition 中调用。
+        消息和状态按发生的顺序推送，订阅者收到结束状态时，之前的消息都已收到
+        """
+        for loop, queue in list(self._subscribers):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # 事件循环已关闭
+                self._subscribers.remove((loop, queue))
+
+    def subscribe(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+        last_event_id: int = 0,
+    ) -> tuple[list[tuple[int, bytes]], bool]:
+        """
+        注册订阅者，之后的消息会推送到 queue 中
 
-    def __add_message(self, message: TaskMessage) -> None:
+        Returns:
+            tuple[list[tuple[int, bytes]], bool]: 事件 ID 大于 last_event_id 的历史消息，
+                以及注册时任务是否已经结束。last_event_id 之后的部分消息已被丢弃时，
+                第一条为当前进度的快照，客户端不会在不知情的情况下漏掉消息
+        """
+        with self.condition:
+            self._subscribers.append((loop, queue))
+            history = [item for item in self.history if item[0] > last_event_id]
+            if self.history and self.history[0][0] > last_event_id + 1:
+                logger.info(
+                    f"任务 {self.task_id} 事件 {last_event_id} 之后的部分消息已被丢弃，"
+                    f"从事件 {self.history[0][0]} 开始推送"
+                )
+                dropped = self.history[0][0] - 1
+                history.insert(0, self._snapshot(dropped, dropped - last_event_id))
+            return history, self._status in FINISHED_STATUS
+
+    def _snapshot(self, event_id: int, skipped: int) -> tuple[int, bytes]:
+        """
+        当前进度的快照，代替已丢弃的 skipped 条消息，需要在 self.condition 中调用。
+        使用最后一条被丢弃的事件 ID，客户端之后重连时从保留的消息开始
+        """
+        message = TaskMessage(
+            msg=f"已跳过 {skipped} 条较早的消息", progress=self._progress
+        )
+        data = message.model_dump_json()
+        return event_id, f"id: {event_id}\ndata: {data}\n\n".encode()
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
         with self.condition:
-            self.history.append(message)
+            self._subscribers = [i for i in self._subscribers if i[1] is not queue]
+
+    @property
+    def watchers(self) -> int:
+        """正在接收消息的订阅者数，大于 0 时不会被清理"""
+        with self.condition:
+            return len(self._subscribers)
+
+    def __add_message(self, message: TaskMessage, transient: bool = False) -> None:
+        data = message.model_dump_json()  # 只序列化一次，所有订阅者共用
+        if transient:
+            # 临时消息(如部分译文)只推送给当前的订阅者，不保存、不分配事件 ID，
+            # 也不同步到多进程共享的后端，之后会有完整的消息替代
+            with self.condition:
+                self._publish((self._event_id, f"data: {data}\n\n".encode()))
+            return
+        with self.condition:
+            self._event_id += 1
+            item = (self._event_id, f"id: {self._event_id}\ndata: {data}\n\n".encode())
+            self.history.append(item)
+            self._publish(item)
             self.condition.notify_all()
+        if self._on_event:
+            self._on_event(*item)
 
     def __update_status(self, status: TaskStatus) -> None:
         if not isinstance(status, TaskStatus):
             raise ValueError("Invalid status type")
         with self.condition:
             self._status = status
+            if status in FINISHED_STATUS:
+                self.finished_at = time.monotonic()
+            self._publish(status)
             self.condition.notify_all()
+        if self._on_status:
+            self._on_status(status)
+
+    @property
+    def last_event_id(self) -> int:
+        with self.condition:
+            return self._event_id
+
+    def _mirror_event(self, event_id: int, frame: bytes) -> None:
+        """写入在其他进程中执行的同一任务的消息，保留原来的事件 ID"""
+        try:
+            message = TaskMessage.model_validate_json(frame.split(b"data: ", 1)[1])
+        except Exception:
+            message = None
+        with self.condition:
+            if event_id <= self._event_id:
+                return
+            self._event_id = event_id
+            item = (event_id, frame)
+            self.history.append(item)
+            self._publish(item)
+            if message and message.progress is not None:
+                self._progress = message.progress
+            if message and message.msg == "[DONE]":
+                self.result = message.data
+            self.condition.notify_all()
+
+    def _mirror_status(self, status: TaskStatus, msg: Optional[str] = None) -> None:
+        """更新在其他进程中执行的任务的状态，msg 不为空时先推送一条错误消息"""
+        if msg:
+            self.__add_message(TaskMessage(code=500, msg=msg))
+        self.__update_status(status)
 
     def __update_progress(self, progress: float) -> None:
         if not 0 <= progress <= 1:
@@ -72,7 +270,11 @@ class Task:
     def _run(self) -> None:
         def _callback(msg: str = None, data: dict = None, progress: float = None):
             self._callback(msg, data, progress)
-            self.__add_message(TaskMessage(msg=msg, data=data, progress=progress))
+            # data 中 partial 为 True 的消息为临时消息
+            transient = isinstance(data, dict) and data.get("partial") is True
+            self.__add_message(
+                TaskMessage(msg=msg, data=data, progress=progress), transient
+            )
             if progress is not None:
                 self.__update_progress(progress)
 
@@ -83,23 +285,83 @@ class Task:
             else {**self._kwargs, "callback": _callback}
         )
 
+        if self.cancel_token.is_cancelled:
+            return  # 排队期间被取消
+
+        self.started_at, self.finished_at = time.monotonic(), None
         self.__update_progress(0)
         self.__update_status(TaskStatus.RUNNING)
         try:
-            result = self._func(*args, **kwargs)
+            # 被调用的函数通过 get_cancel_token 获取令牌，在段落、批次之间检查是否已取消；
+            # 调用大模型时按任务和优先级公平排队
+            with use_cancel_token(self.cancel_token), use_llm_job(
+                LLMJob(self.task_id, self.priority, kind=self.kind)
+            ):
+                result = self._func(*args, **kwargs)
+            self.cancel_token.raise_if_cancelled()
             self.__update_progress(1)
             self.set_result(result)
             self.__add_message(TaskMessage(msg="[DONE]", data=result, progress=1))
             self.__update_status(TaskStatus.COMPLETED)
+        except CancelledError:
+            logger.info(f"任务 {self.task_id} 已取消")
+            self.__add_message(TaskMessage(code=400, msg="任务已取消"))
+            self.__update_status(TaskStatus.CANCELLED)
         except Exception as e:
+            if self.cancel_token.is_cancelled:
+                # 取消时关闭连接等操作可能引发其他异常
+                logger.info(f"任务 {self.task_id} 已取消：{e}")
+                self.__add_message(TaskMessage(code=400, msg="任务已取消"))
+                self.__update_status(TaskStatus.CANCELLED)
+                return
             logger.warning(
                 f"\n执行任务 {self.task_id} 失败：{str(e)}\n{traceback.format_exc()}"
             )
             self.__add_message(TaskMessage(code=500, msg=str(e)))
             self.__update_status(TaskStatus.ERROR)
 
+    def info(self) -> TaskInfo:
+        now = time.monotonic()
+        with self.condition:
+            wait_time = self.wait_time
+            if self.enqueued_at is not None and wait_time is None:
+                wait_time = now - self.enqueued_at  # 仍在排队
+            return TaskInfo(
+                task_id=self.task_id,
+                kind=self.kind,
+                status=self._status,
+                progress=self._progress,
+                priority=self.priority,
+                lane=self.lane,
+                subscribers=self.watchers,
+                age=now - self.created_at,
+                wait_time=wait_time,
+                run_time=(
+                    (self.finished_at or now) - self.started_at
+                    if self.started_at
+                    else None
+                ),
+            )
+
     def cancel(self) -> None:
-        self.__update_status(TaskStatus.CANCELLED)
+        """取消任务，正在执行的函数会在下一次检查令牌时停止，进行中的大模型请求会被中断"""
+        self.cancel_token.cancel()
+        with self.condition:
+            # 执行中的任务由 _run 在函数退出后更新状态，已结束的任务不再修改
+            if self._status == TaskStatus.WAITING:
+                self.__add_message(TaskMessage(code=400, msg="任务已取消"))
+                self.__update_status(TaskStatus.CANCELLED)
+
+    def reset_cancel_token(self) -> None:
+        """已结束的任务再次执行(如定时任务)前更换取消令牌，取消只作用于当次执行"""
+        with self.condition:
+            if self._status not in FINISHED_STATUS:
+                return
+            self.cancel_token = CancelToken()
+            cancelled = self._status == TaskStatus.CANCELLED
+        if cancelled:
+            # 否则调度时会被当作排队期间取消而跳过
+            self.__update_status(TaskStatus.WAITING)
 
     def get_status(self) -> TaskStatus:
         with self.condition:
@@ -118,12 +380,78 @@ class Task:
             self.result = result
 
 
+class _Lane:
+    """一类任务(如调用大模型、下载、计算)的等待队列和并发上限"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.running = 0
+        self.queue: list[Task] = []
+        self.dispatched = 0
+        self.total_wait = 0.0
+
+
 class TaskManager:
-    def __init__(self, max_workers: int = 5, clean_interval: int = 360):
+    """
+    在线程池中执行任务。
+
+    任务按类型分配到不同的通道(lane)，每个通道有独立的并发上限，互不阻塞；
+    通道内按优先级(interactive > background > bulk)执行，排队每超过 aging_seconds 秒，
+    优先级提升一级，避免低优先级的任务一直等待。
+
+    已结束的任务保留 result_ttl 秒，之后订阅的客户端直接收到历史消息和最终状态，
+    已完成的任务不会重复执行；仍有订阅者的任务不会被清理。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 5,
+        clean_interval: int = 60,
+        history_size: int = 256,
+        lanes: Optional[dict[str, int]] = None,
+        aging_seconds: float = 30,
+        result_ttl: float = 600,
+        result_cache_size: int = 128,
+        backend: Optional[TaskBackend] = None,
+        lease_seconds: float = 30,
+        follow_interval: float = 0.5,
+    ):
+        """
+        Args:
+            max_workers: 默认通道的并发上限
+            clean_interval: 清理过期任务的间隔，单位是秒
+            history_size: 每个任务保留的历史消息数
+            lanes: 各通道的并发上限，未包含默认通道时使用 max_workers
+            aging_seconds: 排队多少秒后优先级提升一级
+            result_ttl: 已结束的任务保留的时间，单位是秒
+            result_cache_size: 最多保留的已结束任务数，超过时先清理最早结束的
+            backend: 任务状态的后端，多个进程共享时，同一个任务只在一个进程中执行，
+                其他进程跟随执行进度，默认只在本进程中
+            lease_seconds: 执行任务的租约时长，进程退出后超过该时间，任务由其他进程接管
+            follow_interval: 跟随其他进程中的任务时，读取新消息的间隔
+        """
         self.tasks: dict[str, Task] = {}
+        self.history_size = history_size
+        self.aging_seconds = aging_seconds
+        self.result_ttl = result_ttl
+        self.result_cache_size = result_cache_size
+        self.backend = backend or TaskBackend()
+        self.lease_seconds = lease_seconds
+        self.follow_interval = follow_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._owned: set[str] = set()  # 在后端登记由本进程执行、尚未结束的任务
+        self._owned_lock = threading.Lock()
+        self.lanes: dict[str, _Lane] = {
+            name: _Lane(name, size)
+            for name, size in {DEFAULT_LANE: max_workers, **(lanes or {})}.items()
+        }
+        self.max_workers = sum(lane.max_workers for lane in self.lanes.values())
         self.lock = threading.Lock()
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._queue_lock = threading.Lock()  # 保护各通道的队列和计数
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
         self._shutdown = False
+        REGISTRY.add_collector(self._collect_metrics)
 
         # 初始化 apscheduler
         self.scheduler = BackgroundScheduler(daemon=True)
@@ -136,6 +464,13 @@ class TaskManager:
             id="clean_completed_tasks",
             replace_existing=True,
         )
+        if self.backend.shared:
+            self.scheduler.add_job(
+                self._renew_tasks,
+                trigger=IntervalTrigger(seconds=max(lease_seconds / 3, 1)),
+                id="renew_tasks",
+                replace_existing=True,
+            )
 
     def __enter__(self):
         return self
@@ -143,21 +478,47 @@ class TaskManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.shutdown(wait=True)
 
+    def _is_evictable(self, task: Task) -> bool:
+        """任务已结束且没有订阅者，需要在 self.lock 中调用"""
+        return (
+            task.get_status() in FINISHED_STATUS
+            and task.finished_at is not None
+            and task.watchers == 0
+        )
+
+    def _is_expired(self, task: Task, now: float) -> bool:
+        return self._is_evictable(task) and now - task.finished_at > self.result_ttl
+
     def clean_completed_tasks(self):
         """
-        删除状态为 COMPLETED、CANCELLED 或 ERROR 的任务。
+        删除结束超过 result_ttl 秒的任务，已结束的任务超过 result_cache_size 个时，
+        删除最早结束的任务。有订阅者的任务不会被删除
         """
+        now = time.monotonic()
         with self.lock:
+            start_time = time.perf_counter()
+            finished = sorted(
+                (task for task in self.tasks.values() if self._is_evictable(task)),
+                key=lambda task: task.finished_at,
+            )
+            overflow = max(len(finished) - self.result_cache_size, 0)
             to_delete = [
-                task_id
-                for task_id, task in self.tasks.items()
-                if task.get_status()
-                in {TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.ERROR}
+                task.task_id
+                for i, task in enumerate(finished)
+                if i < overflow or self._is_expired(task, now)
             ]
             for task_id in to_delete:
                 self.tasks.pop(task_id, None)
-            if to_delete:
-                logger.info(f"已清理完成/取消/错误任务: {to_delete}")
+            LOCK_HOLD.observe(
+                time.perf_counter() - start_time, operation="clean_completed_tasks"
+            )
+        if to_delete:
+            logger.info(f"已清理完成/取消/错误任务: {to_delete}")
+        if self.backend.shared:
+            try:
+                self.backend.clean(time.time() - self.result_ttl)
+            except Exception as e:
+                logger.warning(f"清理后端中的任务失败：{e}")
 
     def shutdown(self, wait: bool = True) -> None:
         """
@@ -179,19 +540,52 @@ class TaskManager:
         args: tuple = None,
         kwargs: dict = None,
         task_id: str = None,
+        priority: Priority = "background",
+        lane: str = DEFAULT_LANE,
+        kind: Optional[str] = None,
+        shared: bool = True,
     ) -> Task:
         if self._shutdown:
             raise RuntimeError("任务管理器已关闭，无法创建新任务。")
+        if priority not in PRIORITY_LEVELS:
+            raise ValueError(f"未知的优先级：{priority}")
+        if lane not in self.lanes:
+            raise ValueError(f"未知的通道：{lane}")
 
         task_id = task_id or str(uuid.uuid4())
         with self.lock:
-            if task_id not in self.tasks:
-                self.tasks[task_id] = Task(task_id, func=func, args=args, kwargs=kwargs)
+            task = self.tasks.get(task_id)
+            if (
+                task is None
+                or task.get_status() in RETRYABLE_STATUS
+                or self._is_expired(task, time.monotonic())
+            ):
+                # 取消或失败的任务重新创建，已完成的任务直接返回，客户端收到缓存的结果
+                self.tasks[task_id] = Task(
+                    task_id,
+                    func=func,
+                    args=args,
+                    kwargs=kwargs,
+                    history_size=self.history_size,
+                    priority=priority,
+                    lane=lane,
+                    kind=kind,
+                    shared=shared,
+                )
             return self.tasks[task_id]
 
     def get_task(self, task_id: str) -> Optional[Task]:
         with self.lock:
-            return self.tasks.get(task_id)
+            task = self.tasks.get(task_id)
+            if task is not None and self._is_expired(task, time.monotonic()):
+                self.tasks.pop(task_id, None)
+                return None
+            return task
+
+    def list_tasks(self) -> list[TaskInfo]:
+        with self.lock:
+            tasks = list(self.tasks.values())
+        return [task.info() for task in tasks]
 
     def delete_task(self, task_id: str) -> None:
         with self.lock:
@@ -199,6 +593,33 @@ class TaskManager:
             if task:
                 task.cancel()
 
+    def invalidate_result(self, task_id: str) -> bool:
+        """
+        删除已结束的任务，用于结果失效(如文章内容被删除)时，下次请求重新执行
+
+        Returns:
+            bool: 任务已结束并被删除时返回 True
+        """
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None or task.get_status() not in FINISHED_STATUS:
+                return False
+            self.tasks.pop(task_id, None)
+            return True
+
+    def cancel_task(self, task_id: str) -> bool:
+        """
+        取消任务，但不删除，客户端可以继续接收到取消的消息
+
+        Returns:
+            bool: 任务存在且未结束时返回 True
+        """
+        task = self.get_task(task_id)
+        if task is None or task.get_status() in FINISHED_STATUS:
+            return False
+        task.cancel()
+        return True
+
     def run_task(self, task_id: str) -> None:
         if self._shutdown:
             logger.warning("任务管理器已关闭，无法执行任务。")
@@ -212,12 +633,257 @@ class TaskManager:
         if task.get_status() == TaskStatus.RUNNING:
             logger.warning(f"任务 {task_id} 正在执行中")
             return
+        task.reset_cancel_token()
+
+        if self.backend.shared and task.shared and not self._acquire(task):
+            self._follow(task)  # 在其他进程中执行
+            return
+        self._enqueue(task)
+
+    def _enqueue(self, task: Task) -> None:
+        task_id = task.task_id
+        lane = self.lanes[task.lane]
+        with self._queue_lock:
+            if task.enqueued_at is not None:
+                return  # 已在队列中
+            task.enqueued_at, task.wait_time = time.monotonic(), None
+            lane.queue.append(task)
+            logger.info(
+                f"任务 {task_id} 进入 {lane.name} 队列，优先级 {task.priority}，"
+                f"排队 {len(lane.queue)}，执行中 {lane.running}/{lane.max_workers}"
+            )
+            self._dispatch(lane)
+
+    def _effective_priority(self, task: Task, now: float) -> float:
+        waited = now - task.enqueued_at
+        return PRIORITY_LEVELS[task.priority] - waited / self.aging_seconds
+
+    def _dispatch(self, lane: _Lane) -> None:
+        """在通道的并发上限内，按优先级取出任务提交到线程池。需要在 self._queue_lock 中调用"""
+        while lane.running < lane.max_workers and lane.queue:
+            now = time.monotonic()
+            task = min(
+                lane.queue,
+                key=lambda t: (self._effective_priority(t, now), t.enqueued_at),
+            )
+            lane.queue.remove(task)
+            if task.get_status() == TaskStatus.CANCELLED:
+                task.enqueued_at = None
+                continue  # 排队期间被取消
+            lane.running += 1
+            lane.dispatched += 1
+            task.wait_time = now - task.enqueued_at
+            lane.total_wait += task.wait_time
+            TASK_QUEUE_WAIT.observe(task.wait_time, lane=lane.name, kind=task.kind)
+            self.executor.submit(self._run_in_lane, task, lane)
+
+    def _run_in_lane(self, task: Task, lane: _Lane) -> None:
+        logger.info(f"开始异步执行任务 {task.task_id}")
+        try:
+            task._run()
+        finally:
+            if task.started_at is not None and task.finished_at is not None:
+                TASK_RUN.observe(
+                    task.finished_at - task.started_at,
+                    kind=task.kind,
+                    status=task.get_status().value,
+                )
+            with self._queue_lock:
+                lane.running -= 1
+                task.enqueued_at = None
+                if not self._shutdown:
+                    self._dispatch(lane)
+
+    def _acquire(self, task: Task) -> bool:
+        """在后端登记由本进程执行任务，后端不可用时直接在本进程中执行"""
+        task_id = task.task_id
+        with self._owned_lock:
+            if task_id in self._owned:
+                return True
+        try:
+            if not self.backend.acquire_task(
+                task_id, self.worker_id, self.lease_seconds
+            ):
+                return False
+        except Exception as e:
+            logger.warning(f"任务 {task_id} 登记失败，在本进程中执行：{e}")
+            return True
+
+        def on_event(event_id: int, frame: bytes) -> None:
+            try:
+                self.backend.publish(task_id, event_id, frame)
+            except Exception as e:
+                logger.warning(f"同步任务 {task_id} 的消息失败：{e}")
+
+        def on_status(status: TaskStatus) -> None:
+            if status in FINISHED_STATUS:
+                with self._owned_lock:
+                    self._owned.discard(task_id)
+            try:
+                self.backend.set_status(task_id, self.worker_id, status.value)
+            except Exception as e:
+                logger.warning(f"同步任务 {task_id} 的状态失败：{e}")
+
+        with self._owned_lock:
+            self._owned.add(task_id)
+        task._on_event, task._on_status = on_event, on_status
+        return True
+
+    def _renew_tasks(self) -> None:
+        """续约本进程执行的任务，并取消被接管或被其他进程请求取消的任务"""
+        with self._owned_lock:
+            task_ids = list(self._owned)
+        try:
+            lost = self.backend.renew_tasks(
+                task_ids, self.worker_id, self.lease_seconds
+            )
+            cancelled = self.backend.list_cancel_requests(
+                [task_id for task_id in task_ids if task_id not in lost]
+            )
+        except Exception as e:
+            logger.warning(f"任务续约失败：{e}")
+            return
+        for task_id in lost:
+            # 与 JobQueue.heartbeat 相同，租约被接管后停止本进程中的执行，
+            # 不再把消息和状态写入后端，避免与接管的进程交替写入
+            logger.warning(f"任务 {task_id} 的租约已被其他进程接管，停止本进程中的执行")
+            with self._owned_lock:
+                self._owned.discard(task_id)
+            with self.lock:
+                task = self.tasks.get(task_id)
+            if task is not None:
+                task._on_event, task._on_status = None, None
+                task.cancel()
+        for task_id in cancelled:
+            logger.info(f"任务 {task_id} 被其他进程请求取消")
+            self.cancel_task(task_id)
+
+    def _follow(self, task: Task) -> None:
+        """跟随在其他进程中执行的任务，把消息写入本进程中的同名任务"""
+        logger.info(f"任务 {task.task_id} 正在其他进程中执行，跟随执行进度")
+        task._mirror_status(TaskStatus.RUNNING)
+        threading.Thread(target=self._follow_remote, args=(task,), daemon=True).start()
+
+    def _follow_remote(self, task: Task) -> None:
+        task_id = task.task_id
+        cancel_requested = False
+        while not self._shutdown:
+            if cancel_requested:
+                time.sleep(self.follow_interval)
+            elif task.cancel_token.wait(self.follow_interval):
+                # 请求执行任务的进程取消，之后继续跟随，直到收到取消的消息和状态
+                try:
+                    cancel_requested = self.backend.request_cancel(task_id)
+                except Exception as e:
+                    logger.warning(f"请求取消任务 {task_id} 失败：{e}")
+                if not cancel_requested:
+                    task._mirror_status(TaskStatus.CANCELLED, "任务已取消")
+                    return
+            try:
+                state = self.backend.get_state(task_id)
+                # 先读状态再读消息，任务结束时不会漏掉最后的消息
+                for event_id, frame in self.backend.list_events(
+                    task_id, task.last_event_id
+                ):
+                    task._mirror_event(event_id, frame)
+            except Exception as e:
+                logger.warning(f"读取任务 {task_id} 的进度失败：{e}")
+                continue
+
+            if state is not None and state.is_finished:
+                task._mirror_status(TaskStatus(state.status))
+                return
+            if state is not None and state.is_alive:
+                continue
+            # 执行任务的进程已退出
+            if task.cancel_token.is_cancelled:
+                task._mirror_status(TaskStatus.CANCELLED, "任务已取消")
+                return
+            if task._func is None or not self._acquire(task):
+                task._mirror_status(TaskStatus.ERROR, "执行任务的进程已退出")
+                return
+            logger.info(f"执行任务 {task_id} 的进程已退出，由本进程接管")
+            self._enqueue(task)
+            return
 
-        logger.info(f"开始异步执行任务 {task_id}")
-        self.executor.submit(task._run)
+    def _create_remote_task(self, task_id: str) -> Optional[Task]:
+        """客户端连接到了未执行该任务的进程(如断线重连)，从后端读取任务的进度"""
+        try:
+            state = self.backend.get_state(task_id)
+        except Exception as e:
+            logger.warning(f"读取任务 {task_id} 的状态失败：{e}")
+            return None
+        if state is None:
+            return None
+        with self.lock:
+            if task_id in self.tasks:
+                return self.tasks[task_id]
+            task = Task(
+                task_id, None, (), {}, history_size=self.history_size, kind="remote"
+            )
+            self.tasks[task_id] = task
+        self._follow(task)
+        return task
+
+    def _collect_metrics(self) -> None:
+        counts: dict[tuple[str, str], int] = {}
+        with self.lock:
+            tasks = list(self.tasks.values())
+        for task in tasks:
+            key = (task.kind, task.get_status().value)
+            counts[key] = counts.get(key, 0) + 1
+        TASKS.clear()
+        for (kind, status), count in counts.items():
+            TASKS.set(count, kind=kind, status=status)
+        for stats in self.get_lane_stats():
+            LANE_RUNNING.set(stats.running, lane=stats.lane)
+            LANE_QUEUED.set(stats.queued, lane=stats.lane)
+            LANE_CAPACITY.set(stats.max_workers, lane=stats.lane)
 
-    def get_task_generator(self, task_id: str) -> Callable[..., Iterator[str]]:
+    def get_lane_stats(self) -> list[LaneStats]:
+        now = time.monotonic()
+        with self._queue_lock:
+            return [
+                LaneStats(
+                    lane=lane.name,
+                    max_workers=lane.max_workers,
+                    running=lane.running,
+                    queued=len(lane.queue),
+                    queued_by_priority={
+                        priority: sum(t.priority == priority for t in lane.queue)
+                        for priority in PRIORITY_LEVELS
+                    },
+                    oldest_wait=max(
+                        (now - t.enqueued_at for t in lane.queue), default=0.0
+                    ),
+                    avg_wait=(
+                        lane.total_wait / lane.dispatched if lane.dispatched else 0.0
+                    ),
+                    dispatched=lane.dispatched,
+                )
+                for lane in self.lanes.values()
+            ]
+
+    async def stream_task(
+        self,
+        task_id: str,
+        request: Optional[Request] = None,
+        keepalive: float = 15,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        以异步生成器的形式推送任务消息(SSE 格式)，等待期间不占用线程
+
+        Args:
+            task_id: 任务 ID
+            request: 当前请求，用于检测客户端是否已断开，并读取 Last-Event-ID 请求头
+            keepalive: 没有新消息时发送心跳的间隔，单位是秒
+            last_event_id: 客户端已收到的最后一个事件 ID，默认从请求头中读取，
+                断线重连时只推送之后的消息
+        """
         task = self.get_task(task_id)
+        if task is None and self.backend.shared:
+            task = self._create_remote_task(task_id)
         if task is None:
             logger.warning(f"任务 {task_id} 不存在")
             return
@@ -225,39 +891,33 @@ class TaskManager:
         if task.get_status() == TaskStatus.WAITING:
             self.run_task(task_id)
 
-        def task_generator():
-            sent_index = 0
-            while True:
-                messages_to_send = []
-                with task.condition:
-                    while (
-                        len(task.history) <= sent_index
-                        and task.get_status() == TaskStatus.RUNNING
-                    ):
-                        task.condition.wait()
-                    while sent_index < len(task.history):
-                        messages_to_send.append(
-                            task.history[sent_index].model_dump_json()
-                        )
-                        sent_index += 1
-
-                # 🚀 在锁之外 yield，避免连接断开干扰锁
-                for msg in messages_to_send:
-                    yield msg + "\n\n"
-
-                if task.get_status() in {
-                    TaskStatus.COMPLETED,
-                    TaskStatus.CANCELLED,
-                    TaskStatus.ERROR,
-                }:
-                    for msg in task.history[sent_index:]:
-                        yield msg.model_dump_json() + "\n\n"
-
-                    break
-
-            self.delete_task(task_id)  # 执行完成，删除任务
-
-        return task_generator
+        if last_event_id is None and request is not None:
+            header = request.headers.get("last-event-id", "")
+            last_event_id = int(header) if header.isdigit() else 0
+
+        queue: asyncio.Queue[tuple[int, bytes] | TaskStatus] = asyncio.Queue()
+        history, finished = task.subscribe(
+            asyncio.get_running_loop(), queue, last_event_id=last_event_id or 0
+        )
+        try:
+            for _, frame in history:
+                yield frame
+
+            while not finished:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    if request is not None and await request.is_disconnected():
+                        logger.info(f"任务 {task_id} 的客户端已断开")
+                        return
+                    yield b": ping\n\n"  # SSE 注释，保持连接
+                    continue
+                if isinstance(item, TaskStatus):
+                    finished = item in FINISHED_STATUS
+                else:
+                    yield item[1]
+        finally:
+            task.unsubscribe(queue)
 
     def get_task_result(self, task_id: str) -> dict | Any:
         task = self.get_task(task_id)
@@ -268,34 +928,23 @@ class TaskManager:
         if task.get_status() == TaskStatus.WAITING:
             self.run_task(task_id)
 
-        while True:
-            with task.condition:
-                while task.get_status() == TaskStatus.RUNNING:
-                    task.condition.wait()
-            if task.get_status() in {
-                TaskStatus.COMPLETED,
-                TaskStatus.CANCELLED,
-                TaskStatus.ERROR,
-            }:
-                return task.get_result()
+        with task.condition:
+            task.condition.wait_for(lambda: task.get_status() in FINISHED_STATUS)
+        return task.get_result()
 
 
 class ScheduleTaskManager(TaskManager):
-    def __init__(self, max_workers: int = 5):
-        super().__init__(max_workers)
+    """在 TaskManager 的基础上定时执行任务，定时任务与普通任务共用通道和调度器"""
 
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+    def __init__(self, max_workers: int = 5, **kwargs):
+        """
+        Args:
+            max_workers: 默认通道的并发上限
+            kwargs: TaskManager 的其他参数
+        """
+        super().__init__(max_workers, **kwargs)
         self.scheduled_jobs: dict[str, Job] = {}
 
-    def shutdown(self, wait: bool = True) -> None:
-        with self.lock:
-            if not self._shutdown:
-                self._shutdown = True
-                self.executor.shutdown(wait=wait)
-                self.scheduler.shutdown(wait=wait)  # 停止定时器
-                logger.info("任务管理器已关闭，线程池和调度器已释放。")
-
     def create_task(
         self,
         func: Callable,
@@ -304,6 +953,11 @@ class ScheduleTaskManager(TaskManager):
         trigger_type: Literal["interval", "cron"] = "interval",
         trigger_args: dict = None,
         task_id: str = None,
+        priority: Priority = "background",
+        lane: str = DEFAULT_LANE,
+        kind: Optional[str] = None,
+        elector: Optional[LeaderElector] = None,
+        shared: bool = True,
     ) -> Task:
         """
         定时调度一个任务。
@@ -313,8 +967,14 @@ class ScheduleTaskManager(TaskManager):
             args: 传入的参数
             kwargs: 传入的关键字参数
             trigger_type: "interval" 或 "cron"
-            trigger_args: APScheduler 的 trigger 配置，如 {"seconds": 10}
+            trigger_args: APScheduler 的 trigger 配置，如 {"seconds": 10}，
+                为 None 时不调度，与 TaskManager.create_task 相同
             task_id: 任务 ID
+            priority: 优先级
+            lane: 通道
+            kind: 任务类型
+            elector: 多进程部署时，只在选举出的 leader 进程中执行
+            shared: 是否通过后端在多个进程之间登记，自己维护租约的任务为 False
 
         Returns:
             Task: 调度器中的任务
@@ -322,13 +982,25 @@ class ScheduleTaskManager(TaskManager):
         if self._shutdown:
             raise RuntimeError("任务管理器已关闭，无法调度任务。")
 
-        trigger_args = trigger_args or {}
-
         task_id = task_id or str(uuid.uuid4())
 
-        task = super().create_task(func, args, kwargs, task_id=task_id)
+        task = super().create_task(
+            func,
+            args,
+            kwargs,
+            task_id=task_id,
+            priority=priority,
+            lane=lane,
+            kind=kind,
+            shared=shared,
+        )
+        if trigger_args is None:
+            return task
 
         def scheduled_func(task_id=task.task_id, self_ref=self):
+            if elector is not None and not elector.is_leader:
+                logger.info(f"不是 leader 进程，跳过定时任务 {task_id}")
+                return
             super(ScheduleTaskManager, self_ref).run_task(task_id)
 
         trigger_cls = IntervalTrigger if trigger_type == "interval" else CronTrigger
@@ -343,6 +1015,10 @@ class ScheduleTaskManager(TaskManager):
                 self.scheduled_jobs[task_id] = job
         return task
 
+    def _is_evictable(self, task: Task) -> bool:
+        # 定时任务会被反复执行，不能清理
+        return task.task_id not in self.scheduled_jobs and super()._is_evictable(task)
+
     def delete_task(self, task_id: str) -> None:
         super().delete_task(task_id)
         with self.lock:
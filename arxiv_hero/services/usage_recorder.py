@@ -0,0 +1,95 @@
+import time
+import threading
+from datetime import datetime
+
+import pytz
+
+from arxiv_hero import logger
+from arxiv_hero.config import get_config
+from arxiv_hero.repositories.usage_repository import (
+    UsageKey,
+    UsageRepository,
+    UsageStats,
+)
+from arxiv_hero.utils.usage_utils import (
+    UsageEvent,
+    add_usage_listener,
+    remove_usage_listener,
+)
+
+
+class UsageRecorder:
+    """
+    在内存中累计大模型的用量，每隔 flush_interval 秒写入一次数据库。
+
+    通过 `start` 注册到 chat_utils，每次请求(包括没有匹配到译文的重试和对冲请求)
+    返回用量后累计到 (日期, 文章, 段落类型, 任务, 端点, 模型) 上。
+    """
+
+    def __init__(self, flush_interval: float = 10):
+        self.flush_interval = flush_interval
+        self.repository = UsageRepository()
+        self.timezone = pytz.timezone(get_config().timezone)
+        self._pending: dict[UsageKey, UsageStats] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 同一时间只有一个线程写入
+        self._last_flush = time.monotonic()
+
+    def start(self) -> None:
+        add_usage_listener(self.record)
+
+    def stop(self) -> None:
+        remove_usage_listener(self.record)
+        self.flush()
+
+    def record(self, event: UsageEvent) -> None:
+        key = (
+            datetime.now(self.timezone).strftime("%Y-%m-%d"),
+            event.entry_id,
+            event.type,
+            event.job,
+            event.endpoint,
+            event.model,
+        )
+        with self._lock:
+            self._add(key, 1, event.prompt_tokens, event.completion_tokens, event.cost)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _add(
+        self,
+        key: UsageKey,
+        requests: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost: float,
+    ) -> None:
+        stats = self._pending.setdefault(key, UsageStats())
+        stats.requests += requests
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost += cost
+
+    def flush(self) -> None:
+        """写入累计的用量，失败时保留到下一次写入"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = time.monotonic()
+            try:
+                self.repository.add_usages(pending)
+            except Exception as e:
+                logger.warning(f"保存大模型用量失败：{e}")
+                with self._lock:
+                    for key, stats in pending.items():
+                        self._add(
+                            key,
+                            stats.requests,
+                            stats.prompt_tokens,
+                            stats.completion_tokens,
+                            stats.cost,
+                        )
+
+
+usage_recorder = UsageRecorder()
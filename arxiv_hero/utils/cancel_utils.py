@@ -0,0 +1,85 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+
+class CancelledError(Exception):
+    """任务被取消"""
+
+
+class CancelToken:
+    """
+    协作式取消的令牌。
+
+    执行方在段落、批次之间调用 `raise_if_cancelled` 检查是否已取消；
+    正在进行的网络请求可以通过 `register` 注册关闭函数，取消时立即中断。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise CancelledError("任务已取消")
+
+    def wait(self, timeout: float) -> bool:
+        """等待 timeout 秒，期间被取消时提前返回 True"""
+        return self._event.wait(timeout)
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        注册取消时调用的函数，已经取消时立即调用
+
+        Returns:
+            Callable[[], None]: 取消注册的函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar(
+    "cancel_token", default=None
+)
+
+
+def get_cancel_token() -> Optional[CancelToken]:
+    """当前上下文中的取消令牌，由 `use_cancel_token` 设置"""
+    return _current_token.get()
+
+
+@contextmanager
+def use_cancel_token(token: Optional[CancelToken]) -> Iterator[None]:
+    """在当前上下文中设置取消令牌，`chat` 等函数会自动使用"""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
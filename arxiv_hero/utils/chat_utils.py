@@ -1,17 +1,228 @@
 import time
-from typing import Iterator
+import random
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, Optional
 
 import openai
 from openai import OpenAI
 from openai.types.chat import ChatCompletionChunk
 
 from arxiv_hero import logger
-from arxiv_hero.config import get_config
+from arxiv_hero.config import get_config, OpenAIConfig, RoutingConfig
+from arxiv_hero.common.metrics import REGISTRY, Counter, Gauge, Histogram
+from arxiv_hero.utils.cancel_utils import CancelToken, CancelledError, get_cancel_token
+from arxiv_hero.utils.concurrency_utils import AIMDLimiter, get_llm_job
+from arxiv_hero.utils.usage_utils import UsageEvent, get_usage_scope, publish_usage
 
 openai_cfg = get_config().openai
+routing_cfg = get_config().routing
 
-# 客户端
-client = OpenAI(base_url=openai_cfg.base_url, api_key=openai_cfg.api_key)
+DEFAULT_ENDPOINT = "default"  # 由 [openai] 配置的端点
+DEFAULT_KIND = "chat"  # 未指定提示词类型时的统计标签
+
+# 可以重试的错误：限流、服务端错误、超时和连接错误
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+    TimeoutError,
+)
+# 原请求和对冲请求都占用全局并发，线程数与全局并发上限相同时不会排队
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=openai_cfg.total_concurrency, thread_name_prefix="llm_hedge"
+)
+
+
+class TruncatedError(Exception):
+    """输出达到调用方设置的 max_tokens 被截断，content 为已生成的内容"""
+
+    def __init__(self, content: str, max_tokens: int):
+        super().__init__(f"大模型输出超过 max_tokens={max_tokens}，被截断")
+        self.content = content
+        self.max_tokens = max_tokens
+
+
+LLM_REQUESTS = Counter(
+    "arxiv_hero_llm_requests_total",
+    "大模型请求数",
+    ("endpoint", "model", "kind", "status"),
+)
+LLM_TOKENS = Counter(
+    "arxiv_hero_llm_tokens_total",
+    "大模型消耗的 token 数",
+    ("endpoint", "model", "kind", "type"),
+)
+LLM_COST = Counter(
+    "arxiv_hero_llm_cost_total",
+    "大模型的花费，按配置中每百万 token 的价格计算",
+    ("endpoint", "model", "kind"),
+)
+LLM_LATENCY = Histogram(
+    "arxiv_hero_llm_request_seconds", "大模型请求的耗时", ("endpoint", "kind")
+)
+LLM_QUEUE_WAIT = Histogram(
+    "arxiv_hero_llm_queue_wait_seconds",
+    "大模型请求在并发限制中排队等待的时间",
+    ("endpoint", "kind"),
+)
+LLM_HEDGED = Counter(
+    "arxiv_hero_llm_hedged_requests_total", "发送的对冲请求数", ("endpoint",)
+)
+LLM_CONCURRENCY = Gauge(
+    "arxiv_hero_llm_concurrency",
+    "大模型请求的并发上限、执行中和排队的请求数",
+    ("endpoint", "type"),
+)
+
+
+class Endpoint:
+    """一个 openai 兼容的服务和模型，各自有并发上限、限流状态和价格"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        timeout: float,
+        limiter: AIMDLimiter,
+        input_price: float = 0.0,
+        output_price: float = 0.0,
+    ):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.limiter = limiter
+        self.input_price = input_price
+        self.output_price = output_price
+        # 重试由 chat 处理，以便根据限流调整并发和切换端点
+        self.client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+        self.throttled_until = 0.0  # 被限流或出错后，在此之前优先使用其他端点
+
+    @property
+    def is_throttled(self) -> bool:
+        return time.monotonic() < self.throttled_until
+
+    def throttle(self, seconds: float) -> None:
+        self.throttled_until = max(self.throttled_until, time.monotonic() + seconds)
+
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens * self.input_price + completion_tokens * self.output_price
+        ) / 1e6
+
+    def record_usage(self, usage, kind: str) -> None:
+        """记录用量，按当前上下文中的文章、段落类型和任务发送给 `add_usage_listener` 注册的函数"""
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        labels = {"endpoint": self.name, "model": self.model, "kind": kind}
+        LLM_TOKENS.inc(prompt_tokens, type="prompt", **labels)
+        LLM_TOKENS.inc(completion_tokens, type="completion", **labels)
+        cost = self.estimate_cost(prompt_tokens, completion_tokens)
+        if cost:
+            LLM_COST.inc(cost, **labels)
+        scope = get_usage_scope()
+        publish_usage(
+            UsageEvent(
+                endpoint=self.name,
+                model=self.model,
+                kind=kind,
+                type=scope.get("type", kind),
+                entry_id=scope.get("entry_id", ""),
+                job=get_llm_job().kind,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost=cost,
+            )
+        )
+
+
+def create_endpoints(
+    openai_config: OpenAIConfig, routing_config: RoutingConfig
+) -> dict[str, Endpoint]:
+    """[openai] 作为 default 端点，加上 [routing.endpoints] 中的端点"""
+    endpoints = {
+        DEFAULT_ENDPOINT: Endpoint(
+            DEFAULT_ENDPOINT,
+            openai_config.base_url,
+            openai_config.api_key,
+            openai_config.model,
+            openai_config.timeout,
+            AIMDLimiter(
+                initial_limit=openai_config.initial_concurrency,
+                min_limit=openai_config.min_concurrency,
+                max_limit=openai_config.max_concurrency,
+            ),
+            openai_config.input_price,
+            openai_config.output_price,
+        )
+    }
+    for name, config in routing_config.endpoints.items():
+        endpoints[name] = Endpoint(
+            name,
+            config.base_url,
+            config.api_key,
+            config.model,
+            config.timeout or openai_config.timeout,
+            AIMDLimiter(
+                initial_limit=config.initial_concurrency,
+                min_limit=config.min_concurrency,
+                max_limit=config.max_concurrency,
+            ),
+            config.input_price,
+            config.output_price,
+        )
+    return endpoints
+
+
+ENDPOINTS = create_endpoints(openai_cfg, routing_cfg)
+# 所有端点共用的并发上限，不随限流调整，已满时各任务跨端点按权重公平排队
+GLOBAL_LIMITER = AIMDLimiter(
+    initial_limit=openai_cfg.total_concurrency,
+    min_limit=openai_cfg.total_concurrency,
+    max_limit=openai_cfg.total_concurrency,
+)
+GLOBAL_LABEL = "all"  # 统计中全局并发的端点标签
+
+
+def get_route(kind: Optional[str]) -> list[Endpoint]:
+    """提示词类型对应的端点，按顺序尝试，未配置时使用 default 端点"""
+    names = routing_cfg.routes.get(kind or "") or [DEFAULT_ENDPOINT]
+    return [ENDPOINTS[name] for name in names]
+
+
+def _collect_metrics() -> None:
+    limiters = {name: endpoint.limiter for name, endpoint in ENDPOINTS.items()}
+    limiters[GLOBAL_LABEL] = GLOBAL_LIMITER
+    for name, limiter in limiters.items():
+        LLM_CONCURRENCY.set(limiter.limit, endpoint=name, type="limit")
+        LLM_CONCURRENCY.set(limiter.in_flight, endpoint=name, type="in_flight")
+        LLM_CONCURRENCY.set(limiter.waiting, endpoint=name, type="waiting")
+
+
+REGISTRY.add_collector(_collect_metrics)
+
+
+def _choose_endpoint(
+    route: list[Endpoint], cancel_token: Optional[CancelToken]
+) -> Endpoint:
+    """选择第一个未被限流的端点，都被限流时等待最早恢复的端点"""
+    for endpoint in route:
+        if not endpoint.is_throttled:
+            return endpoint
+    endpoint = min(route, key=lambda e: e.throttled_until)
+    wait_time = max(endpoint.throttled_until - time.monotonic(), 0)
+    logger.warning(f"大模型端点均被限流，{wait_time:.1f} 秒后重试 {endpoint.name}...")
+    if cancel_token:
+        cancel_token.wait(wait_time)
+        cancel_token.raise_if_cancelled()
+    else:
+        time.sleep(wait_time)
+    return endpoint
 
 
 def chat(
@@ -19,35 +230,309 @@ def chat(
     messages: list[dict] = None,
     max_tokens: int = None,
     stop: list[str] = None,
+    cancel_token: CancelToken = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    timeout: Optional[float] = None,
+    kind: Optional[str] = None,
+    temperature: float = 0.7,
 ) -> str:
-    global client
+    """
+    调用大模型
 
+    按提示词类型 kind 查找 [routing.routes] 中的端点，依次尝试；端点限流(429)、
+    服务端错误(5xx)、超时或连接错误时，在一段时间内切换到下一个端点，并减小其并发上限。
+    请求先取得端点的并发，再取得所有端点共用的全局并发(openai.total_concurrency)，
+    每个端点的并发由各自的 AIMDLimiter 自适应控制，并发已满时按当前上下文中的任务
+    (`use_llm_job`)加权公平排队。开启 hedge 时，耗时超过最近 p95 的请求在有空闲并发时
+    发送一个重复请求，取先返回的结果。
+
+    Args:
+        cancel_token: 取消令牌，默认使用当前上下文中的令牌。
+            存在令牌时以流式请求，取消时关闭连接，中断正在进行的请求
+        on_delta: 以流式请求，每收到一段输出调用一次，参数为新增的内容。
+            请求重试时会从头输出，不发送对冲请求
+        timeout: 单次请求的超时时间，单位是秒，默认使用端点配置中的 timeout
+        kind: 提示词类型，如 title、abstract、content、markdown，用于路由和统计
+
+    Raises:
+        TruncatedError: 设置了 max_tokens 且输出达到上限，由调用方决定是否加大上限重试
+    """
     if not prompt and not messages:
         raise ValueError("prompt or messages must be provided")
 
     if prompt:
         messages = [{"role": "user", "content": prompt}]
 
-    for _ in range(openai_cfg.max_retries):
+    cancel_token = cancel_token or get_cancel_token()
+    route = get_route(kind)
+    kind = kind or DEFAULT_KIND
+    max_attempts = openai_cfg.max_retries + len(route) - 1  # 每个端点至少尝试一次
+    for attempt in range(max_attempts):
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        endpoint = _choose_endpoint(route, cancel_token)
+        labels = {"endpoint": endpoint.name, "model": endpoint.model, "kind": kind}
+        queued_at = time.perf_counter()
+        start_time = None  # 取得并发后开始计时，排队时间不计入延迟
         try:
-            response = client.chat.completions.create(
-                messages=messages,
-                model=openai_cfg.model,
-                temperature=0.7,
-                max_tokens=max_tokens,
-                stop=stop,
-                # extra_body={"enable_thinking": False},
-            )
+            # 先取得端点的并发，再在全局排队，使各任务跨端点公平分配。
+            # 等待被限流的端点时不占用全局并发，不影响其他端点的请求
+            with endpoint.limiter.slot(cancel_token), GLOBAL_LIMITER.slot(cancel_token):
+                start_time = time.perf_counter()
+                LLM_QUEUE_WAIT.observe(
+                    start_time - queued_at, endpoint=endpoint.name, kind=kind
+                )
+                content, finish_reason = _request(
+                    endpoint,
+                    kind,
+                    messages,
+                    max_tokens,
+                    stop,
+                    temperature,
+                    cancel_token,
+                    on_delta,
+                    timeout or endpoint.timeout,
+                )
+                latency = time.perf_counter() - start_time
+            endpoint.limiter.on_success(latency)
+            if max_tokens is not None and finish_reason == "length":
+                LLM_REQUESTS.inc(status="truncated", **labels)
+                raise TruncatedError(content, max_tokens)
+            LLM_REQUESTS.inc(status="ok", **labels)
+            return content
 
-            return response.choices[0].message.content
+        except TruncatedError:
+            raise
 
-        except openai.RateLimitError as e:
+        except CancelledError:
+            LLM_REQUESTS.inc(status="cancelled", **labels)
+            raise
+        except RETRYABLE_ERRORS as e:
+            status = _error_status(e)
+            LLM_REQUESTS.inc(status=status, **labels)
+            endpoint.limiter.on_overload()
+            endpoint.throttle(_retry_wait(e, attempt))
+            if attempt == max_attempts - 1:
+                raise
             logger.warning(
-                f"Rate limit error: {e}. Waiting for {openai_cfg.wait_time} seconds and Retrying..."
+                f"请求大模型 {endpoint.name} 失败({status})：{e}，"
+                f"并发上限降为 {endpoint.limiter.limit}，重试..."
+            )
+        except Exception:
+            LLM_REQUESTS.inc(status="error", **labels)
+            raise
+        finally:
+            if start_time is not None:
+                LLM_LATENCY.observe(
+                    time.perf_counter() - start_time, endpoint=endpoint.name, kind=kind
+                )
+
+    raise ValueError("openai.max_retries 需要大于 0")
+
+
+def _request(
+    endpoint: Endpoint,
+    kind: str,
+    messages: list[dict],
+    max_tokens: int,
+    stop: list[str],
+    temperature: float,
+    cancel_token: Optional[CancelToken],
+    on_delta: Optional[Callable[[str], None]],
+    timeout: float,
+) -> tuple[str, Optional[str]]:
+    """返回 (输出, 结束原因)"""
+    hedge_delay = (
+        endpoint.limiter.latency_quantile(0.95)
+        if openai_cfg.hedge and on_delta is None
+        else None
+    )
+    if hedge_delay is not None:
+        return _hedged_chat(
+            endpoint,
+            kind,
+            messages,
+            max_tokens,
+            stop,
+            temperature,
+            cancel_token,
+            timeout,
+            hedge_delay,
+        )
+    if cancel_token or on_delta:
+        return _cancellable_chat(
+            endpoint,
+            kind,
+            messages,
+            max_tokens,
+            stop,
+            temperature,
+            cancel_token,
+            on_delta,
+            timeout,
+        )
+    response = endpoint.client.chat.completions.create(
+        messages=messages,
+        model=endpoint.model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stop=stop,
+        timeout=timeout,
+        # extra_body={"enable_thinking": False},
+    )
+    endpoint.record_usage(response.usage, kind)
+    return response.choices[0].message.content, response.choices[0].finish_reason
+
+
+def _error_status(e: Exception) -> str:
+    if isinstance(e, openai.RateLimitError):
+        return "rate_limited"
+    if isinstance(e, openai.InternalServerError):
+        return "server_error"
+    if isinstance(e, (openai.APITimeoutError, TimeoutError)):
+        return "timeout"
+    return "connection_error"
+
+
+def _retry_wait(e: Exception, attempt: int) -> float:
+    """限流时优先使用服务端返回的 Retry-After，否则按指数退避，加入随机抖动避免同时重试"""
+    if isinstance(e, openai.RateLimitError):
+        retry_after = e.response.headers.get("retry-after", "")
+        try:
+            return float(retry_after)
+        except ValueError:
+            return openai_cfg.wait_time * (0.5 + random.random() / 2)
+    return min(2**attempt, openai_cfg.wait_time) * (0.5 + random.random() / 2)
+
+
+def _hedged_chat(
+    endpoint: Endpoint,
+    kind: str,
+    messages: list[dict],
+    max_tokens: int,
+    stop: list[str],
+    temperature: float,
+    cancel_token: Optional[CancelToken],
+    timeout: float,
+    hedge_delay: float,
+) -> tuple[str, Optional[str]]:
+    """
+    发送请求，超过 hedge_delay 秒未返回且有空闲并发时，再发送一个相同的请求，
+    取先成功的结果，另一个请求立即关闭
+    """
+    tokens = [CancelToken(), CancelToken()]
+    unregister = (
+        cancel_token.register(lambda: [token.cancel() for token in tokens])
+        if cancel_token
+        else (lambda: None)
+    )
+    args = (endpoint, kind, messages, max_tokens, stop, temperature)
+    started = threading.Event()
+
+    def primary() -> tuple[str, Optional[str]]:
+        started.set()
+        return _cancellable_chat(*args, tokens[0], None, timeout)
+
+    futures = [
+        # 用量按调用方的上下文记录
+        _hedge_executor.submit(contextvars.copy_context().run, primary)
+    ]
+    hedged = False
+    try:
+        # 对冲的延迟从原请求开始执行时计算，不包括在线程池中排队的时间
+        started.wait()
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done and _try_acquire_hedge(endpoint):
+            hedged = True
+            LLM_HEDGED.inc(endpoint=endpoint.name)
+            futures.append(
+                _hedge_executor.submit(
+                    contextvars.copy_context().run,
+                    _cancellable_chat,
+                    *args,
+                    tokens[1],
+                    None,
+                    timeout,
+                )
             )
-            time.sleep(openai_cfg.wait_time)
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+        raise error
+    finally:
+        for token in tokens:
+            token.cancel()  # 关闭未完成的请求
+        unregister()
+        if hedged:
+            endpoint.limiter.release()
+            GLOBAL_LIMITER.release()
+
 
-    raise openai.RateLimitError("Rate limit exceeded")
+def _try_acquire_hedge(endpoint: Endpoint) -> bool:
+    """对冲请求只使用空闲的并发，全局和端点都有空闲时才发送"""
+    if not GLOBAL_LIMITER.try_acquire():
+        return False
+    if not endpoint.limiter.try_acquire():
+        GLOBAL_LIMITER.release()
+        return False
+    return True
+
+
+def _cancellable_chat(
+    endpoint: Endpoint,
+    kind: str,
+    messages: list[dict],
+    max_tokens: int,
+    stop: list[str],
+    temperature: float,
+    cancel_token: Optional[CancelToken],
+    on_delta: Optional[Callable[[str], None]] = None,
+    timeout: Optional[float] = None,
+) -> tuple[str, Optional[str]]:
+    cancel_token = cancel_token or CancelToken()
+    timeout = timeout or endpoint.timeout
+    deadline = time.monotonic() + timeout
+    response: openai.Stream[ChatCompletionChunk] = (
+        endpoint.client.chat.completions.create(
+            stream=True,
+            messages=messages,
+            model=endpoint.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop,
+            stream_options={"include_usage": True},
+            timeout=timeout,  # 连接和两次读取之间的超时
+            # extra_body={"enable_thinking": False},
+        )
+    )
+    unregister = cancel_token.register(response.close)
+    contents = []
+    finish_reason = None
+    try:
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].finish_reason:
+                finish_reason = chunk.choices[0].finish_reason
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                contents.append(chunk.choices[0].delta.content)
+                if on_delta and chunk.choices[0].delta.content:
+                    on_delta(chunk.choices[0].delta.content)
+            endpoint.record_usage(chunk.usage, kind)  # 最后一个块中包含用量
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"大模型请求超过 {timeout} 秒未完成")
+    except Exception:
+        if cancel_token.is_cancelled:  # 取消时关闭了连接，读取会抛出异常
+            raise CancelledError("任务已取消") from None
+        raise
+    finally:
+        unregister()
+        response.close()
+    cancel_token.raise_if_cancelled()
+    return "".join(contents), finish_reason
 
 
 def stream_chat(
@@ -55,26 +540,45 @@ def stream_chat(
     messages: list[dict[str, str]] = None,
     max_tokens: int = None,
     stop: list[str] = None,
+    kind: Optional[str] = None,
+    temperature: float = 0.7,
 ) -> Iterator[str]:
-    global client
-
     if not prompt and not messages:
         raise ValueError("prompt or messages must be provided")
 
     if prompt:
         messages = [{"role": "user", "content": prompt}]
 
-    response: Iterator[ChatCompletionChunk] = client.chat.completions.create(
-        stream=True,
-        messages=messages,
-        model=openai_cfg.model,
-        temperature=0.7,
-        max_tokens=max_tokens,
-        stop=stop,
-        # extra_body={"enable_thinking": False},
-    )
+    endpoint = get_route(kind)[0]
+    kind = kind or DEFAULT_KIND
+    start_time = time.perf_counter()
+    status = "error"
+    try:
+        response: Iterator[ChatCompletionChunk] = (
+            endpoint.client.chat.completions.create(
+                stream=True,
+                messages=messages,
+                model=endpoint.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop,
+                stream_options={"include_usage": True},
+                # extra_body={"enable_thinking": False},
+            )
+        )
 
-    for chunk in response:
-        content = chunk.choices[0].delta.content
-        if content is not None:
-            yield content
+        for chunk in response:
+            endpoint.record_usage(chunk.usage, kind)
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content is not None:
+                yield content
+        status = "ok"
+    finally:
+        LLM_REQUESTS.inc(
+            endpoint=endpoint.name, model=endpoint.model, kind=kind, status=status
+        )
+        LLM_LATENCY.observe(
+            time.perf_counter() - start_time, endpoint=endpoint.name, kind=kind
+        )
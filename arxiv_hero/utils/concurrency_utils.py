@@ -0,0 +1,239 @@
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from arxiv_hero.utils.cancel_utils import CancelToken
+
+# 各优先级任务的权重，排队时按权重分配并发，interactive 为阅读时翻译的段落
+JOB_WEIGHTS: dict[str, float] = {"interactive": 8, "background": 2, "bulk": 1}
+
+
+class LLMJob:
+    """调用大模型的任务，同一任务的请求在排队时共享一份配额"""
+
+    def __init__(
+        self,
+        job_id: str,
+        priority: str = "background",
+        weight: Optional[float] = None,
+        kind: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.priority = priority
+        self.weight = weight or JOB_WEIGHTS.get(priority, 1)
+        self.kind = kind or job_id  # 任务类型，用于统计用量
+
+    def __repr__(self) -> str:
+        return f"LLMJob({self.job_id!r}, {self.priority!r}, weight={self.weight})"
+
+
+DEFAULT_JOB = LLMJob("default")
+_current_job: ContextVar[Optional[LLMJob]] = ContextVar("llm_job", default=None)
+
+
+def get_llm_job() -> LLMJob:
+    """当前上下文中的任务，由 `use_llm_job` 设置，未设置时为 DEFAULT_JOB"""
+    return _current_job.get() or DEFAULT_JOB
+
+
+@contextmanager
+def use_llm_job(job: Optional[LLMJob]) -> Iterator[None]:
+    """在当前上下文中设置任务，`chat` 排队时按任务分配并发"""
+    reset = _current_job.set(job)
+    try:
+        yield
+    finally:
+        _current_job.reset(reset)
+
+
+class _Waiter:
+    def __init__(self, job: LLMJob, tag: float, seq: int):
+        self.job = job
+        self.tag = tag  # 虚拟开始时间，越小越先获得并发
+        self.seq = seq
+        self.granted = False
+
+
+class AIMDLimiter:
+    """
+    自适应的并发上限(加性增、乘性减)，并在任务之间公平分配并发。
+
+    - 请求成功时，并发上限每经过约一个窗口(上限个请求)加 1，直到 max_limit；
+    - 服务端限流、出错或超时时，上限乘以 backoff，同一时间窗口内的多次失败只减一次；
+    - 同时记录最近的请求耗时，用于计算 p95，决定何时发送对冲请求；
+    - 并发已满时按任务加权公平排队(start-time fair queuing)：每个请求的虚拟开始时间为
+      max(当前虚拟时间, 同一任务上一个请求的虚拟结束时间)，结束时间再加 1 / 权重，
+      有空闲时优先执行虚拟开始时间最小的请求。请求多的任务不会阻塞其他任务，
+      权重高的任务(如阅读时翻译的段落)获得更多并发。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        latency_window: int = 200,
+    ):
+        """
+        Args:
+            initial_limit: 初始的并发上限
+            min_limit: 并发上限的最小值
+            max_limit: 并发上限的最大值
+            backoff: 失败时并发上限乘以的系数
+            cooldown: 两次减小并发上限的最小间隔，单位是秒
+            latency_window: 计算耗时分位数时使用的最近请求数
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._condition = threading.Condition()
+        self._waiters: list[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}  # k:job_id v:上一个请求的虚拟结束时间
+        self._seq = itertools.count()
+
+    @property
+    def limit(self) -> int:
+        with self._condition:
+            return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        with self._condition:
+            return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        with self._condition:
+            return len(self._waiters)
+
+    def _grant(self) -> None:
+        """在并发上限内，按虚拟开始时间把并发分配给排队的请求。需要在 self._condition 中调用"""
+        granted = False
+        while self._waiters and self._in_flight < int(self._limit):
+            waiter = min(self._waiters, key=lambda w: (w.tag, w.seq))
+            self._waiters.remove(waiter)
+            waiter.granted = True
+            self._in_flight += 1
+            self._virtual_time = max(self._virtual_time, waiter.tag)
+            granted = True
+        if granted:
+            # 已空闲的任务不再需要记录
+            self._last_finish = {
+                job_id: finish
+                for job_id, finish in self._last_finish.items()
+                if finish > self._virtual_time
+            }
+            self._condition.notify_all()
+
+    def try_acquire(self) -> bool:
+        """不等待，有空闲且没有排队的请求时占用一个并发"""
+        with self._condition:
+            if self._waiters or self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(
+        self,
+        cancel_token: Optional[CancelToken] = None,
+        timeout: Optional[float] = None,
+        job: Optional[LLMJob] = None,
+    ) -> None:
+        """
+        排队并占用一个并发
+
+        Args:
+            cancel_token: 取消令牌
+            timeout: 最长等待的秒数
+            job: 请求所属的任务，默认使用当前上下文中的任务
+
+        Raises:
+            CancelledError: 等待期间被取消
+            TimeoutError: 超过 timeout 秒仍未等到
+        """
+        job = job or get_llm_job()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        unregister = (
+            cancel_token.register(self._notify) if cancel_token else (lambda: None)
+        )
+        try:
+            with self._condition:
+                tag = max(self._virtual_time, self._last_finish.get(job.job_id, 0))
+                self._last_finish[job.job_id] = tag + 1 / job.weight
+                waiter = _Waiter(job, tag, next(self._seq))
+                self._waiters.append(waiter)
+                self._grant()
+                while not waiter.granted:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if (cancel_token and cancel_token.is_cancelled) or (
+                        remaining is not None and remaining <= 0
+                    ):
+                        self._waiters.remove(waiter)
+                        if cancel_token:
+                            cancel_token.raise_if_cancelled()
+                        raise TimeoutError("等待大模型并发额度超时")
+                    self._condition.wait(remaining)
+        finally:
+            unregister()
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._grant()
+
+    def _notify(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(
+        self,
+        cancel_token: Optional[CancelToken] = None,
+        timeout: Optional[float] = None,
+        job: Optional[LLMJob] = None,
+    ) -> Iterator[None]:
+        self.acquire(cancel_token, timeout, job)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, latency: Optional[float] = None) -> None:
+        with self._condition:
+            if latency is not None:
+                self._latencies.append(latency)
+            if self._limit < self.max_limit:
+                self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+                self._grant()
+
+    def on_overload(self) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return  # 同一批并发请求的失败只减一次
+            self._last_decrease = now
+            self._limit = max(self._limit * self.backoff, self.min_limit)
+
+    def latency_quantile(
+        self, q: float = 0.95, min_samples: int = 20
+    ) -> Optional[float]:
+        """最近请求耗时的分位数，样本不足时返回 None"""
+        with self._condition:
+            if len(self._latencies) < min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(int(len(latencies) * q), len(latencies) - 1)]
@@ -0,0 +1,45 @@
+from typing import Iterable, Optional
+
+
+def _split_header(value: Optional[str]) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断 If-None-Match 是否匹配 etag，按逗号分隔的列表逐个比较，
+    `*` 匹配任意版本，按弱比较忽略 `W/` 前缀
+    """
+    etag = etag.removeprefix("W/")
+    for item in _split_header(if_none_match):
+        if item == "*" or item.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def choose_encoding(
+    accept_encoding: Optional[str], available: Iterable[str]
+) -> Optional[str]:
+    """
+    按 Accept-Encoding 的 q 值从 available 中选择压缩格式，q 值相同时按 available 的顺序，
+    q=0 表示不接受，未列出的格式按 `*` 的 q 值处理。没有可用的格式时返回 None，即不压缩
+    """
+    weights = {}
+    for item in _split_header(accept_encoding):
+        name, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
@@ -1,15 +1,50 @@
 import traceback
+import contextvars
 from typing import Callable
 import concurrent.futures
 
 from arxiv_hero import logger
+from arxiv_hero.utils.cancel_utils import (
+    CancelToken,
+    CancelledError,
+    get_cancel_token,
+    use_cancel_token,
+)
 
 
-def parallel_func(func: Callable, args: list[tuple], max_workers: int = 8):
+def parallel_func(
+    func: Callable,
+    args: list[tuple],
+    max_workers: int = 8,
+    cancel_token: CancelToken = None,
+):
+    """
+    并行执行函数，单个调用失败时对应的结果为 None
+
+    Args:
+        cancel_token: 取消令牌，默认使用当前上下文中的令牌，会传递给各个线程。
+            取消后不再开始新的调用，并抛出 CancelledError
+    """
+    cancel_token = cancel_token or get_cancel_token()
+
+    def run(*arg):
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        with use_cancel_token(cancel_token):
+            return func(*arg)
+
     results = [None] * len(args)
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures_map = {executor.submit(func, *arg): i for i, arg in enumerate(args)}
+        # 在调用方的上下文中执行，传递取消令牌、大模型任务等上下文变量
+        futures_map = {
+            executor.submit(contextvars.copy_context().run, run, *arg): i
+            for i, arg in enumerate(args)
+        }
         for future in concurrent.futures.as_completed(futures_map):
+            if cancel_token and cancel_token.is_cancelled:
+                for f in futures_map:
+                    f.cancel()
+                raise CancelledError("任务已取消")
             try:
                 result = future.result()
                 if result is not None:
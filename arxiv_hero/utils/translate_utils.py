@@ -0,0 +1,39 @@
+from arxiv_hero.config import TranslateConfig
+from arxiv_hero.utils.usage_utils import estimate_tokens
+
+ZH_START = "<Chinese>"
+ZH_END = "</Chinese>"
+STOP_SEQUENCES = [ZH_END]  # 译文结束后不再生成多余的说明
+
+
+def prefill_message() -> dict:
+    """预填充的助手消息，大模型从译文开始续写，不输出开场白"""
+    return {"role": "assistant", "content": ZH_START}
+
+
+def max_tokens_for(content: str, config: TranslateConfig) -> int | None:
+    """按原文估计的 token 数计算输出的上限，max_tokens_ratio 为 0 时不限制"""
+    if config.max_tokens_ratio <= 0:
+        return None
+    return max(
+        config.min_max_tokens, int(estimate_tokens(content) * config.max_tokens_ratio)
+    )
+
+
+def match_zh_translated(text: str, prefilled: bool = False) -> str | None:
+    """
+    匹配 `<Chinese>` 中的译文
+
+    预填充时输出不包含开始标签，以 `</Chinese>` 为停止序列时输出不包含结束标签，
+    此时取开始标签之后的全部内容(被截断的输出由 chat 抛出 TruncatedError，不会走到这里)
+    """
+    if prefilled and not text.lstrip().startswith(ZH_START):
+        text = ZH_START + text
+    start = text.find(ZH_START)
+    if start < 0:
+        return None
+    text = text[start + len(ZH_START) :]
+    end = text.find(ZH_END)
+    if end >= 0:
+        text = text[:end]
+    return text.strip() or None
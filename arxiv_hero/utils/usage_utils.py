@@ -0,0 +1,96 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from arxiv_hero import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 中日韩文字，大多数模型的分词中约 1 个字 1 个 token
+CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+_encoding = None
+
+
+class UsageEvent(BaseModel):
+    """一次大模型请求的用量"""
+
+    endpoint: str
+    model: str
+    kind: str  # 提示词类型
+    type: str  # 段落类型，不在段落中时为提示词类型
+    entry_id: str = ""  # 不属于某篇文章时为空
+    job: str  # 任务类型
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+
+_usage_scope: ContextVar[dict[str, str]] = ContextVar("usage_scope", default={})
+_listeners: list[Callable[[UsageEvent], None]] = []
+
+
+def get_usage_scope() -> dict[str, str]:
+    """当前上下文中用量的归属，可能包含 entry_id 和 type"""
+    return _usage_scope.get()
+
+
+@contextmanager
+def use_usage_scope(
+    entry_id: Optional[str] = None, type: Optional[str] = None
+) -> Iterator[None]:
+    """
+    设置之后的大模型请求用量的归属，嵌套使用时合并外层的设置，
+    如外层设置文章的 entry_id，内层设置段落的 type
+    """
+    scope = dict(_usage_scope.get())
+    if entry_id is not None:
+        scope["entry_id"] = entry_id
+    if type is not None:
+        scope["type"] = type
+    reset = _usage_scope.set(scope)
+    try:
+        yield
+    finally:
+        _usage_scope.reset(reset)
+
+
+def add_usage_listener(listener: Callable[[UsageEvent], None]) -> None:
+    """注册接收用量的函数，每次大模型请求返回用量后调用"""
+    _listeners.append(listener)
+
+
+def remove_usage_listener(listener: Callable[[UsageEvent], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def publish_usage(event: UsageEvent) -> None:
+    for listener in list(_listeners):
+        try:
+            listener(event)
+        except Exception as e:
+            logger.warning(f"记录大模型用量失败：{e}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估计文本的 token 数，用于翻译前估算花费
+
+    安装 tiktoken 时使用 cl100k_base 分词，否则中日韩文字按 1 个字 1 个 token，
+    其他字符按 4 个字符 1 个 token 计算
+    """
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    cjk_nums = len(CJK_PATTERN.findall(text))
+    return cjk_nums + (len(text) - cjk_nums + 3) // 4
@@ -9,12 +9,38 @@ from arxiv_hero.controllers import (
     article_router,
     content_router,
     history_router,
+    task_router,
+    metrics_router,
+    stats_router,
 )
-from arxiv_hero.services.task_manager import TaskManager
+from arxiv_hero.config import get_config
+from arxiv_hero.controllers.article_controller import create_articles_job
+from arxiv_hero.controllers.content_controller import processor
+from arxiv_hero.services.task_manager import ScheduleTaskManager
+from arxiv_hero.services.task_backend import create_task_backend, LeaderElector
+from arxiv_hero.services.job_queue import JobQueue
+from arxiv_hero.services.usage_recorder import usage_recorder
 from arxiv_hero.services import ArticleFetcher
 
+config = get_config()
 fetcher = ArticleFetcher()
-task_manager = TaskManager()
+task_manager = ScheduleTaskManager(
+    max_workers=config.task.max_workers,
+    lanes=config.task.lanes,
+    aging_seconds=config.task.aging_seconds,
+    result_ttl=config.task.result_ttl,
+    result_cache_size=config.task.result_cache_size,
+    backend=create_task_backend(config.task),
+    lease_seconds=config.task.lease_seconds,
+)
+job_queue = JobQueue(task_manager)
+# 多进程部署(uvicorn --workers N)时，定时抓取只在 leader 进程中执行
+fetch_leader = LeaderElector(
+    task_manager.backend,
+    "schedule_fetch_articles",
+    task_manager.worker_id,
+    lease_seconds=config.task.lease_seconds,
+)
 
 
 def schedule_fetch_articles():
@@ -22,19 +48,48 @@ def schedule_fetch_articles():
     if last_publish_date.tzinfo is None:
         last_publish_date = last_publish_date.replace(tzinfo=timezone.utc)
 
-    next_date = last_publish_date + timedelta(days=1)
-    now_date = datetime.now(tz=timezone.utc)
-
-    while next_date <= now_date:
-        fetcher.fetch_and_translate(date=next_date)
-        next_date += timedelta(days=1)  # 执行抓取后，日期加一天
+    # 从最后一篇文章的下一天补抓到今天，最近失败的 (日期, 类别) 也会重试
+    fetcher.backfill(
+        last_publish_date + timedelta(days=1),
+        datetime.now(tz=timezone.utc),
+        max_parallel_days=config.schedule.max_parallel_days,
+        retry_days=config.schedule.retry_days,
+        batch=config.translate.batch,
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.task_manager = task_manager
+    app.state.job_queue = job_queue
+    usage_recorder.start()  # 记录大模型的用量
+
+    # 注册持久化任务的处理函数，并恢复上次未完成的任务
+    job_queue.register(
+        "translate_content", processor.translate, lane="llm", priority="interactive"
+    )
+    job_queue.register("create_articles", create_articles_job, lane="llm")
+    job_queue.start()
+    fetch_leader.start(task_manager.scheduler)
+    if config.schedule.enabled:
+        task_manager.create_task(
+            schedule_fetch_articles,
+            trigger_type="cron",
+            trigger_args={
+                **config.schedule.fetch_trigger_args,
+                "timezone": config.timezone,
+            },
+            task_id="schedule_fetch_articles",
+            priority="bulk",
+            lane="llm",
+            kind="schedule_fetch_articles",
+            elector=fetch_leader,
+        )
     yield
+    fetch_leader.resign()
     task_manager.shutdown()
+    processor.figure_converter.shutdown()
+    usage_recorder.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -44,6 +99,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 
@@ -56,6 +112,9 @@ def doc_index():
 app.include_router(article_router)
 app.include_router(content_router)
 app.include_router(history_router)
+app.include_router(task_router)
+app.include_router(metrics_router)
+app.include_router(stats_router)
 
 
 if __name__ == "__main__":
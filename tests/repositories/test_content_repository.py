@@ -0,0 +1,50 @@
+import pytest
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.content import Content as ContentModel
+from arxiv_hero.repositories.content_repository import ContentRepository
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+
+ENTRY_ID = "1990.00100"
+
+
+@pytest.fixture
+def repository():
+    repository = ContentRepository()
+    repository.create_content(
+        ENTRY_ID,
+        [LatexPagagraph(type="text", order_idx=i, text=f"p{i}") for i in range(7)],
+    )
+    yield repository
+    with DBSession() as session:
+        session.query(ContentModel).filter(ContentModel.entry_id == ENTRY_ID).delete()
+        session.commit()
+
+
+def test_iter_pagagraphs(repository: ContentRepository):
+    def order(**kwargs) -> list[int]:
+        return [
+            p.order_idx
+            for p in repository.iter_pagagraphs(ENTRY_ID, batch_size=2, **kwargs)
+        ]
+
+    assert order() == list(range(7))
+    assert order(from_idx=3) == [3, 4, 5, 6]
+    assert order(from_idx=1, limit=3) == [1, 2, 3]
+    assert order(limit=0) == []
+
+    # 读取到一半时写入，下一批读取到最新的内容
+    pagagraphs = repository.iter_pagagraphs(ENTRY_ID, batch_size=2)
+    assert next(pagagraphs).order_idx == 0
+    repository.update_zh_field(ENTRY_ID, 4, {"zh_text": "第四段"})
+    assert [p.zh_text for p in pagagraphs][3] == "第四段"
+
+
+def test_content_version_changes_with_content(repository: ContentRepository):
+    version = repository.get_content_version(ENTRY_ID)
+    assert repository.get_content_version(ENTRY_ID) == version
+    # 段落数不变，同一秒内的修改也会改变版本号
+    repository.update_zh_field(ENTRY_ID, 2, {"zh_text": "a"})
+    version_a = repository.get_content_version(ENTRY_ID)
+    repository.update_zh_field(ENTRY_ID, 2, {"zh_text": "b"})
+    assert len({version, version_a, repository.get_content_version(ENTRY_ID)}) == 3
@@ -0,0 +1,54 @@
+import time
+import threading
+from datetime import datetime
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.fetch_checkpoint import FetchCheckpoint
+from arxiv_hero.repositories.article_repository.protocol import QueryResult
+from arxiv_hero.services.article_services.fetcher import ArticleFetcher
+
+
+def test_backfill_checkpoints(monkeypatch):
+    fetcher = ArticleFetcher()
+    monkeypatch.setattr(fetcher.config, "categories", ["cs.AI", "cs.CL"])
+
+    calls, running, max_running = [], 0, 0
+    lock = threading.Lock()
+    fail_once = {("1990-01-02", "cs.CL")}
+
+    def fake_fetch_and_translate(*, date, categories, cancel_token, batch=False):
+        nonlocal running, max_running
+        key = (date.strftime("%Y-%m-%d"), categories[0])
+        with lock:
+            calls.append(key)
+            running += 1
+            max_running = max(max_running, running)
+        try:
+            time.sleep(0.05)
+            if key in fail_once:
+                fail_once.discard(key)
+                raise RuntimeError("arxiv 接口超时")
+            return QueryResult(articles=[], total_nums=1)
+        finally:
+            with lock:
+                running -= 1
+
+    monkeypatch.setattr(fetcher, "fetch_and_translate", fake_fetch_and_translate)
+
+    try:
+        start, end = datetime(1990, 1, 1), datetime(1990, 1, 4)
+        assert fetcher.backfill(start, end, max_parallel_days=2) == 7
+        assert len(calls) == 8
+        assert max_running <= 2  # 每天的类别依次获取，同时处理的天数不超过上限
+
+        # 再次执行时只重试失败的 (日期, 类别)
+        calls.clear()
+        assert fetcher.backfill(end, end, max_parallel_days=2) == 1
+        assert calls == [("1990-01-02", "cs.CL")]
+        assert fetcher.checkpoints.get_failed_dates("1990-01-01") == []
+    finally:
+        with DBSession() as session:
+            session.query(FetchCheckpoint).filter(
+                FetchCheckpoint.date.like("1990-%")
+            ).delete(synchronize_session=False)
+            session.commit()
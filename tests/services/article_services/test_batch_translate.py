@@ -0,0 +1,229 @@
+import json
+import threading
+from datetime import datetime
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.article import Article as ArticleModel
+from arxiv_hero.models.translation_batch import TranslationBatch
+from arxiv_hero.repositories.article_repository import ArticleRepository
+from arxiv_hero.repositories.article_repository.protocol import Article
+from arxiv_hero.services.article_services.translator import Translator
+from arxiv_hero.utils import chat_utils
+from arxiv_hero.utils.cancel_utils import CancelToken, CancelledError
+from arxiv_hero.utils.chat_utils import Endpoint
+from arxiv_hero.utils.concurrency_utils import AIMDLimiter
+
+
+class MockBatchServer:
+    """
+    本地的 openai 兼容 batch 服务。batch 任务在被查询 pending_polls 次后完成，
+    failed_ids 中的请求在输出文件中返回错误；逐个请求的翻译都返回"同步翻译"
+    """
+
+    def __init__(self, pending_polls: int = 1, failed_ids: set[str] = ()):
+        self.pending_polls = pending_polls
+        self.failed_ids = set(failed_ids)
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.polls = 0
+        self.chat_requests = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, data, content_type="application/json"):
+                data = data if isinstance(data, str) else json.dumps(data)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data.encode())))
+                self.end_headers()
+                self.wfile.write(data.encode())
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.path == "/v1/files":
+                    message = BytesParser().parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                        + body
+                    )
+                    for part in message.get_payload():
+                        if (
+                            part.get_param("name", header="content-disposition")
+                            == "file"
+                        ):
+                            file_id = f"file-{len(mock.files)}"
+                            mock.files[file_id] = part.get_payload(decode=True).decode()
+                    self._send(
+                        {
+                            "id": file_id,
+                            "object": "file",
+                            "bytes": 0,
+                            "created_at": 0,
+                            "filename": "input.jsonl",
+                            "purpose": "batch",
+                            "status": "processed",
+                        }
+                    )
+                elif self.path == "/v1/batches":
+                    request = json.loads(body)
+                    batch_id = f"batch-{len(mock.batches)}"
+                    mock.batches[batch_id] = {
+                        "id": batch_id,
+                        "object": "batch",
+                        "endpoint": request["endpoint"],
+                        "input_file_id": request["input_file_id"],
+                        "completion_window": request["completion_window"],
+                        "status": "in_progress",
+                        "created_at": 0,
+                    }
+                    self._send(mock.batches[batch_id])
+                else:
+                    mock.chat_requests += 1
+                    completion = mock.completion("<Chinese>同步翻译</Chinese>")
+                    if not json.loads(body).get("stream"):
+                        self._send(completion)
+                        return
+                    message = completion["choices"][0].pop("message")
+                    chunk = {
+                        **completion,
+                        "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": message}],
+                    }
+                    self._send(
+                        f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n",
+                        "text/event-stream",
+                    )
+
+            def do_GET(self):
+                if self.path.startswith("/v1/batches/"):
+                    batch = mock.batches[self.path.rsplit("/", 1)[1]]
+                    mock.polls += 1
+                    if (
+                        batch["status"] == "in_progress"
+                        and mock.polls > mock.pending_polls
+                    ):
+                        batch["status"] = "completed"
+                        batch["output_file_id"] = mock.run(batch["input_file_id"])
+                    self._send(batch)
+                else:  # /v1/files/{id}/content
+                    self._send(mock.files[self.path.split("/")[3]], "text/plain")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def completion(content: str) -> dict:
+        return {
+            "id": "1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "batch-model",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def run(self, input_file_id: str) -> str:
+        """执行 batch 中的请求，返回输出文件的 ID"""
+        lines = []
+        for line in self.files[input_file_id].splitlines():
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+            if custom_id in self.failed_ids:
+                response = {"status_code": 500, "body": {"error": "server error"}}
+            else:
+                response = {
+                    "status_code": 200,
+                    "body": self.completion(f"<Chinese>译文 {custom_id}</Chinese>"),
+                }
+            lines.append(json.dumps({"custom_id": custom_id, "response": response}))
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = "\n".join(lines)
+        return file_id
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _article(entry_id: str) -> Article:
+    return Article(
+        entry_id=entry_id,
+        updated=datetime(1990, 1, 1),
+        published=datetime(1990, 1, 1),
+        title=f"Title of {entry_id}",
+        authors=[],
+        summary=f"Abstract of {entry_id}",
+        primary_category="cs.AI",
+        categories=["cs.AI"],
+        links=[],
+        pdf_url="",
+    )
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    mock = MockBatchServer(pending_polls=2, failed_ids={"1990.00002/abstract"})
+    endpoint = Endpoint("default", mock.base_url, "x", "batch-model", 10, AIMDLimiter())
+    monkeypatch.setattr(chat_utils, "ENDPOINTS", {"default": endpoint})
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {})
+    yield mock
+    mock.close()
+    with DBSession() as session:
+        session.query(ArticleModel).filter(ArticleModel.entry_id.like("1990.%")).delete(
+            synchronize_session=False
+        )
+        session.query(TranslationBatch).filter(
+            TranslationBatch.entry_ids.like('%"1990.%')
+        ).delete(synchronize_session=False)
+        session.commit()
+
+
+def test_batch_translate_resumes(mock_server: MockBatchServer):
+    translator = Translator()
+    repository = ArticleRepository()
+    articles = [_article("1990.00001"), _article("1990.00002")]
+    repository.create_articles(articles)
+
+    # 等待时被取消，已提交的任务记录在数据库中
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    with pytest.raises(CancelledError):
+        translator.batch_translate_articles(
+            articles, poll_interval=1, cancel_token=token
+        )
+    assert len(mock_server.batches) == 1
+
+    # 再次翻译相同的文章时，继续等待已提交的任务，不重复提交
+    translations = translator.batch_translate_articles(articles, poll_interval=0.01)
+    assert len(mock_server.batches) == 1
+    assert translations == {
+        "1990.00001": ("译文 1990.00001/title", "译文 1990.00001/abstract"),
+        "1990.00002": ("译文 1990.00002/title", "同步翻译"),  # batch 中失败的请求
+    }
+    assert mock_server.chat_requests == 1
+
+    assert repository.bulk_update_translations(translations) == 2
+    article = repository.get_article_by_entry_id("1990.00002")
+    assert (article.zh_title, article.zh_summary) == (
+        "译文 1990.00002/title",
+        "同步翻译",
+    )
+
+    # 已完成的任务直接读取结果
+    assert translator.batch_translate_articles(articles) == translations
+    assert len(mock_server.batches) == 1
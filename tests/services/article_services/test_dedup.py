@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import arxiv
+
+from arxiv_hero.services.article_services.fetcher import ArticleFetcher
+
+
+def make_result(entry_id: str, categories: list[str]) -> arxiv.Result:
+    return arxiv.Result(
+        entry_id=f"http://arxiv.org/abs/{entry_id}",
+        updated=datetime(2025, 5, 1),
+        published=datetime(2025, 5, 1),
+        title=f"Title of {entry_id}",
+        authors=[arxiv.Result.Author("Alice")],
+        summary=f"Abstract of {entry_id}",
+        primary_category=categories[0],
+        categories=categories,
+        links=[
+            arxiv.Result.Link(
+                f"http://arxiv.org/pdf/{entry_id}", title="pdf", rel="related"
+            )
+        ],
+    )
+
+
+# 2505.00002v1 交叉列出在 cs.AI 和 cs.CL 中，2505.00003v1 同时出现在三个类别中
+FIXTURES = {
+    "cs.AI": [
+        make_result("2505.00001v1", ["cs.AI"]),
+        make_result("2505.00002v1", ["cs.AI", "cs.CL"]),
+        make_result("2505.00003v1", ["cs.LG", "cs.AI", "cs.CL"]),
+    ],
+    "cs.CL": [
+        make_result("2505.00002v1", ["cs.AI", "cs.CL"]),
+        make_result("2505.00003v1", ["cs.LG", "cs.AI", "cs.CL"]),
+        make_result("2505.00004v1", ["cs.CL"]),
+    ],
+    "cs.LG": [make_result("2505.00003v1", ["cs.LG", "cs.AI", "cs.CL"])],
+}
+
+
+def test_dedup_cross_listed_articles(monkeypatch):
+    fetcher = ArticleFetcher()
+    monkeypatch.setattr(fetcher.config, "categories", list(FIXTURES))
+    monkeypatch.setattr(fetcher.config, "only_primary", False)
+
+    def fake_results(search: arxiv.Search):
+        category = search.query.split()[0].removeprefix("cat:")
+        return iter(FIXTURES[category])
+
+    monkeypatch.setattr(fetcher.client, "results", fake_results)
+
+    translated = []
+
+    def fake_translate(texts: list[str], entry_ids=None) -> list[str]:
+        translated.extend(texts)
+        return [f"译：{text}" for text in texts]
+
+    monkeypatch.setattr(fetcher.translator, "batch_translate_titles", fake_translate)
+    monkeypatch.setattr(fetcher.translator, "batch_translate_abstracts", fake_translate)
+
+    saved = {}
+
+    def fake_create_articles(articles):
+        for article in articles:
+            assert article.entry_id not in saved, "entry_id 重复插入"
+            saved[article.entry_id] = article
+        return True
+
+    monkeypatch.setattr(fetcher.respository, "create_articles", fake_create_articles)
+    monkeypatch.setattr(
+        fetcher.respository,
+        "get_articles_by_entry_ids",
+        lambda entry_ids: [saved[i] for i in entry_ids if i in saved],
+    )
+
+    result = fetcher.fetch_and_translate(date=datetime(2025, 5, 1))
+
+    entry_ids = ["2505.00001v1", "2505.00002v1", "2505.00003v1", "2505.00004v1"]
+    assert sorted(article.entry_id for article in result.articles) == entry_ids
+    assert result.total_nums == 4
+    assert len(translated) == 8  # 每篇文章的标题和摘要各翻译一次
+    assert len(translated) == len(set(translated))
@@ -0,0 +1,65 @@
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+from arxiv_hero.services.content_services.classifier import classify_paragraph
+from arxiv_hero.services.content_services.processor import ContentProcessor
+
+CASES = [
+    (
+        "text",
+        "We propose a simple method that improves retrieval quality.",
+        "translate",
+    ),
+    (
+        "text",
+        '<span id="sec:intro" class="label"></span>We study the problem.',
+        "translate",
+    ),
+    ("text", "$$\\mathcal{L} = \\sum_{i=1}^{N} \\log p(x_i)$$", "copy"),
+    ("text", "$x \\in \\mathbb{R}^d$, $y = f(x)$", "copy"),
+    ("text", "https://github.com/example/project", "copy"),
+    ("text", "Department of Computer Science, Tsinghua University", "copy"),
+    ("text", "alice@example.com, bob@example.com", "copy"),
+    ("text", "12.3 45.6 78.9", "copy"),
+    ("text", "<div align=center>x</div>", "copy"),
+    ("title", "2 Related Work", "translate"),
+    ("title", "3.1", "copy"),
+    ("figure", "![](fig1.webp)\n\n**Figure 1**: Overview of the framework.", "caption"),
+    (
+        "table",
+        "**Table 2**: Results on GSM8K.\n\n| Model | Acc |\n|---|---|\n| Ours | 81.2 |",
+        "caption",
+    ),
+    ("latex", "```latex\nfor i in range(n):\n    x[i] = f(x[i])\n```", "copy"),
+    (
+        "latex",
+        "```latex\n\\caption{Bubble Sort Algorithm}\n\\KwIn{$A$: an array}\n```",
+        "translate",
+    ),
+    ("equation", "$$E = mc^2$$", "copy"),
+    ("reference", "[1] A. Author. A paper title that is long enough. 2020.", "copy"),
+]
+
+
+def test_classify_paragraph():
+    for type_, text, expected in CASES:
+        paragraph = LatexPagagraph(type=type_, text=text)
+        assert classify_paragraph(paragraph) == expected, text
+
+
+def test_translate_caption_only(monkeypatch):
+    processor = ContentProcessor()
+    requests = []
+
+    def fake_translate_content(content, history=None):
+        requests.append(content)
+        return "框架概览。"
+
+    monkeypatch.setattr(
+        processor.translator, "translate_content", fake_translate_content
+    )
+    paragraph = LatexPagagraph(
+        type="figure", text="![](fig1.webp)\n\n**Figure 1**: Overview of the framework."
+    )
+    paragraph, action = processor.translate_paragraph(paragraph)
+    assert action == "caption"
+    assert requests == ["Overview of the framework."]
+    assert paragraph.zh_text == "![](fig1.webp)\n\n**图1**：框架概览。"
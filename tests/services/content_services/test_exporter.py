@@ -0,0 +1,46 @@
+import os
+from types import SimpleNamespace
+
+from arxiv_hero.repositories.content_repository.protocol import LatexPagagraph
+from arxiv_hero.services.content_services.exporter import ContentExporter
+
+
+class FakeContentRepository:
+    """内容版本随段落变化，未解析时为空内容的版本"""
+
+    def __init__(self):
+        self.pagagraphs: list[LatexPagagraph] = []
+
+    def get_content_version(self, entry_id: str) -> str:
+        return f"v{len(self.pagagraphs)}"
+
+
+def test_export_unparsed_article_uses_parsed_version(tmp_path):
+    repository = FakeContentRepository()
+    exporter = ContentExporter(repository)
+    exporter.config = SimpleNamespace(download_dir=str(tmp_path))
+    calls = []
+
+    def parse(entry_id: str) -> list[LatexPagagraph]:
+        calls.append(entry_id)
+        if not repository.pagagraphs:  # 第一次导出时解析
+            repository.pagagraphs = [
+                LatexPagagraph(type="text", order_idx=0, text="hello", zh_text="你好")
+            ]
+        return repository.pagagraphs
+
+    version = exporter.get_version("1990.00100")
+    export_file = exporter.export("1990.00100", "zh", "md", parse, version=version)
+    # 按解析后的内容版本保存，而不是解析前空内容的版本
+    assert version == "v0"
+    assert export_file.etag == '"v1-zh-md"'
+    assert os.path.basename(export_file.path) == "zh.v1.md"
+    with open(export_file.path, encoding="utf-8") as f:
+        assert f.read() == "你好"
+
+    # 之后的请求按解析后的版本命中缓存，不再读取段落
+    version = exporter.get_version("1990.00100")
+    assert exporter.export("1990.00100", "zh", "md", parse, version=version) == (
+        export_file
+    )
+    assert calls == ["1990.00100"]
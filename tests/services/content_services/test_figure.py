@@ -0,0 +1,171 @@
+import os
+import json
+import time
+
+import fitz
+import pytest
+from PIL import Image
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from arxiv_hero.config import FigureConfig
+from arxiv_hero.controllers import content_controller
+from arxiv_hero.services.content_services import figure as figure_module
+from arxiv_hero.services.content_services.figure import (
+    FIGURE_MANIFEST_FILE,
+    FigureConverter,
+)
+from arxiv_hero.utils.parallel_utils import parallel_func
+
+
+def _make_pdf(path: str) -> None:
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=200)
+    page.draw_rect(fitz.Rect(10, 10, 100, 100), color=(1, 0, 0), fill=(1, 0, 0))
+    doc.save(path)
+
+
+def _make_bmp(path: str, size: tuple[int, int] = (640, 320)) -> None:
+    Image.new("RGB", size, "blue").save(path, "BMP")
+
+
+def _image_size(path: str) -> tuple[str, int]:
+    with Image.open(path) as image:
+        return image.format, max(image.size)
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    os.makedirs(tmp_path / "figs")
+    _make_pdf(str(tmp_path / "figs" / "fig.pdf"))
+    _make_bmp(str(tmp_path / "figs" / "fig.bmp"))
+    return str(tmp_path)
+
+
+def test_convert_figures(source_dir):
+    config = FigureConfig(lazy=False, max_size=300, thumbnail_size=50, max_workers=2)
+    converter = FigureConverter(config)
+    try:
+        result = converter.convert(
+            source_dir,
+            ["figs/fig.pdf", "figs/fig.bmp", "figs/a.png", "figs/missing.pdf"],
+        )
+    finally:
+        converter.shutdown()
+
+    # 同名的 pdf 和 bmp 转换为不同的展示图，不需要转换和不存在的图片不在结果中
+    assert result == {
+        "figs/fig.pdf": "figs/fig.pdf.webp",
+        "figs/fig.bmp": "figs/fig.bmp.webp",
+    }
+    for figure_path in result:
+        display_path = os.path.join(source_dir, f"{figure_path}.webp")
+        thumbnail_path = os.path.join(source_dir, f"{figure_path}.thumb.webp")
+        assert _image_size(display_path) == ("WEBP", 300)
+        assert _image_size(thumbnail_path) == ("WEBP", 50)
+
+    with open(os.path.join(source_dir, FIGURE_MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["figs/fig.pdf.webp"]["source_path"] == "figs/fig.pdf"
+    assert manifest["figs/fig.bmp.webp"]["thumbnail_path"] == "figs/fig.bmp.thumb.webp"
+
+
+def test_convert_reuses_manifest(source_dir, monkeypatch):
+    calls = []
+    convert_figure = figure_module.convert_figure
+
+    def counting_convert(fig_path, config):
+        calls.append(os.path.relpath(fig_path, source_dir))
+        return convert_figure(fig_path, config)
+
+    monkeypatch.setattr(figure_module, "convert_figure", counting_convert)
+    converter = FigureConverter(FigureConfig(lazy=False, max_workers=1))
+    expected = {"figs/fig.bmp": "figs/fig.bmp.webp"}
+    assert converter.convert(source_dir, ["figs/fig.bmp"]) == expected
+    assert converter.convert(source_dir, ["figs/fig.bmp"]) == expected
+    assert len(calls) == 1  # 原图和配置都没有变化，跳过
+
+    _make_bmp(os.path.join(source_dir, "figs", "fig.bmp"), size=(100, 100))
+    assert converter.convert(source_dir, ["figs/fig.bmp"]) == expected
+    assert len(calls) == 2  # 原图变化
+
+    converter = FigureConverter(FigureConfig(lazy=False, max_workers=1, quality=50))
+    assert converter.convert(source_dir, ["figs/fig.bmp"]) == expected
+    assert len(calls) == 3  # 转换配置变化
+
+
+def test_resolve_converts_on_first_request(source_dir, monkeypatch):
+    calls = []
+    convert_figure = figure_module.convert_figure
+
+    def slow_convert(fig_path, config):
+        calls.append((os.path.relpath(fig_path, source_dir), config.format))
+        time.sleep(0.2)  # 其他请求在转换期间到达
+        return convert_figure(fig_path, config)
+
+    monkeypatch.setattr(figure_module, "convert_figure", slow_convert)
+    converter = FigureConverter(FigureConfig(lazy=True))
+    assert converter.rewrite_path("figs/fig.pdf") == "figs/fig.pdf.webp"
+    assert converter.rewrite_path("figs/a.png") == "figs/a.png"
+
+    # 并发请求展示图和缩略图，只转换一次
+    requests = [
+        (source_dir, "figs/fig.pdf.webp"),
+        (source_dir, "figs/fig.pdf.thumb.webp"),
+    ] * 4
+    paths = parallel_func(converter.resolve, requests)
+    assert calls == [("figs/fig.pdf", "webp")]
+    assert paths == [os.path.join(source_dir, filepath) for _, filepath in requests]
+    assert all(os.path.isfile(path) for path in paths)
+
+    # 之后的请求直接使用转换结果，请求其他格式时另外转换
+    assert converter.resolve(source_dir, "figs/fig.pdf.webp") == paths[0]
+    assert converter.resolve(source_dir, "figs/fig.pdf.png") == os.path.join(
+        source_dir, "figs/fig.pdf.png"
+    )
+    assert calls == [("figs/fig.pdf", "webp"), ("figs/fig.pdf", "png")]
+    # 不是由 pdf/eps/bmp 转换得到的图片由调用方处理
+    assert converter.resolve(source_dir, "figs/a.png") is None
+    assert converter.resolve(source_dir, "figs/missing.pdf.webp") is None
+
+    # 图片锁在请求结束后删除，哈希缓存有上限
+    assert converter._figure_locks == {}
+    converter.hash_cache_size = 1
+    converter.resolve(source_dir, "figs/fig.bmp.webp")
+    assert list(converter._hash_cache) == [os.path.join(source_dir, "figs/fig.bmp")]
+
+
+def test_resolve_corrupt_figure(source_dir):
+    with open(os.path.join(source_dir, "figs", "bad.pdf"), "wb") as f:
+        f.write(b"not a pdf")
+    converter = FigureConverter(FigureConfig(lazy=True))
+    # 转换失败时返回 None，由调用方返回 404，不会在请求中抛出异常
+    assert converter.resolve(source_dir, "figs/bad.pdf.webp") is None
+    assert converter._figure_locks == {}
+    assert converter.resolve(source_dir, "figs/fig.pdf.webp") == os.path.join(
+        source_dir, "figs/fig.pdf.webp"
+    )
+
+
+def test_get_source_rejects_path_traversal(source_dir, monkeypatch):
+    figs_dir = os.path.join(source_dir, "figs")
+    monkeypatch.setattr(
+        content_controller.processor,
+        "download_source_and_extract",
+        lambda entry_id: figs_dir,
+    )
+    request = Request({"type": "http", "headers": []})
+    _make_bmp(os.path.join(source_dir, "secret.bmp"))
+    Image.new("RGB", (10, 10)).save(os.path.join(source_dir, "secret.png"))
+
+    for filepath in ["../secret.png", "../figs2/a.png", "/etc/passwd.png"]:
+        with pytest.raises(HTTPException) as e:
+            content_controller.get_source("1990.00100", filepath, request)
+        assert e.value.status_code == 400
+    # 按需转换也不能访问源文件目录之外的图片
+    with pytest.raises(HTTPException):
+        content_controller.get_source("1990.00100", "../secret.bmp.webp", request)
+    assert not os.path.exists(os.path.join(source_dir, "secret.bmp.webp"))
+
+    response = content_controller.get_source("1990.00100", "fig.pdf.webp", request)
+    assert response.path == os.path.join(figs_dir, "fig.pdf.webp")
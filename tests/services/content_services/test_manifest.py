@@ -0,0 +1,83 @@
+import pytest
+
+pypandoc = pytest.importorskip("pypandoc")
+
+from arxiv_hero.services.content_services import latex_parser
+from arxiv_hero.services.content_services.latex_parser import LatexParser
+from arxiv_hero.services.content_services.manifest import ParseManifest
+
+
+def _has_pandoc() -> bool:
+    try:
+        pypandoc.get_pandoc_version()
+        return True
+    except OSError:
+        return False
+
+
+# 解析需要 pandoc，pypandoc 找不到系统安装或内置的 pandoc 时跳过
+pytestmark = pytest.mark.skipif(not _has_pandoc(), reason="需要安装 pandoc")
+
+MAIN_TEX = r"""\documentclass{article}
+\begin{document}
+\section{Intro}
+Hello world.
+\input{body}
+\end{document}
+"""
+
+BODY_TEX = r"""\section{Body}
+Body text with $x^2$.
+"""
+
+
+def _make_source(tmp_path):
+    (tmp_path / "main.tex").write_text(MAIN_TEX, encoding="utf-8")
+    (tmp_path / "body.tex").write_text(BODY_TEX, encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_parse_cache_hit(tmp_path):
+    source_dir = _make_source(tmp_path)
+    paragraphs = LatexParser().parse(source_dir)
+
+    manifest = ParseManifest(
+        source_dir, latex_parser.PARSER_VERSION, latex_parser.FLATTEN_VERSION
+    )
+    assert manifest.is_flatten_valid()
+    assert manifest.is_parse_valid()
+    assert manifest.load_paragraphs() == paragraphs
+
+
+def test_parse_cache_invalidated(tmp_path, monkeypatch):
+    source_dir = _make_source(tmp_path)
+    LatexParser().parse(source_dir)
+
+    # 输入文件变化
+    with open(tmp_path / "body.tex", "a", encoding="utf-8") as f:
+        f.write("More text.\n")
+    manifest = ParseManifest(
+        source_dir, latex_parser.PARSER_VERSION, latex_parser.FLATTEN_VERSION
+    )
+    assert not manifest.is_flatten_valid()
+    assert not manifest.is_parse_valid()
+    paragraphs = LatexParser().parse(source_dir)
+    assert paragraphs[-1].text.endswith("More text.")
+
+    # 解析器升级
+    monkeypatch.setattr(latex_parser, "PARSER_VERSION", "test")
+    manifest = ParseManifest(
+        source_dir, latex_parser.PARSER_VERSION, latex_parser.FLATTEN_VERSION
+    )
+    assert manifest.is_flatten_valid()
+    assert not manifest.is_parse_valid()
+
+    # 合并逻辑升级，合并结果和解析缓存都失效
+    LatexParser().parse(source_dir)
+    monkeypatch.setattr(latex_parser, "FLATTEN_VERSION", "test")
+    manifest = ParseManifest(
+        source_dir, latex_parser.PARSER_VERSION, latex_parser.FLATTEN_VERSION
+    )
+    assert not manifest.is_flatten_valid()
+    assert not manifest.is_parse_valid()
+    assert LatexParser().parse(source_dir) == paragraphs
@@ -0,0 +1,48 @@
+from arxiv_hero.services.content_services import translator as translator_module
+from arxiv_hero.services.content_services.masking import mask_text, unmask_text
+from arxiv_hero.services.content_services.translator import Translator
+
+TEXT = (
+    'As shown in Figure <a href="#fig:overview">2</a>, a model with $\\theta$ '
+    "and $$L = \\sum_i \\ell_i$$ outperforms prior work [[3], [4]] and [[7]]. "
+    '<span id="sec:method" class="label"></span>It costs \\$5.'
+)
+
+
+def test_mask_round_trip():
+    masked, spans = mask_text(TEXT)
+    assert spans == [
+        '<a href="#fig:overview">2</a>',
+        "$\\theta$",
+        "$$L = \\sum_i \\ell_i$$",
+        "[[3], [4]]",
+        "[[7]]",
+        '<span id="sec:method" class="label"></span>',
+    ]
+    assert "\\$5" in masked  # 转义的 $ 不是公式
+
+    # 译文中的占位符顺序可以变化，允许多余的空格
+    zh = "如图⟦1⟧所示，使用⟦2⟧和⟦3⟧的模型优于已有工作⟦4⟧和⟦ 5 ⟧。⟦6⟧花费 \\$5。"
+    restored = unmask_text(zh, spans)
+    for span in spans:
+        assert span in restored
+
+    assert unmask_text("如图⟦1⟧所示", spans) is None  # 丢失占位符
+    assert unmask_text(zh + "⟦2⟧", spans) is None  # 重复
+    assert unmask_text(zh + "⟦9⟧", spans) is None  # 多出
+
+
+def test_translate_falls_back_to_original(monkeypatch):
+    requests = []
+
+    def fake_chat(messages, on_delta=None, kind=None, **kwargs):
+        content = messages[-1]["content"]
+        requests.append(content)
+        if "⟦" in content:
+            return "<Chinese>占位符丢失了</Chinese>"
+        return "<Chinese>原文翻译</Chinese>"
+
+    monkeypatch.setattr(translator_module, "chat", fake_chat)
+    assert Translator().translate_content(TEXT, max_retries=2) == "原文翻译"
+    assert "⟦1⟧" in requests[0]
+    assert TEXT in requests[1]
@@ -0,0 +1,145 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from arxiv_hero.services.content_services.prompts import content_system_prompt
+from arxiv_hero.services.content_services.translator import Translator
+from arxiv_hero.utils import chat_utils
+from arxiv_hero.utils.chat_utils import Endpoint, chat
+from arxiv_hero.utils.concurrency_utils import AIMDLimiter
+
+# 原文和译文
+FIXTURES = {
+    "Large language models are increasingly used as agents.": "大语言模型越来越多地被用作智能体。",
+    "We evaluate our method on three public benchmarks and report the average accuracy.": "我们在三个公开基准上评估了所提方法，并报告平均准确率。",
+    "Results show that the proposed router reduces latency without hurting quality.": "结果表明，所提出的路由器在不损害质量的情况下降低了延迟。",
+    "Finally, we discuss limitations and future work.": "最后，我们讨论了局限性和未来的工作。",
+}
+
+
+class MockChattyModel:
+    """
+    本地的 openai 兼容服务，模拟在译文前后输出多余说明的模型，1 个字符算 1 个 token。
+    遵守 stop 和 max_tokens，最后一条消息为助手消息时从其后续写
+    """
+
+    preamble = "好的，下面是翻译结果：\n"
+    epilogue = (
+        "\n\n说明：以上译文根据中文的表达习惯调整了语序，专业术语保留了常见的译法。"
+    )
+
+    def __init__(self):
+        self.bodies: list[dict] = []
+        self.completion_tokens = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                mock.bodies.append(body)
+                content, finish_reason = mock.complete(body)
+                mock.completion_tokens += len(content)
+                data = json.dumps(
+                    {
+                        "id": "1",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": content},
+                                "finish_reason": finish_reason,
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": 1,
+                            "completion_tokens": len(content),
+                            "total_tokens": len(content) + 1,
+                        },
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def complete(self, body: dict) -> tuple[str, str]:
+        messages = body["messages"]
+        prefix = ""
+        if messages[-1]["role"] == "assistant":
+            prefix = messages.pop()["content"]
+        source = re.search(
+            r"<English>\s*(.*?)\s*</English>", messages[-1]["content"], re.DOTALL
+        ).group(1)
+        output = (
+            f"{self.preamble}<Chinese>\n{FIXTURES[source]}\n</Chinese>{self.epilogue}"
+        )
+        output = output[output.index(prefix) + len(prefix) :] if prefix else output
+        finish_reason = "stop"
+        for stop in body.get("stop") or []:
+            if stop in output:
+                output = output[: output.index(stop)]
+        if body.get("max_tokens") and len(output) > body["max_tokens"]:
+            output, finish_reason = output[: body["max_tokens"]], "length"
+        return output, finish_reason
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def close(self):
+        self.server.shutdown()
+
+
+@pytest.fixture
+def mock_model(monkeypatch):
+    mock = MockChattyModel()
+    endpoint = Endpoint("default", mock.base_url, "x", "mock-model", 10, AIMDLimiter())
+    monkeypatch.setattr(chat_utils, "ENDPOINTS", {"default": endpoint})
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {})
+    yield mock
+    mock.close()
+
+
+def test_output_control_reduces_completion_tokens(monkeypatch, mock_model):
+    translator = Translator()
+    # 原来的请求方式：不限制输出，依赖模型自行结束
+    for source in FIXTURES:
+        messages = translator._build_messages(content_system_prompt, source)
+        assert translator._match_zh_translated(chat(messages=messages)) is not None
+    baseline = mock_model.completion_tokens
+
+    mock_model.completion_tokens = 0
+    mock_model.bodies.clear()
+    monkeypatch.setattr(translator.config, "prefill", True)
+    for source, zh in FIXTURES.items():
+        assert translator.translate_content(source) == zh
+    assert len(mock_model.bodies) == len(FIXTURES)  # 没有因截断或不匹配而重试
+    assert all(
+        body["temperature"] == 0 and body["stop"] == ["</Chinese>"]
+        for body in mock_model.bodies
+    )
+    # 只输出译文本身
+    assert mock_model.completion_tokens == sum(len(zh) + 2 for zh in FIXTURES.values())
+    assert mock_model.completion_tokens < baseline * 0.5
+
+
+def test_truncated_output_retries_with_larger_limit(monkeypatch, mock_model):
+    translator = Translator()
+    source, zh = next(iter(FIXTURES.items()))
+    limit = len(zh) // 2 + 20  # 不足以输出开场白和译文
+    monkeypatch.setattr(translator.config, "max_tokens_ratio", 0.01)
+    monkeypatch.setattr(translator.config, "min_max_tokens", limit)
+    assert translator.translate_content(source) == zh
+    assert [body["max_tokens"] for body in mock_model.bodies] == [limit, limit * 2]
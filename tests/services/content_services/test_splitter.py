@@ -0,0 +1,98 @@
+import re
+import time
+import threading
+
+from arxiv_hero.services.content_services import translator as translator_module
+from arxiv_hero.services.content_services.splitter import (
+    split_paragraph,
+    split_sentences,
+    stitch_translations,
+)
+from arxiv_hero.services.content_services.translator import Translator
+from arxiv_hero.utils.usage_utils import estimate_tokens
+
+TEXT = (
+    "Prior work, e.g. retrieval models by Smith et al. [[3], [4]], uses $x. Y$ as input. "
+    "See Fig. 2 for details. ⟦1⟧. Results improve by 5%! "
+    '<a href="#sec:a. B">3</a> describes the setup.\n'
+    "- First item of the list.\n"
+    "- Second item of the list."
+)
+
+
+def test_split_sentences():
+    sentences = split_sentences(TEXT)
+    assert "".join(sentences) == TEXT
+    assert [s.strip() for s in sentences] == [
+        "Prior work, e.g. retrieval models by Smith et al. [[3], [4]], uses $x. Y$ as input.",
+        "See Fig. 2 for details.",
+        "⟦1⟧.",
+        "Results improve by 5%!",
+        '<a href="#sec:a. B">3</a> describes the setup.',
+        "- First item of the list.",
+        "- Second item of the list.",
+    ]
+
+
+def test_split_paragraph():
+    assert split_paragraph(TEXT, 0) == [TEXT]
+    assert split_paragraph(TEXT, 1000) == [TEXT]
+
+    chunks = split_paragraph(TEXT, 30)
+    assert len(chunks) > 1
+    assert "".join(chunks) == TEXT
+    for chunk in chunks:
+        # 超过上限的只有单个句子
+        assert estimate_tokens(chunk) <= 30 or len(split_sentences(chunk)) == 1
+
+    # 块之间有换行时保留，否则直接相连
+    assert (
+        stitch_translations(["A. ", "B.\n", "- C."], ["甲。", "乙。 ", "- 丙。"])
+        == "甲。乙。\n- 丙。"
+    )
+
+
+def test_translate_long_paragraph_in_parallel(monkeypatch):
+    text = " ".join(f"Sentence number {i} is long enough." for i in range(40))
+    chunks = split_paragraph(text, 60)
+    assert len(chunks) > 2
+    barrier = threading.Barrier(len(chunks), timeout=5)
+
+    def fake_chat(messages, on_delta=None, kind=None, **kwargs):
+        barrier.wait()  # 所有块同时在请求中
+        content = re.search(
+            r"<English>\s*(.*?)\s*</English>", messages[-1]["content"], re.DOTALL
+        ).group(1)
+        return f"<Chinese>译：{content}</Chinese>"
+
+    monkeypatch.setattr(translator_module, "chat", fake_chat)
+    monkeypatch.setattr(Translator.config, "split_tokens", 60)
+    monkeypatch.setattr(Translator.config, "max_workers", len(chunks))
+    translator = Translator()
+    assert translator.translate_content(text) == "".join(
+        f"译：{chunk.strip()}" for chunk in chunks
+    )
+
+    # 同时翻译的块数不超过 max_workers
+    running, max_running = 0, 0
+    lock = threading.Lock()
+
+    def counting_chat(messages, on_delta=None, kind=None, **kwargs):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return "<Chinese>译文</Chinese>"
+
+    monkeypatch.setattr(translator_module, "chat", counting_chat)
+    monkeypatch.setattr(Translator.config, "max_workers", 2)
+    assert translator.translate_content(text) == "译文" * len(chunks)
+    assert max_running == 2
+
+    # 估计的用量按每块的请求计算
+    prompt_tokens, _ = translator.estimate_tokens("content", text)
+    monkeypatch.setattr(Translator.config, "split_tokens", 0)
+    assert prompt_tokens > translator.estimate_tokens("content", text)[0]
@@ -0,0 +1,36 @@
+from arxiv_hero.services.content_services import translator as translator_module
+from arxiv_hero.services.content_services.translator import Translator
+
+TEXT = "A model with $\\theta$ outperforms prior work [[3]]."
+CHUNKS = [
+    "<Chi",
+    "nese>\n使用",
+    "⟦",
+    "1⟧ 的模型",
+    "优于已有工作⟦2⟧",
+    "。\n</Chi",
+    "nese>",
+]
+
+
+def test_translate_streams_partial_text(monkeypatch):
+    def fake_chat(messages, on_delta=None, kind=None, **kwargs):
+        assert "⟦1⟧" in messages[-1]["content"]
+        for chunk in CHUNKS:
+            on_delta(chunk)
+        return "".join(CHUNKS)
+
+    monkeypatch.setattr(translator_module, "chat", fake_chat)
+    partials = []
+    zh_text = Translator().translate_content(TEXT, on_partial=partials.append)
+
+    assert zh_text == "使用$\\theta$ 的模型优于已有工作[[3]]。"
+    # 不完整的占位符和结束标签不展示，已生成的占位符立即还原
+    assert partials == [
+        "使用",
+        "使用",
+        "使用$\\theta$ 的模型",
+        "使用$\\theta$ 的模型优于已有工作[[3]]",
+        "使用$\\theta$ 的模型优于已有工作[[3]]。",
+        "使用$\\theta$ 的模型优于已有工作[[3]]。",
+    ]
@@ -0,0 +1,120 @@
+import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from arxiv_hero.config import JobConfig
+from arxiv_hero.repositories.job_repository import JobRepository
+from arxiv_hero.services.job_queue import JobQueue
+from arxiv_hero.services.task_backend import DatabaseTaskBackend
+from arxiv_hero.services.task_manager import TaskManager, TaskStatus
+
+
+def test_claim_is_atomic():
+    repository = JobRepository()
+    job_id = f"test_job_{uuid.uuid4().hex}"
+    repository.enqueue(job_id, "test", {"x": 1})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(
+                lambda i: repository.claim(job_id, f"worker-{i}", lease_seconds=60),
+                range(8),
+            )
+        )
+    assert results.count(True) == 1
+
+    job = repository.get_job(job_id)
+    assert job.status == "running"
+    assert job.attempts == 1
+
+
+def test_expired_lease_is_reclaimed():
+    repository = JobRepository()
+    job_id = f"test_job_{uuid.uuid4().hex}"
+    repository.enqueue(job_id, "test", {})
+
+    assert repository.claim(job_id, "worker-a", lease_seconds=0)
+    time.sleep(0.01)
+    # worker-a 崩溃，租约过期后被 worker-b 接管
+    assert repository.claim(job_id, "worker-b", lease_seconds=60)
+    assert not repository.heartbeat(job_id, "worker-a", lease_seconds=60)
+    assert not repository.finish(job_id, "worker-a", "completed")
+    assert repository.finish(job_id, "worker-b", "completed")
+    assert repository.get_job(job_id).status == "completed"
+
+
+def test_failed_job_is_retried():
+    calls = []
+
+    def handler(x, callback=None):
+        calls.append(x)
+        if len(calls) == 1:
+            raise RuntimeError("first attempt failed")
+        callback("done", None, 1)
+        return x * 2
+
+    config = JobConfig(lease_seconds=60, heartbeat_interval=15, poll_interval=1)
+    with TaskManager(max_workers=2) as task_manager:
+        job_queue = JobQueue(task_manager, config=config)
+        job_queue.register("double", handler)
+        job_id = f"test_job_{uuid.uuid4().hex}"
+
+        task = job_queue.submit(job_id, "double", {"x": 21}, callback=lambda *_: None)
+        assert task_manager.get_task_result(job_id) is None
+        assert task.get_status() == TaskStatus.ERROR
+        assert job_queue.repository.get_job(job_id).status == "pending"
+
+        # 第二次由 poll 领取并执行
+        job_queue.poll()
+        assert task_manager.get_task_result(job_id) == 42
+        job = job_queue.repository.get_job(job_id)
+        assert job.status == "completed"
+        assert job.attempts == 2
+
+
+def test_follow_job_claimed_elsewhere():
+    config = JobConfig(lease_seconds=60, heartbeat_interval=15, poll_interval=1)
+    with TaskManager(max_workers=2) as task_manager:
+        job_queue = JobQueue(task_manager, config=config)
+        job_queue.register("double", lambda x, callback=None: x * 2)
+        repository = job_queue.repository
+
+        # 跟随其他进程中的任务时可以取消
+        job_id = f"test_job_{uuid.uuid4().hex}"
+        repository.enqueue(job_id, "double", {"x": 1})
+        assert repository.claim(job_id, "worker-other", lease_seconds=60)
+        task = job_queue.submit(job_id, "double", {"x": 1})
+        task_manager.run_task(job_id)
+        time.sleep(0.1)
+        assert task_manager.cancel_task(job_id)
+        task_manager.get_task_result(job_id)
+        assert task.get_status() == TaskStatus.CANCELLED
+        # 结束其他进程的任务，避免租约过期后被之后的测试领取
+        assert repository.finish(job_id, "worker-other", "cancelled")
+
+        # 其他进程完成后读取保存的结果
+        job_id = f"test_job_{uuid.uuid4().hex}"
+        repository.enqueue(job_id, "double", {"x": 2})
+        assert repository.claim(job_id, "worker-other", lease_seconds=60)
+        job_queue.submit(job_id, "double", {"x": 2})
+        task_manager.run_task(job_id)
+        time.sleep(0.1)
+        assert repository.finish(job_id, "worker-other", "completed", result=4)
+        assert task_manager.get_task_result(job_id) == 4
+
+
+def test_job_lease_is_only_in_job_table():
+    backend = DatabaseTaskBackend()
+    with TaskManager(max_workers=2, backend=backend) as task_manager:
+        job_queue = JobQueue(task_manager)
+        job_queue.register("double", lambda x, callback=None: x * 2)
+        job_id = f"test_job_{uuid.uuid4().hex}"
+        task = job_queue.submit(job_id, "double", {"x": 21})
+        task_manager.run_task(job_id)
+        assert task_manager.get_task_result(job_id) == 42
+
+        # 任务的租约只在 job 表中，不在 TaskManager 的后端中另外登记
+        assert not task.shared
+        assert backend.get_state(job_id) is None
+        assert job_id not in task_manager._owned
+        assert job_queue.repository.get_job(job_id).status == "completed"
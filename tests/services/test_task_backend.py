@@ -0,0 +1,281 @@
+import time
+import uuid
+import asyncio
+
+from arxiv_hero.services.task_backend import (
+    RELEASE_LEASE_SCRIPT,
+    RENEW_LEASE_SCRIPT,
+    SET_STATUS_SCRIPT,
+    DatabaseTaskBackend,
+    RedisTaskBackend,
+    LeaderElector,
+)
+from arxiv_hero.services.task_manager import TaskManager, TaskStatus
+from arxiv_hero.utils.cancel_utils import get_cancel_token
+
+
+class FakeRedis:
+    """redis 的本地替身，只实现 RedisTaskBackend 用到的命令，lua 脚本用等价的函数代替"""
+
+    def __init__(self):
+        self.data: dict[str, object] = {}
+        self.expires: dict[str, float] = {}
+
+    def _alive(self, key: str) -> bool:
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def register_script(self, script):
+        handler = {
+            RENEW_LEASE_SCRIPT: self._renew_lease,
+            RELEASE_LEASE_SCRIPT: self._release_lease,
+            SET_STATUS_SCRIPT: self._set_status,
+        }[script]
+        return lambda keys=(), args=(): handler(
+            list(keys), [str(arg).encode() for arg in args]
+        )
+
+    def _renew_lease(self, keys, args):
+        if self.get(keys[0]) != args[0]:
+            return 0
+        return self.pexpire(keys[0], int(args[1]))
+
+    def _release_lease(self, keys, args):
+        if self.get(keys[0]) != args[0]:
+            return 0
+        self.delete(keys[0])
+        return 1
+
+    def _set_status(self, keys, args):
+        lease_key, key, events_key = keys
+        worker_id, status, ttl, lease_expires = args
+        if self.get(lease_key) != worker_id:
+            return 0
+        self.hset(key, "status", status.decode())
+        if ttl:
+            self.hset(key, "lease_expires", lease_expires.decode())
+            self.delete(lease_key)
+            self.expire(key, int(ttl))
+            self.expire(events_key, int(ttl))
+        return 1
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.expires.pop(key, None)
+        if px:
+            self.expires[key] = time.time() + px / 1000
+        return True
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.time() + ms / 1000
+        return 1
+
+    def expire(self, key, seconds):
+        return self.pexpire(key, seconds * 1000)
+
+    def persist(self, key):
+        return 1 if self.expires.pop(key, None) else 0
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        data = self.data.setdefault(key, {}) if self._alive(key) else {}
+        self.data[key] = data
+        for k, v in {**(mapping or {}), **({field: value} if field else {})}.items():
+            data[k.encode()] = str(v).encode()
+
+    def hgetall(self, key):
+        return dict(self.data[key]) if self._alive(key) else {}
+
+    def rpush(self, key, value):
+        if not self._alive(key):
+            self.data[key] = []
+        self.data[key].append(value)
+
+    def ltrim(self, key, start, end):
+        if self._alive(key):
+            items = self.data[key]
+            self.data[key] = items[start:] if end == -1 else items[start : end + 1]
+
+    def lrange(self, key, start, end):
+        if not self._alive(key):
+            return []
+        items = self.data[key]
+        return items[start:] if end == -1 else items[start : end + 1]
+
+
+def test_follow_task_in_other_worker():
+    backend = DatabaseTaskBackend()
+    task_id = f"test_task_{uuid.uuid4().hex}"
+    calls = []
+
+    def work(callback):
+        calls.append(1)
+        for i in range(3):
+            callback(f"step {i}", None, (i + 1) / 4)
+            time.sleep(0.05)
+        return {"answer": 42}
+
+    async def collect(task_manager: TaskManager) -> list[bytes]:
+        return [frame async for frame in task_manager.stream_task(task_id)]
+
+    options = {"backend": backend, "follow_interval": 0.02}
+    with TaskManager(**options) as worker_a, TaskManager(**options) as worker_b:
+        worker_a.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id=task_id
+        )
+        worker_a.run_task(task_id)
+
+        # 同一个任务不会在第二个进程中重复执行，而是跟随第一个进程的进度
+        task_b = worker_b.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id=task_id
+        )
+        worker_b.run_task(task_id)
+        assert worker_b.get_task_result(task_id) == {"answer": 42}
+        assert task_b.get_status() == TaskStatus.COMPLETED
+        assert len(calls) == 1
+
+        # 连接到没有该任务的进程(如断线重连)，也能收到完整的消息
+        worker_b.delete_task(task_id)
+        frames = asyncio.run(collect(worker_b))
+        assert frames == [frame for _, frame in worker_a.get_task(task_id).history]
+
+
+def _wait_until(predicate, timeout: float = 5) -> bool:
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _slow_work(callback):
+    for i in range(500):
+        get_cancel_token().raise_if_cancelled()
+        time.sleep(0.01)
+    return {"answer": 42}
+
+
+def test_cancel_in_follower_reaches_owner():
+    backend = DatabaseTaskBackend()
+    task_id = f"test_task_{uuid.uuid4().hex}"
+    options = {"backend": backend, "follow_interval": 0.02}
+    with TaskManager(**options) as worker_a, TaskManager(**options) as worker_b:
+        task_a = worker_a.create_task(
+            _slow_work, kwargs={"callback": lambda *_: None}, task_id=task_id
+        )
+        worker_a.run_task(task_id)
+        assert _wait_until(lambda: task_a.get_status() == TaskStatus.RUNNING)
+        task_b = worker_b.create_task(
+            _slow_work, kwargs={"callback": lambda *_: None}, task_id=task_id
+        )
+        worker_b.run_task(task_id)
+
+        # 在跟随的进程中取消，请求执行任务的进程取消，续约时生效
+        assert worker_b.cancel_task(task_id)
+        assert _wait_until(lambda: backend.list_cancel_requests([task_id]))
+        worker_a._renew_tasks()
+        assert _wait_until(lambda: task_a.get_status() == TaskStatus.CANCELLED)
+        assert _wait_until(lambda: task_b.get_status() == TaskStatus.CANCELLED)
+        assert backend.get_state(task_id).status == "cancelled"
+
+
+def test_lost_lease_stops_local_run():
+    backend = DatabaseTaskBackend()
+    task_id = f"test_task_{uuid.uuid4().hex}"
+    with TaskManager(backend=backend, lease_seconds=0.05) as worker_a:
+        task_a = worker_a.create_task(
+            _slow_work, kwargs={"callback": lambda *_: None}, task_id=task_id
+        )
+        worker_a.run_task(task_id)
+        assert _wait_until(lambda: task_a.get_status() == TaskStatus.RUNNING)
+        time.sleep(0.1)  # 租约过期，被其他进程接管
+        assert backend.acquire_task(task_id, "worker-x", lease_seconds=60)
+
+        worker_a._renew_tasks()
+        assert _wait_until(lambda: task_a.get_status() == TaskStatus.CANCELLED)
+        # 被接管后不再修改后端中的状态
+        assert backend.get_state(task_id).worker_id == "worker-x"
+        assert backend.get_state(task_id).status == "waiting"
+        assert worker_a._owned == set()
+
+
+def test_leader_election():
+    backend = DatabaseTaskBackend()
+    name = f"test_leader_{uuid.uuid4().hex}"
+    a = LeaderElector(backend, name, "worker-a", lease_seconds=60)
+    b = LeaderElector(backend, name, "worker-b", lease_seconds=60)
+
+    assert a.elect()
+    assert not b.elect()
+    assert a.elect()  # 续约
+
+    a.resign()
+    assert b.elect()
+    assert not a.elect()
+
+
+def test_redis_backend():
+    backend = RedisTaskBackend(FakeRedis(), history_size=2)
+
+    assert backend.acquire_task("t", "worker-a", lease_seconds=60)
+    assert not backend.acquire_task("t", "worker-b", lease_seconds=60)
+    for event_id in range(1, 4):
+        backend.publish("t", event_id, f"data: {event_id}\n\n".encode())
+    assert backend.list_events("t", after_event_id=2) == [(3, b"data: 3\n\n")]
+    assert [event_id for event_id, _ in backend.list_events("t")] == [2, 3]
+
+    backend.set_status("t", "worker-b", "completed")  # 不持有租约，忽略
+    assert backend.get_state("t").status == "waiting"
+    backend.set_status("t", "worker-a", "completed")
+    state = backend.get_state("t")
+    assert state.is_finished and state.worker_id == "worker-a"
+
+    assert not backend.request_cancel("t")  # 已结束
+
+    # 结束后可以被重新执行
+    assert backend.acquire_task("t", "worker-b", lease_seconds=60)
+    assert backend.list_events("t") == []
+    assert backend.request_cancel("t")
+    assert backend.list_cancel_requests(["t", "u"]) == ["t"]
+    assert backend.acquire_task("t", "worker-b", lease_seconds=60)
+    assert backend.list_cancel_requests(["t"]) == []  # 新的执行清除取消请求
+
+    assert backend.acquire_leader("fetch", "worker-a", lease_seconds=60)
+    assert not backend.acquire_leader("fetch", "worker-b", lease_seconds=60)
+
+
+def test_redis_lease_taken_over():
+    client = FakeRedis()
+    backend = RedisTaskBackend(client, history_size=2)
+
+    assert backend.acquire_task("t", "worker-a", lease_seconds=0.05)
+    assert backend.acquire_leader("fetch", "worker-a", lease_seconds=0.05)
+    time.sleep(0.1)  # worker-a 的租约过期，被 worker-b 接管
+    assert backend.acquire_task("t", "worker-b", lease_seconds=60)
+    assert backend.acquire_leader("fetch", "worker-b", lease_seconds=60)
+
+    # worker-a 不能续约、修改状态或释放 worker-b 的租约
+    assert backend.renew_tasks(["t"], "worker-a", lease_seconds=60) == ["t"]
+    backend.set_status("t", "worker-a", "completed")
+    backend.release_leader("fetch", "worker-a")
+    assert backend.get_state("t").status == "waiting"
+    assert client.get("arxiv_hero:task:t:lease") == b"worker-b"
+    assert client.get("arxiv_hero:leader:fetch") == b"worker-b"
+
+    assert backend.renew_tasks(["t"], "worker-b", lease_seconds=60) == []
+    backend.release_leader("fetch", "worker-b")
+    assert backend.acquire_leader("fetch", "worker-a", lease_seconds=60)
@@ -0,0 +1,288 @@
+import asyncio
+import time
+import threading
+
+from arxiv_hero.services.task_manager import (
+    ScheduleTaskManager,
+    TaskManager,
+    TaskMessage,
+    TaskStatus,
+)
+from arxiv_hero.utils.cancel_utils import get_cancel_token
+
+
+def _run_in_order(task_manager: TaskManager, priorities: list[str]) -> list[str]:
+    """占满 llm 通道后依次提交任务，返回任务实际执行的顺序"""
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    task_manager.create_task(block, task_id="block", lane="llm")
+    task_manager.run_task("block")
+    started.wait()
+
+    for i, priority in enumerate(priorities):
+        task_id = f"{priority}_{i}"
+        task_manager.create_task(
+            order.append,
+            args=(task_id,),
+            task_id=task_id,
+            priority=priority,
+            lane="llm",
+        )
+        task_manager.run_task(task_id)
+        time.sleep(0.02)
+
+    stats = {s.lane: s for s in task_manager.get_lane_stats()}
+    assert stats["llm"].running == 1
+    assert stats["llm"].queued == len(priorities)
+    assert stats["default"].queued == 0
+
+    release.set()
+    for i, priority in enumerate(priorities):
+        task_manager.get_task_result(f"{priority}_{i}")
+    return order
+
+
+def test_priority_order():
+    with TaskManager(lanes={"llm": 1}, aging_seconds=3600) as task_manager:
+        order = _run_in_order(task_manager, ["bulk", "background", "interactive"])
+    assert order == ["interactive_2", "background_1", "bulk_0"]
+
+
+def test_aging_prevents_starvation():
+    # 排队超过 aging_seconds 后，先提交的 bulk 任务优先级已经高于 interactive
+    with TaskManager(lanes={"llm": 1}, aging_seconds=0.01) as task_manager:
+        order = _run_in_order(task_manager, ["bulk", "interactive"])
+    assert order == ["bulk_0", "interactive_1"]
+
+
+def test_cancel_running_task():
+    steps = []
+
+    def work(callback):
+        token = get_cancel_token()
+        for i in range(100):
+            token.raise_if_cancelled()
+            steps.append(i)
+            callback(f"step {i}", None, None)
+            time.sleep(0.01)
+
+    with TaskManager() as task_manager:
+        task = task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        task_manager.run_task("work")
+        time.sleep(0.05)
+        assert task_manager.cancel_task("work")
+        task_manager.get_task_result("work")
+
+    assert task.get_status() == TaskStatus.CANCELLED
+    assert len(steps) < 100
+    assert not task_manager.cancel_task("work")  # 已结束的任务不能再取消
+
+
+def test_cancel_scheduled_task_only_stops_current_run():
+    runs = []
+    started = threading.Event()
+
+    def work():
+        runs.append(1)
+        started.set()
+        get_cancel_token().wait(5)
+        get_cancel_token().raise_if_cancelled()
+
+    with ScheduleTaskManager() as task_manager:
+        task = task_manager.create_task(
+            work, trigger_args={"hours": 1}, task_id="scheduled"
+        )
+        fire = task_manager.scheduled_jobs["scheduled"].func
+        fire()
+        started.wait(5)
+        assert task_manager.cancel_task("scheduled")
+        task_manager.get_task_result("scheduled")
+        assert task.get_status() == TaskStatus.CANCELLED
+
+        # 下一次触发时正常执行
+        started.clear()
+        fire()
+        assert started.wait(5)
+        assert len(runs) == 2
+        assert task.get_status() == TaskStatus.RUNNING
+        task_manager.cancel_task("scheduled")
+        task_manager.get_task_result("scheduled")
+
+
+def test_finished_result_is_cached():
+    calls = []
+
+    async def collect(task_manager: TaskManager) -> list[bytes]:
+        return [frame async for frame in task_manager.stream_task("work")]
+
+    def work(callback):
+        calls.append(1)
+        callback("step", None, 0.5)
+        return len(calls)
+
+    with TaskManager(result_ttl=0.2) as task_manager:
+        for _ in range(2):
+            task_manager.create_task(
+                work, kwargs={"callback": lambda *_: None}, task_id="work"
+            )
+            frames = asyncio.run(collect(task_manager))
+            assert b"[DONE]" in frames[-1]
+        # 第二次请求直接收到缓存的结果，不会重复执行
+        assert len(calls) == 1
+
+        time.sleep(0.3)
+        assert task_manager.get_task("work") is None
+        task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        assert task_manager.get_task_result("work") == 2
+
+
+def test_partial_messages_are_transient():
+    async def collect(task_manager: TaskManager) -> list[bytes]:
+        return [frame async for frame in task_manager.stream_task("work")]
+
+    def work(callback):
+        while task.watchers == 0:  # 等待客户端订阅
+            time.sleep(0.01)
+        for text in ("部", "部分", "部分译文"):
+            callback(None, {"order_idx": 0, "zh_text": text, "partial": True}, None)
+        callback(None, {"order_idx": 0, "zh_text": "完整译文"}, 0.5)
+
+    with TaskManager() as task_manager:
+        task = task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        frames = asyncio.run(collect(task_manager))
+        # 在线的客户端收到部分译文，之后的完整段落替换它
+        assert [b"partial" in frame for frame in frames] == [True] * 3 + [False] * 2
+        assert all(frame.startswith(b"data: ") for frame in frames[:3])
+
+        # 部分译文不保存，重连或之后的客户端只收到完整的消息
+        frames = asyncio.run(collect(task_manager))
+        assert len(frames) == 2
+        assert frames[0].startswith(b"id: 1\n") and "完整译文".encode() in frames[0]
+
+
+class FakeRequest:
+    """stream_task 用到的 Request 接口"""
+
+    def __init__(self, headers: dict = None, disconnected: bool = False):
+        self.headers = headers or {}
+        self.disconnected = disconnected
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def test_stream_to_multiple_subscribers():
+    def work(callback):
+        while task.watchers < 2:  # 等待两个客户端都订阅
+            time.sleep(0.01)
+        for i in range(3):
+            callback(f"step {i}", None, (i + 1) / 3)
+
+    async def collect_both(task_manager: TaskManager) -> list[list[bytes]]:
+        async def collect() -> list[bytes]:
+            stream = task_manager.stream_task("work", FakeRequest())
+            return [frame async for frame in stream]
+
+        return await asyncio.gather(collect(), collect())
+
+    with TaskManager() as task_manager:
+        task = task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        frames_a, frames_b = asyncio.run(collect_both(task_manager))
+        assert frames_a == frames_b == [frame for _, frame in task.history]
+        assert len(frames_a) == 4  # 3 条进度和 [DONE]
+        assert task.watchers == 0
+
+
+def test_stream_stops_when_client_disconnects():
+    release = threading.Event()
+    request = FakeRequest()
+
+    async def collect(task_manager: TaskManager) -> list[bytes]:
+        frames = []
+        async for frame in task_manager.stream_task("work", request, keepalive=0.05):
+            frames.append(frame)
+            assert task.watchers == 1
+            request.disconnected = True  # 收到第一条消息后断开
+        return frames
+
+    def work(callback):
+        callback("start", None, 0.1)
+        release.wait(5)
+
+    with TaskManager() as task_manager:
+        task = task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        frames = asyncio.run(collect(task_manager))
+        # 断开后不再推送心跳，并取消订阅，任务继续执行
+        assert len(frames) == 1 and b"start" in frames[0]
+        assert task.watchers == 0
+        assert task.get_status() == TaskStatus.RUNNING
+        release.set()
+        task_manager.get_task_result("work")
+
+
+def test_stream_sends_keepalive():
+    async def collect(task_manager: TaskManager) -> list[bytes]:
+        stream = task_manager.stream_task("work", FakeRequest(), keepalive=0.05)
+        return [frame async for frame in stream]
+
+    def work(callback):
+        time.sleep(0.3)  # 没有新消息时发送心跳
+        return "ok"
+
+    with TaskManager() as task_manager:
+        task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        frames = asyncio.run(collect(task_manager))
+        pings = [frame for frame in frames if frame == b": ping\n\n"]
+        assert len(pings) >= 2
+        assert b"[DONE]" in frames[-1]
+
+
+def test_stream_resumes_from_last_event_id():
+    async def collect(task_manager: TaskManager, headers: dict) -> list[bytes]:
+        stream = task_manager.stream_task("work", FakeRequest(headers))
+        return [frame async for frame in stream]
+
+    def work(callback):
+        for i in range(5):
+            callback(f"step {i}", None, (i + 1) / 5)
+
+    with TaskManager(history_size=3) as task_manager:
+        task_manager.create_task(
+            work, kwargs={"callback": lambda *_: None}, task_id="work"
+        )
+        task_manager.get_task_result("work")
+
+        # 只保留事件 4~6，从事件 4 之后继续时只推送之后的消息
+        frames = asyncio.run(collect(task_manager, {"last-event-id": "4"}))
+        assert [frame.split(b"\n", 1)[0] for frame in frames] == [b"id: 5", b"id: 6"]
+        assert b"step 4" in frames[0] and b"[DONE]" in frames[1]
+
+        # 事件 1 之后的消息已被丢弃，先推送当前进度的快照，而不是直接跳过
+        frames = asyncio.run(collect(task_manager, {"last-event-id": "1"}))
+        assert [frame.split(b"\n", 1)[0] for frame in frames] == [
+            b"id: 3",
+            b"id: 4",
+            b"id: 5",
+            b"id: 6",
+        ]
+        snapshot = TaskMessage.model_validate_json(frames[0].split(b"data: ", 1)[1])
+        assert snapshot.code == 200 and snapshot.progress == 1
+        assert snapshot.msg == "已跳过 2 条较早的消息"
@@ -0,0 +1,59 @@
+import pytest
+
+from arxiv_hero.models import DBSession
+from arxiv_hero.models.llm_usage import LLMUsage
+from arxiv_hero.services.usage_recorder import UsageRecorder
+from arxiv_hero.utils.chat_utils import chat
+from arxiv_hero.utils.concurrency_utils import AIMDLimiter, LLMJob, use_llm_job
+from arxiv_hero.utils.usage_utils import estimate_tokens, use_usage_scope
+from tests.test_chat_utils import MockOpenAI, _use_mock
+
+
+@pytest.fixture
+def recorder():
+    recorder = UsageRecorder(flush_interval=3600)
+    recorder.start()
+    yield recorder
+    recorder.stop()
+    with DBSession() as session:
+        session.query(LLMUsage).filter(LLMUsage.entry_id.like("1990.%")).delete(
+            synchronize_session=False
+        )
+        session.commit()
+
+
+def test_usage_recorder(monkeypatch, recorder: UsageRecorder):
+    mock = MockOpenAI([(429, 0)])
+    _use_mock(monkeypatch, mock, AIMDLimiter())
+    try:
+        with use_llm_job(LLMJob("1", kind="content")), use_usage_scope(
+            entry_id="1990.00001"
+        ):
+            with use_usage_scope(type="text"):
+                # 被限流的请求没有用量，重试的请求记录用量
+                assert chat("hi", kind="content") == "ok"
+                assert chat("hi", kind="content") == "ok"
+            with use_usage_scope(type="figure"):
+                assert chat("hi", kind="content") == "ok"
+    finally:
+        mock.close()
+
+    recorder.flush()
+    stats = recorder.repository.get_usage_stats(
+        "1990-01-01",
+        "2999-12-31",
+        entry_id="1990.00001",
+        group_by=("entry_id", "type", "job"),
+    )
+    assert [
+        (s.type, s.job, s.requests, s.prompt_tokens, s.completion_tokens) for s in stats
+    ] == [("text", "content", 2, 2000, 1000), ("figure", "content", 1, 1000, 500)]
+
+    with pytest.raises(ValueError):
+        recorder.repository.get_usage_stats("1990-01-01", "2999-12-31", group_by=("x",))
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("翻译") == 2
+    assert 1 <= estimate_tokens("hello world") <= 4
@@ -1,4 +1,21 @@
-from arxiv_hero.utils.chat_utils import chat, stream_chat
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from arxiv_hero.utils import chat_utils
+from arxiv_hero.utils.chat_utils import Endpoint, chat, stream_chat
+from arxiv_hero.utils.cancel_utils import CancelToken, CancelledError
+from arxiv_hero.utils.concurrency_utils import (
+    AIMDLimiter,
+    LLMJob,
+    get_llm_job,
+    use_llm_job,
+)
+from arxiv_hero.utils.parallel_utils import parallel_func
 
 
 def test_chat():
@@ -9,5 +26,362 @@ def test_chat():
     assert len(response) > 0
 
 
+class MockOpenAI:
+    """
+    本地的 openai 兼容服务，按请求的顺序返回 responses 中的 (状态码, 延迟秒数)，
+    之后的请求都立即成功。限流时返回 retry_after 秒的 Retry-After
+    """
+
+    def __init__(
+        self, responses: list[tuple[int, float]] = None, retry_after: float = None
+    ):
+        self.responses = list(responses or [])
+        self.retry_after = retry_after
+        self.requests = 0
+        self.lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with mock.lock:
+                    mock.requests += 1
+                    status, delay = (
+                        mock.responses.pop(0) if mock.responses else (200, 0)
+                    )
+                time.sleep(delay)
+                if status != 200:
+                    data = json.dumps({"error": {"message": f"status {status}"}})
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if status == 429 and mock.retry_after is not None:
+                        self.send_header("Retry-After", str(mock.retry_after))
+                    self.end_headers()
+                    self.wfile.write(data.encode())
+                    return
+                usage = {
+                    "prompt_tokens": 1000,
+                    "completion_tokens": 500,
+                    "total_tokens": 1500,
+                }
+                if not body.get("stream"):
+                    data = json.dumps(
+                        {
+                            "id": "1",
+                            "object": "chat.completion",
+                            "created": 0,
+                            "model": body["model"],
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {"role": "assistant", "content": "ok"},
+                                    "finish_reason": "stop",
+                                }
+                            ],
+                            "usage": usage,
+                        }
+                    )
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data.encode())
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                chunk = {
+                    "id": "1",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": "ok"}}],
+                }
+                for data in (chunk, {**chunk, "choices": [], "usage": usage}):
+                    self.wfile.write(f"data: {json.dumps(data)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.handle_error = lambda *args: None  # 客户端关闭了被取消的请求
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _endpoint(name: str, mock: MockOpenAI, limiter: AIMDLimiter = None, **kwargs):
+    return Endpoint(
+        name,
+        mock.base_url,
+        "x",
+        f"{name}-model",
+        10,
+        limiter or AIMDLimiter(),
+        **kwargs,
+    )
+
+
+def _use_mock(monkeypatch, mock: MockOpenAI, limiter: AIMDLimiter) -> None:
+    monkeypatch.setattr(
+        chat_utils, "ENDPOINTS", {"default": _endpoint("default", mock, limiter)}
+    )
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {})
+    monkeypatch.setattr(chat_utils.openai_cfg, "wait_time", 0)
+
+
+def _sample(metric, **labels) -> float:
+    for _, sample_labels, value in metric.samples():
+        if sample_labels == labels:
+            return value
+    return 0
+
+
+def _sample_sum(metric, **labels) -> float:
+    for name, sample_labels, value in metric.samples():
+        if name.endswith("_sum") and sample_labels == labels:
+            return value
+    return 0
+
+
+def test_retry_backs_off_concurrency(monkeypatch):
+    mock = MockOpenAI([(429, 0), (503, 0)])
+    limiter = AIMDLimiter(initial_limit=8, max_limit=8, cooldown=0)
+    _use_mock(monkeypatch, mock, limiter)
+    monkeypatch.setattr(chat_utils.openai_cfg, "max_retries", 3)
+    try:
+        assert chat("hi", cancel_token=CancelToken()) == "ok"
+    finally:
+        mock.close()
+    assert mock.requests == 3
+    assert limiter.limit == 2  # 两次失败，每次减半
+    assert limiter.in_flight == 0
+
+
+def test_queue_wait_not_counted_as_latency(monkeypatch):
+    mock = MockOpenAI([(200, 0.2), (200, 0.2)])
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+    _use_mock(monkeypatch, mock, limiter)
+    wait_sum = _sample_sum(chat_utils.LLM_QUEUE_WAIT, endpoint="default", kind="chat")
+    try:
+        threads = [threading.Thread(target=chat, args=("hi",)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        mock.close()
+    # 第二个请求排队约 0.2 秒，只计入排队时间，不计入用于对冲和退避的耗时
+    assert len(limiter._latencies) == 2
+    assert max(limiter._latencies) < 0.35
+    assert (
+        _sample_sum(chat_utils.LLM_QUEUE_WAIT, endpoint="default", kind="chat")
+        - wait_sum
+        > 0.15
+    )
+
+
+def test_aimd_limiter():
+    limiter = AIMDLimiter(initial_limit=2, max_limit=4, cooldown=60)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(CancelledError):
+        limiter.acquire(token)  # 已满，等待直到取消
+
+    limiter.release()
+    limiter.release()
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert limiter.limit == 4
+    limiter.on_overload()
+    limiter.on_overload()  # 冷却期内只减一次
+    assert limiter.limit == 2
+
+
+def test_fair_share_limiter():
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+    limiter.acquire()  # 占满并发，之后的请求排队
+    order, threads = [], []
+
+    def request(job: LLMJob):
+        with limiter.slot(job=job):
+            order.append(job.job_id)
+
+    nightly = LLMJob("nightly", "bulk")
+    paper_a, paper_b = LLMJob("a", "background"), LLMJob("b", "background")
+    reader = LLMJob("reader", "interactive")
+    for job in [nightly] * 4 + [paper_a] * 2 + [paper_b] * 2 + [reader] * 2:
+        threads.append(threading.Thread(target=request, args=(job,)))
+        threads[-1].start()
+        while limiter.waiting < len(threads):  # 保证排队的顺序
+            time.sleep(0.001)
+    limiter.release()
+    for thread in threads:
+        thread.join()
+
+    # 后到的任务不用等待先到任务的全部请求，权重越高的任务，后续请求越靠前
+    assert order == (
+        ["nightly", "a", "b", "reader", "reader", "a", "b"] + ["nightly"] * 3
+    )
+    assert limiter.in_flight == 0
+
+    with use_llm_job(reader):  # 上下文中的任务传递给 parallel_func 的各个线程
+        assert parallel_func(lambda: get_llm_job().job_id, [(), ()]) == ["reader"] * 2
+
+
+def test_hedged_request(monkeypatch):
+    mock = MockOpenAI([(200, 3)])  # 第一个请求很慢
+    limiter = AIMDLimiter(initial_limit=4)
+    for _ in range(20):
+        limiter.on_success(0.05)
+    _use_mock(monkeypatch, mock, limiter)
+    monkeypatch.setattr(chat_utils.openai_cfg, "hedge", True)
+    try:
+        start_time = time.perf_counter()
+        assert chat("hi") == "ok"
+        assert time.perf_counter() - start_time < 2
+    finally:
+        mock.close()
+    assert mock.requests == 2
+    assert limiter.in_flight == 0
+
+
+def test_hedge_delay_starts_when_request_starts(monkeypatch):
+    mock = MockOpenAI([(200, 0.2)])
+    limiter = AIMDLimiter(initial_limit=4)
+    for _ in range(20):
+        limiter.on_success(0.3)
+    _use_mock(monkeypatch, mock, limiter)
+    monkeypatch.setattr(chat_utils.openai_cfg, "hedge", True)
+    executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(chat_utils, "_hedge_executor", executor)
+    hedged = _sample(chat_utils.LLM_HEDGED, endpoint="default")
+    try:
+        executor.submit(time.sleep, 0.5)  # 线程池已满，请求排队 0.5 秒
+        assert chat("hi") == "ok"
+    finally:
+        mock.close()
+        executor.shutdown()
+    # 请求开始后 0.2 秒返回，未超过 p95，不发送对冲请求
+    assert mock.requests == 1
+    assert _sample(chat_utils.LLM_HEDGED, endpoint="default") == hedged
+    assert limiter.in_flight == 0
+
+
+def test_route_fails_over_when_throttled(monkeypatch):
+    fast = MockOpenAI([(429, 0)], retry_after=30)
+    backup = MockOpenAI()
+    endpoints = {
+        "fast": _endpoint("fast", fast, input_price=1, output_price=2),
+        "backup": _endpoint("backup", backup, input_price=4, output_price=8),
+    }
+    monkeypatch.setattr(chat_utils, "ENDPOINTS", endpoints)
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {"title": ["fast", "backup"]})
+    monkeypatch.setattr(chat_utils.openai_cfg, "max_retries", 1)
+    labels = {"endpoint": "backup", "model": "backup-model", "kind": "title"}
+    cost = _sample(chat_utils.LLM_COST, **labels)
+    try:
+        assert chat("hi", kind="title", cancel_token=CancelToken()) == "ok"
+        # fast 在 Retry-After 的时间内被跳过，不再等待
+        assert chat("hi", kind="title") == "ok"
+    finally:
+        fast.close()
+        backup.close()
+    assert (fast.requests, backup.requests) == (1, 2)
+    assert endpoints["fast"].is_throttled
+    assert endpoints["fast"].limiter.limit == 2
+    assert (
+        _sample(
+            chat_utils.LLM_REQUESTS,
+            status="rate_limited",
+            **{**labels, "endpoint": "fast", "model": "fast-model"},
+        )
+        == 1
+    )
+    # 每次 1000 个输入 token、500 个输出 token
+    assert _sample(chat_utils.LLM_COST, **labels) - cost == pytest.approx(0.016)
+
+
+def test_global_limiter_is_fair_across_endpoints(monkeypatch):
+    default, fast = MockOpenAI(), MockOpenAI()
+    endpoints = {
+        "default": _endpoint("default", default),
+        "fast": _endpoint("fast", fast),
+    }
+    monkeypatch.setattr(chat_utils, "ENDPOINTS", endpoints)
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {"title": ["fast"]})
+    global_limiter = AIMDLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    monkeypatch.setattr(chat_utils, "GLOBAL_LIMITER", global_limiter)
+    global_limiter.acquire()  # 占满全局并发，之后的请求排队
+    order, threads = [], []
+
+    def request(job: LLMJob, kind: str):
+        with use_llm_job(job):
+            chat("hi", kind=kind, on_delta=lambda _: order.append(job.job_id))
+
+    nightly = LLMJob("nightly", "bulk")
+    reader = LLMJob("reader", "interactive")
+    # 两个任务使用不同的端点，端点各自的并发都有空闲
+    for job, kind in [(nightly, "content")] * 4 + [(reader, "title")] * 2:
+        threads.append(threading.Thread(target=request, args=(job, kind)))
+        threads[-1].start()
+        while global_limiter.waiting < len(threads):  # 保证排队的顺序
+            time.sleep(0.001)
+    global_limiter.release()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        default.close()
+        fast.close()
+
+    # 全局并发为 1 时逐个执行，后到的 reader 不用等待 nightly 在另一个端点上的全部请求
+    assert order == ["nightly", "reader", "reader"] + ["nightly"] * 3
+    assert (default.requests, fast.requests) == (4, 2)
+    assert global_limiter.in_flight == 0
+    assert all(endpoint.limiter.in_flight == 0 for endpoint in endpoints.values())
+
+
+def test_throttled_endpoint_does_not_hold_global_slot(monkeypatch):
+    slow, healthy = MockOpenAI(), MockOpenAI()
+    slow_limiter = AIMDLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    endpoints = {
+        "default": _endpoint("default", healthy),
+        "slow": _endpoint("slow", slow, slow_limiter),
+    }
+    monkeypatch.setattr(chat_utils, "ENDPOINTS", endpoints)
+    monkeypatch.setattr(chat_utils.routing_cfg, "routes", {"title": ["slow"]})
+    global_limiter = AIMDLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    monkeypatch.setattr(chat_utils, "GLOBAL_LIMITER", global_limiter)
+    slow_limiter.acquire()  # slow 端点降到最低并发且已占满
+
+    thread = threading.Thread(target=chat, args=("hi",), kwargs={"kind": "title"})
+    thread.start()
+    try:
+        while slow_limiter.waiting < 1:
+            time.sleep(0.001)
+        # 等待 slow 端点的请求不占用全局并发，其他端点的请求照常执行
+        token = CancelToken()
+        threading.Timer(2, token.cancel).start()  # 被阻塞时取消，而不是一直等待
+        assert chat("hi", cancel_token=token) == "ok"
+        assert global_limiter.in_flight == 0
+    finally:
+        slow_limiter.release()
+        thread.join()
+        slow.close()
+        healthy.close()
+    assert (slow.requests, healthy.requests) == (1, 1)
+
+
 if __name__ == "__main__":
     test_chat()
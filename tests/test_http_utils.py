@@ -0,0 +1,22 @@
+from arxiv_hero.utils.http_utils import choose_encoding, etag_matches
+
+
+def test_etag_matches():
+    etag = '"v1-zh-md"'
+    assert etag_matches('"v1-zh-md"', etag)
+    assert etag_matches('"v0-zh-md", W/"v1-zh-md"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"v1-zh-md-old"', etag)  # 不按子串匹配
+    assert not etag_matches('"x"v1-zh-md"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_choose_encoding():
+    available = ["br", "gzip"]
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("br;q=0, gzip", available) == "gzip"
+    assert choose_encoding("br;q=0.5, gzip;q=0.8", available) == "gzip"
+    assert choose_encoding("xgzip, brx", available) is None  # 不按子串匹配
+    assert choose_encoding("*;q=0.1, br;q=0", available) == "gzip"
+    assert choose_encoding("identity", available) is None
+    assert choose_encoding(None, available) is None
@@ -0,0 +1,27 @@
+from arxiv_hero.common.metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+
+def test_render():
+    registry = MetricsRegistry()
+    counter = Counter("requests_total", "请求数", ("status",), registry=registry)
+    gauge = Gauge("tasks", "任务数", ("status",), registry=registry)
+    histogram = Histogram(
+        "latency_seconds", "耗时", buckets=(0.1, 1), registry=registry
+    )
+    registry.add_collector(lambda: gauge.set(3, status="running"))
+
+    counter.inc(status="ok")
+    counter.inc(2, status="ok")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="ok"} 3' in text
+    assert 'tasks{status="running"} 3' in text
+    # 分桶计数是累计的
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
@@ -79,6 +79,7 @@ export interface Paragraph {
     text?: string;
     zh_text?: string;
     text_level?: number;
+    partial?: boolean;  // 流式翻译中的部分译文，之后会被完整的段落替换
 }
 
 export interface DownloadMessage {
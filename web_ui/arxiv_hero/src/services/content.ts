@@ -1,6 +1,6 @@
 import type { StreamMessage, Paragraph } from '../interfaces'
 import request from '../utils/request'
-import { receiveStream } from '../utils/stream'
+import { receiveStream, receiveNdjson } from '../utils/stream'
 
 
 export const downloadSource = async (entry_id: string, onMessage: (msg: StreamMessage) => void) => {
@@ -12,6 +12,29 @@ export const getParagraphs = async (entry_id: string): Promise<Paragraph[]> => {
     return res.data
 }
 
+export const streamParagraphs = async (
+    entry_id: string,
+    onParagraphs: (paragraphs: Paragraph[]) => void,
+    from_idx: number = 0,
+    limit?: number,
+): Promise<number | null> => {
+    const params = new URLSearchParams({ from_idx: String(from_idx) })
+    if (limit != null) {
+        params.append('limit', String(limit))
+    }
+    return await receiveNdjson<Paragraph>(`/content/${entry_id}/stream?${params}`, onParagraphs)
+}
+
 export const translateContent = async (entry_id: string, onMessage: (msg: StreamMessage) => void) => {
     await receiveStream(`/content/translate/${entry_id}`, onMessage, 'GET')
+}
+
+// 取消翻译任务，停止调用大模型
+export const cancelTranslate = async (entry_id: string): Promise<boolean> => {
+    try {
+        const res = await request.delete<boolean>(`/tasks/translate_content_${entry_id}`)
+        return res.data
+    } catch {
+        return false  // 任务不存在或已结束
+    }
 }
\ No newline at end of file
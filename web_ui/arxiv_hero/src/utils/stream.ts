@@ -1,35 +1,118 @@
 import type { StreamMessage } from "../interfaces";
 
 /**
- * 接收并处理从后端流式返回的消息
+ * 解析一帧 SSE 消息，返回事件 ID 和 data 字段，心跳等注释帧返回 null
+ */
+function parseEvent(frame: string): { id: number | null; data: string } | null {
+    let id: number | null = null;
+    const dataLines: string[] = [];
+    for (const line of frame.split("\n")) {
+        if (line.startsWith(":")) continue; // 心跳等 SSE 注释
+        if (line.startsWith("id:")) {
+            id = Number(line.slice(3).trim());
+        } else if (line.startsWith("data:")) {
+            dataLines.push(line.slice(5).trimStart());
+        }
+    }
+    return dataLines.length > 0 ? { id, data: dataLines.join("\n") } : null;
+}
+
+/**
+ * 接收并处理从后端流式返回的消息，连接中断时携带 Last-Event-ID 重连，只接收之后的消息
  * @param endpoint 接口路径
  * @param onMessage 处理每一条消息的回调函数
  * @param method 请求方法，默认为 GET
  * @param data POST 请求体（仅在 method 为 POST 时有效）
+ * @param maxRetries 连接中断后的最大重连次数，默认为 3
  */
 export async function receiveStream(
     endpoint: string,
     onMessage: (msg: StreamMessage) => void,
     method: "GET" | "POST" = "GET",
-    data?: Record<string, any> // 或者 any 类型，看你数据格式
+    data?: Record<string, any>, // 或者 any 类型，看你数据格式
+    maxRetries: number = 3,
 ): Promise<void> {
     const baseUrl: string = import.meta.env.VITE_API_BASE_URL;
     const url = `${baseUrl}${endpoint}`;
-    const fetchOptions: RequestInit = {
-        method,
-        headers: {
-            "Content-Type": "application/json",
-        },
+    let lastEventId: number | null = null;
+    let finished = false; // 收到 [DONE] 或错误消息后任务结束
+
+    const handleFrame = (frame: string) => {
+        const event = parseEvent(frame.trim());
+        if (!event) return;
+        try {
+            const msg: StreamMessage = JSON.parse(event.data);
+            if (event.id !== null) lastEventId = event.id;
+            if (msg.msg === "[DONE]" || msg.code !== 200) finished = true;
+            onMessage(msg);
+        } catch (e) {
+            console.warn("解析消息失败：", frame, e);
+        }
     };
-    if (method === "POST" && data) {
-        fetchOptions.body = JSON.stringify(data);
+
+    for (let attempt = 0; attempt <= maxRetries && !finished; attempt++) {
+        const headers: Record<string, string> = {
+            "Content-Type": "application/json",
+        };
+        if (lastEventId !== null) {
+            headers["Last-Event-ID"] = String(lastEventId);
+        }
+        const fetchOptions: RequestInit = { method, headers };
+        if (method === "POST" && data) {
+            fetchOptions.body = JSON.stringify(data);
+        }
+
+        try {
+            const response = await fetch(url, fetchOptions);
+            if (!response.body) {
+                console.error("Response body is null");
+                return;
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder("utf-8");
+            let buffer = "";
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+
+                // 按双换行符分割
+                const parts = buffer.split("\n\n");
+
+                // 保留最后一部分（可能是不完整的一条）
+                buffer = parts.pop() || "";
+                parts.forEach(handleFrame);
+            }
+
+            // 处理最后残留的内容
+            if (buffer.trim()) handleFrame(buffer);
+            return; // 服务端正常结束
+        } catch (e) {
+            console.warn(`连接中断，准备重连（${attempt + 1}/${maxRetries}）：`, e);
+            await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)));
+        }
     }
-    const response = await fetch(url, fetchOptions);
+}
 
-    if (!response.body) {
-        console.error("Response body is null");
-        return;
+/**
+ * 接收并处理从后端逐行返回的 NDJSON 数据
+ * @param endpoint 接口路径
+ * @param onItems 处理每一批数据的回调函数，每次读取到网络数据后调用一次
+ * @returns 响应头中的 X-Total-Count，不存在时为 null
+ */
+export async function receiveNdjson<T>(
+    endpoint: string,
+    onItems: (items: T[]) => void,
+): Promise<number | null> {
+    const baseUrl: string = import.meta.env.VITE_API_BASE_URL;
+    const response = await fetch(`${baseUrl}${endpoint}`);
+    if (!response.ok || !response.body) {
+        throw new Error(`请求失败：${response.status}`);
     }
+    const totalCount = response.headers.get("X-Total-Count");
 
     const reader = response.body.getReader();
     const decoder = new TextDecoder("utf-8");
@@ -40,30 +123,18 @@ export async function receiveStream(
         if (done) break;
 
         buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        // 保留最后一行（可能是不完整的一条）
+        buffer = lines.pop() || "";
 
-        // 按双换行符分割
-        let parts = buffer.split("\n\n");
-
-        // 保留最后一部分（可能是不完整的一条）
-        buffer = parts.pop() || "";
-
-        for (const part of parts) {
-            try {
-                const msg: StreamMessage = JSON.parse(part);
-                onMessage(msg);
-            } catch (e) {
-                console.warn("解析消息失败：", part, e);
-            }
+        const items = lines.filter((line) => line.trim()).map((line) => JSON.parse(line) as T);
+        if (items.length > 0) {
+            onItems(items);
         }
     }
 
-    // 处理最后残留的内容
     if (buffer.trim()) {
-        try {
-            const msg: StreamMessage = JSON.parse(buffer.trim());
-            onMessage(msg);
-        } catch (e) {
-            console.warn("解析结尾消息失败：", buffer, e);
-        }
+        onItems([JSON.parse(buffer.trim()) as T]);
     }
-}
\ No newline at end of file
+    return totalCount == null ? null : Number(totalCount);
+}